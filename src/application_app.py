@@ -3,11 +3,21 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk, ImageFilter
-import numpy as np
 import os
-import json
-from neural_network import NeuralNetwork
+import queue
+import threading
+import numpy as np
 from data_loader import DataLoader
+from instrumentation import medir
+from dataset_manifest import DatasetManifest
+from inference import leer_artefacto
+from image_decode import ImagenFuente, remuestrear
+from image_pyramid import PiramideImagen
+from pipeline import procesar_imagen, TAMANO_GUARDADO
+from tiling import ClasificadorMosaico, superponer_mapa, resumen_regiones
+from model_registry import RegistroModelos
+from ensemble import ModeloConjunto
+from recursos import obtener_kernels, obtener_estadisticas
 
 class ApplicationApp(ttk.Frame):
     def __init__(self, master, carpeta_raiz, **kwargs):
@@ -17,6 +27,9 @@ class ApplicationApp(ttk.Frame):
         self.carpeta_raiz = carpeta_raiz
         self.modelo_path = os.path.join(self.carpeta_raiz, "models", "modelo_neural.pkl")
         self.estadisticas_path = os.path.join(self.carpeta_raiz, "models", "estadisticas.pkl")  # Ruta para estadísticas
+        self.registro = RegistroModelos.desde_carpeta(self.carpeta_raiz)
+        self.opciones_modelo = []  # (texto, modelo_path, estadisticas_path) de cada fila de la lista de modelos
+        self.conjunto_activo = False  # Con un conjunto no se vigila el modelo actual
         self.data_loader = DataLoader(
             imagenes_guardadas_json_ruta=os.path.join(
                 self.carpeta_raiz, "imagenes_procesadas", "imagenes_guardadas.json"
@@ -24,14 +37,29 @@ class ApplicationApp(ttk.Frame):
             image_size=(64, 64)  # Asegúrate de usar el mismo tamaño que en el entrenamiento
         )
 
-        # Cargar el modelo entrenado
+        # Cargar el modelo entrenado; se vigila el archivo para recargarlo en caliente
+        self.intervalo_vigilancia = 2000  # Milisegundos entre comprobaciones del modelo
+        self.cola_modelo = queue.Queue()
+        self.cargando_modelo = False
+        self.version_modelo = None
+        self.firma_modelo = self.firma_archivo_modelo()
         self.nn = self.cargar_modelo()
 
-        # Cargar las clases
+        # Cargar las estadísticas de normalización y las clases
         self.classes = self.cargar_clases()
 
         # Variables para almacenar la imagen actual y los kernels seleccionados
-        self.imagen_actual = None
+        self.imagen_actual = None  # Nivel de la pirámide sobre el que se procesa la vista previa
+        self.imagen_prediccion = None  # ((fuente, filtro, kernels), imagen procesada a resolución nativa)
+        # Clasificación en segundo plano: solo se muestra el resultado de la última solicitud
+        self.cola_clasificacion = queue.Queue()
+        self.solicitud_clasificacion = 0
+        self.solicitud_mostrada = 0
+        self.clasificacion_programada = None  # after() pendiente que lanzará la clasificación
+        self.esperando_clasificacion = False
+        self.espera_clasificacion = 250  # Milisegundos sin cambios antes de clasificar
+        self.imagen_fuente = None
+        self.piramide = None  # PiramideImagen con los niveles y las vistas en caché
         self.imagen_procesada = None
         self.kernels_aplicados = []
 
@@ -44,6 +72,7 @@ class ApplicationApp(ttk.Frame):
 
         # Variable para el filtro seleccionado
         self.selected_filtro = tk.StringVar(value='none')
+        self.modo_mosaico = tk.BooleanVar(value=False)  # Clasificar por regiones en fotos con varios peces
 
         # Ruta del archivo JSON de kernels
         self.ruta_json = os.path.join(self.carpeta_raiz, "data", "kernel.json")
@@ -59,35 +88,179 @@ class ApplicationApp(ttk.Frame):
         # Construir la interfaz gráfica
         self.construir_interfaz()
 
+        # Vigilar el archivo del modelo (la carga se hace en un hilo, el cambio en el hilo de Tk)
+        self.after(self.intervalo_vigilancia, self.vigilar_modelo)
+
     def cargar_modelo(self):
         """Carga el modelo entrenado desde el archivo."""
         if not os.path.exists(self.modelo_path):
             messagebox.showerror("Error", f"No se encontró el modelo entrenado en la ruta:\n{self.modelo_path}")
             return None
         else:
-            nn = NeuralNetwork.load_model(self.modelo_path)
+            nn, self.version_modelo = leer_artefacto(self.modelo_path)
+            print(f"Modelo cargado: versión {self.version_modelo}")
             return nn
 
-    def cargar_clases(self):
-        """Carga las clases desde el DataLoader."""
-        _, _, classes = self.data_loader.load_data()
-        return classes
+    def firma_archivo_modelo(self):
+        """Firma (mtime, tamaño) del modelo y de sus estadísticas para detectar cambios sin leerlos."""
+        firmas = []
+        for ruta in (self.modelo_path, self.estadisticas_path):
+            try:
+                estado = os.stat(ruta)
+                firmas.append((estado.st_mtime_ns, estado.st_size))
+            except FileNotFoundError:
+                firmas.append(None)
+        return tuple(firmas)
+
+    def refrescar_modelo(self):
+        """Recarga el modelo y las estadísticas si los archivos cambiaron (al volver a la pestaña)."""
+        self.actualizar_lista_modelos()
+        firma = self.firma_archivo_modelo()
+        if self.conjunto_activo or firma == self.firma_modelo or firma[0] is None:
+            return
+        self.firma_modelo = firma
+        nn, version = leer_artefacto(self.modelo_path)
+        self.instalar_modelo(nn, version)
 
-    def cargar_kernels(self):
-        """Carga los kernels desde el archivo JSON."""
-        if not os.path.exists(self.ruta_json):
-            raise FileNotFoundError(f"No se encontró el archivo JSON en la ruta especificada:\n{self.ruta_json}")
+    def vigilar_modelo(self):
+        """Comprobación periódica: instala un modelo ya validado o lanza la carga de uno nuevo."""
+        try:
+            firma, nn, version = self.cola_modelo.get_nowait()
+            self.cargando_modelo = False
+            if nn is not None and firma == self.firma_archivo_modelo():
+                self.instalar_modelo(nn, version)
+            elif nn is None:
+                print(f"Advertencia: No se pudo recargar el modelo, se mantiene la versión {self.version_modelo}: {version}")
+        except queue.Empty:
+            pass
+        firma = self.firma_archivo_modelo()
+        if firma != self.firma_modelo and firma[0] is not None and not self.cargando_modelo and not self.conjunto_activo:
+            self.firma_modelo = firma
+            self.cargando_modelo = True
+            threading.Thread(target=self.cargar_modelo_en_segundo_plano, args=(firma,), daemon=True).start()
+        self.after(self.intervalo_vigilancia, self.vigilar_modelo)
+
+    def cargar_modelo_en_segundo_plano(self, firma):
+        """Carga y valida el modelo nuevo fuera del hilo de Tk; el resultado se entrega por la cola."""
+        try:
+            nn, version = leer_artefacto(self.modelo_path)
+            probabilidades = nn.predict_proba(np.zeros((1, nn.input_size)))
+            if not np.all(np.isfinite(probabilidades)):
+                raise ValueError("El modelo produce salidas no válidas (NaN o infinito).")
+            self.cola_modelo.put((firma, nn, version))
+        except Exception as e:
+            self.cola_modelo.put((firma, None, str(e)))
 
-        with open(self.ruta_json, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def instalar_modelo(self, nn, version):
+        """Cambia al modelo nuevo (en el hilo de Tk, entre dos predicciones)."""
+        self.nn = nn
+        self.version_modelo = version
+        self.classes = self.cargar_clases()
+        self.lbl_resultado.config(text=f"Modelo actualizado a la versión {version}")
+        print(f"Modelo actualizado desde {self.modelo_path}: versión {version}")
 
-        if 'kernels' not in data:
-            raise KeyError("La clave 'kernels' no se encontró en el archivo JSON.")
+    def actualizar_lista_modelos(self):
+        """Rellena la lista con el modelo actual y las versiones del registro."""
+        if not hasattr(self, 'lista_modelos'):
+            return
+        actual = os.path.join(self.carpeta_raiz, "models")
+        opciones = [("Modelo actual (models/modelo_neural.pkl)",
+                     os.path.join(actual, "modelo_neural.pkl"), os.path.join(actual, "estadisticas.pkl"))]
+        try:
+            for datos in reversed(self.registro.listar()):
+                precision = datos.get('precision_validacion')
+                texto = f"{datos['id']} · {datos['arquitectura']['tipo']}"
+                if precision is not None:
+                    texto += f" · {precision * 100:.2f}%"
+                if datos['etiquetas']:
+                    texto += f" [{', '.join(datos['etiquetas'])}]"
+                opciones.append((texto, *self.registro.rutas(datos['id'])))
+        except Exception as e:
+            print(f"Advertencia: No se pudo leer el registro de modelos: {e}")
+        if [opcion[0] for opcion in opciones] == [opcion[0] for opcion in self.opciones_modelo]:
+            return
+        self.opciones_modelo = opciones
+        self.lista_modelos.delete(0, tk.END)
+        for texto, _, _ in opciones:
+            self.lista_modelos.insert(tk.END, texto)
+
+    def usar_modelos_seleccionados(self):
+        """Usa el modelo seleccionado o, si hay varios, un conjunto que promedia sus probabilidades."""
+        seleccion = [self.opciones_modelo[i] for i in self.lista_modelos.curselection()]
+        if not seleccion:
+            messagebox.showwarning("Sin Selección", "Selecciona uno o varios modelos de la lista.")
+            return
+        try:
+            if len(seleccion) == 1:
+                _, self.modelo_path, self.estadisticas_path = seleccion[0]
+                self.conjunto_activo = False
+                self.firma_modelo = self.firma_archivo_modelo()
+                self.instalar_modelo(*leer_artefacto(self.modelo_path))
+                return
 
-        self.kernels = data['kernels']
-        if not self.kernels:
-            raise ValueError("La lista de kernels está vacía en el archivo JSON.")
-        print(f"Se cargaron {len(self.kernels)} kernels desde el archivo JSON.")
+            modelos, versiones = [], []
+            estadisticas = [obtener_estadisticas(estadisticas_path) for _, _, estadisticas_path in seleccion]
+            for _, modelo_path, _ in seleccion:
+                modelo, version = leer_artefacto(modelo_path)
+                modelos.append(modelo)
+                versiones.append(version)
+            # La aplicación prepara una sola entrada: el conjunto necesita el mismo preprocesamiento en todos
+            base = estadisticas[0]
+            compatibles = all(
+                e.get('extractor') is None and list(e['classes']) == list(base['classes'])
+                and e.get('filter', 'none') == base.get('filter', 'none')
+                and list(e.get('kernels_applied', [])) == list(base.get('kernels_applied', []))
+                and np.array_equal(e['mean'], base['mean']) and np.array_equal(e['std'], base['std'])
+                for e in estadisticas)
+            if not compatibles:
+                messagebox.showerror(
+                    "Conjunto no Compatible",
+                    "Los modelos seleccionados usan clases, filtros, kernels o normalizaciones distintos.\n"
+                    "Ese conjunto puede usarse en los modos por lotes (--modelos en inference_server.py, "
+                    "watch_folder.py o video_stream.py).")
+                return
+            conjunto = ModeloConjunto(modelos)
+            self.modelo_path, self.estadisticas_path = seleccion[0][1], seleccion[0][2]
+            self.conjunto_activo = True
+            self.instalar_modelo(conjunto, "+".join(versiones))
+        except Exception as e:
+            messagebox.showerror("Error al Cargar Modelo", f"Ocurrió un error al cargar los modelos seleccionados:\n{e}")
+
+    def cargar_clases(self):
+        """
+        Carga las clases y la normalización guardadas junto al modelo en estadisticas.pkl.
+        Si no están disponibles, toma las clases del índice del manifiesto sin leer imágenes.
+        """
+        estadisticas = {}
+        if os.path.exists(self.estadisticas_path):
+            estadisticas = obtener_estadisticas(self.estadisticas_path)
+
+        mean = estadisticas.get('mean')
+        input_size = self.nn.input_size if self.nn is not None else None
+        # Modelo entrenado con características compactas: el extractor guardado sustituye a la normalización
+        extractor = estadisticas.get('extractor')
+        if extractor is not None and extractor.dimension == input_size:
+            self.data_loader.feature_extractor = extractor
+        else:
+            self.data_loader.feature_extractor = None
+        if self.data_loader.feature_extractor is not None:
+            self.data_loader.mean = None
+            self.data_loader.std = None
+        elif mean is not None and len(mean) == input_size:
+            self.data_loader.mean = estadisticas['mean']
+            self.data_loader.std = estadisticas['std']
+        else:
+            print("Advertencia: Las estadísticas de normalización no corresponden al modelo actual.")
+            self.data_loader.mean = None
+            self.data_loader.std = None
+
+        if estadisticas.get('classes'):
+            return list(estadisticas['classes'])
+        return DatasetManifest(self.data_loader.imagenes_guardadas_json_ruta).clases()
+
+    def cargar_kernels(self):
+        """Carga los kernels desde el archivo JSON (compartidos por todo el proceso)."""
+        self.kernels = obtener_kernels(self.ruta_json)
 
     def cargar_filtros(self):
         """Define los filtros disponibles."""
@@ -116,6 +289,19 @@ class ApplicationApp(ttk.Frame):
         btn_cargar_imagen = ttk.Button(main_frame, text="Cargar Imagen", command=self.cargar_imagen)
         btn_cargar_imagen.pack(pady=5)
 
+        # Clasificación por regiones para fotos grandes con varios peces
+        chk_mosaico = ttk.Checkbutton(main_frame, text="Clasificación por regiones (mosaico)",
+                                      variable=self.modo_mosaico, command=self.actualizar_imagen)
+        chk_mosaico.pack(pady=2)
+
+        # Modelo o conjunto de modelos del registro (selección múltiple = conjunto)
+        frame_modelo = ttk.LabelFrame(main_frame, text="Modelo (selección múltiple = conjunto)", padding=5)
+        frame_modelo.pack(fill=tk.X, padx=10, pady=2)
+        self.lista_modelos = tk.Listbox(frame_modelo, selectmode=tk.EXTENDED, height=3, exportselection=False)
+        self.lista_modelos.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(frame_modelo, text="Usar Selección", command=self.usar_modelos_seleccionados).pack(side=tk.LEFT, padx=5)
+        self.actualizar_lista_modelos()
+
         # Frame para las imágenes y la predicción
         frame_imagenes = ttk.Frame(main_frame)
         frame_imagenes.pack(pady=10, fill=tk.BOTH, expand=True)
@@ -202,8 +388,12 @@ class ApplicationApp(ttk.Frame):
             return
 
         try:
-            # Cargar la imagen en PIL
-            self.imagen_actual = Image.open(ruta_imagen).convert("RGB")  # Asegurarse de que está en RGB
+            # Cargar la imagen en PIL: la vista previa trabaja sobre el nivel más pequeño de la
+            # pirámide que cubre el tamaño de pantalla; la predicción usa la resolución nativa
+            self.imagen_fuente = ImagenFuente(ruta_imagen)
+            self.piramide = PiramideImagen(self.imagen_fuente)
+            self.imagen_prediccion = None  # Liberar la imagen procesada de la foto anterior
+            self.imagen_actual = self.piramide.nivel_para((550, 350))
             self.imagen_procesada = self.imagen_actual.copy()  # Iniciar la imagen procesada como una copia
             self.restablecer_kernels_y_filtro()
             self.actualizar_imagen()  # Llamar para mostrar la imagen cargada según el estado del filtro
@@ -216,20 +406,19 @@ class ApplicationApp(ttk.Frame):
         imagenes_json_ruta = os.path.join(
             self.carpeta_raiz, "imagenes_procesadas", "imagenes_guardadas.json"
         )
-        if not os.path.exists(imagenes_json_ruta):
+        manifest = DatasetManifest(imagenes_json_ruta)
+        if not manifest.existe():
             messagebox.showerror("Error", f"No se encontró el archivo JSON de imágenes en la ruta especificada:\n{imagenes_json_ruta}")
             return
 
-        with open(imagenes_json_ruta, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if not data:
+        primera = next(iter(manifest), None)
+        if primera is None:
             messagebox.showerror("Error", "El archivo JSON de imágenes está vacío.")
             return
 
         # Asumimos que todas las imágenes tienen los mismos kernels y filtro aplicados
-        kernels_usados = data[0].get('kernels_applied', [])
-        filtro_usado = data[0].get('filter', 'none')
+        kernels_usados = primera.get('kernels_applied', [])
+        filtro_usado = primera.get('filter', 'none')
 
         # Restablecer los kernels seleccionados
         for kernel in self.kernels:
@@ -296,17 +485,19 @@ class ApplicationApp(ttk.Frame):
             # Aplicar los kernels seleccionados
             self.aplicar_kernels()
 
-            # Mostrar la imagen original
-            imagen_original_pil = self.redimensionar_imagen(self.imagen_actual, (550, 350))
-            self.imagen_original_tk = ImageTk.PhotoImage(imagen_original_pil)
-            self.canvas_original.create_image(0, 0, anchor=tk.NW, image=self.imagen_original_tk)
-            self.canvas_original.update()
+            with medir('render'):
+                # Mostrar la imagen original
+                # PhotoImage del original en caché: no cambia al tocar filtros o kernels
+                self.imagen_original_tk = self.piramide.en_cache(
+                    ('foto', 'original'), lambda: ImageTk.PhotoImage(self.piramide.vista((550, 350))))
+                self.canvas_original.create_image(0, 0, anchor=tk.NW, image=self.imagen_original_tk)
+                self.canvas_original.update()
 
-            # Mostrar la imagen procesada
-            imagen_procesada_pil = self.redimensionar_imagen(self.imagen_procesada, (550, 350))
-            self.imagen_procesada_tk = ImageTk.PhotoImage(imagen_procesada_pil)
-            self.canvas_procesada.create_image(0, 0, anchor=tk.NW, image=self.imagen_procesada_tk)
-            self.canvas_procesada.update()
+                # Mostrar la imagen procesada
+                imagen_procesada_pil = self.redimensionar_imagen(self.imagen_procesada, (550, 350))
+                self.imagen_procesada_tk = ImageTk.PhotoImage(imagen_procesada_pil)
+                self.canvas_procesada.create_image(0, 0, anchor=tk.NW, image=self.imagen_procesada_tk)
+                self.canvas_procesada.update()
 
             # Realizar la predicción
             self.procesar_y_clasificar_imagen()
@@ -357,29 +548,105 @@ class ApplicationApp(ttk.Frame):
                 return
 
     def redimensionar_imagen(self, imagen_pil, tamaño):
-        """Redimensiona una imagen PIL manteniendo la relación de aspecto."""
-        return imagen_pil.resize(tamaño, Image.LANCZOS)
+        """Redimensiona una imagen PIL para la vista previa (remuestreo rápido)."""
+        return remuestrear(imagen_pil, tamaño, 'vista_previa')
+
+    def imagen_para_prediccion(self, fuente, filtro, kernels):
+        """
+        Aplica los kernels y el filtro a la imagen a resolución nativa, como el Tratamiento
+        de Imágenes y PipelineInferencia; se reutiliza mientras no cambien imagen, filtro o kernels.
+        Se llama desde el hilo de clasificación.
+        """
+        clave = (fuente, filtro, tuple(k['name'] for k in kernels))
+        guardada = self.imagen_prediccion
+        if guardada is not None and guardada[0] == clave:
+            return guardada[1]
+        imagen = procesar_imagen(fuente.completa(), filtro, kernels)
+        self.imagen_prediccion = (clave, imagen)
+        return imagen
 
     def procesar_y_clasificar_imagen(self):
-        """Prepara la imagen para la predicción y realiza la clasificación."""
+        """
+        Programa la clasificación de la imagen actual. El pipeline a resolución nativa
+        y la predicción corren en un hilo tras una breve pausa (varios cambios seguidos
+        de filtro o kernels lanzan una sola clasificación); el resultado vuelve por la
+        cola y se muestra en el hilo de Tk.
+        """
         if self.imagen_procesada is None or self.nn is None:
             return
+        if self.clasificacion_programada is not None:
+            self.after_cancel(self.clasificacion_programada)
+        self.solicitud_clasificacion += 1
+        self.lbl_resultado.config(text="Clasificando...")
+        self.clasificacion_programada = self.after(self.espera_clasificacion, self.lanzar_clasificacion)
+
+    def lanzar_clasificacion(self):
+        """Toma el estado actual de la interfaz y clasifica en un hilo separado."""
+        self.clasificacion_programada = None
+        seleccion = [var.get() for var in self.check_vars]
+        kernels = [k for k, seleccionado in zip(self.kernels, seleccion) if seleccionado]
+        argumentos = (self.solicitud_clasificacion, self.imagen_fuente, self.selected_filtro.get(), kernels,
+                      self.modo_mosaico.get(), self.nn, self.version_modelo)
+        threading.Thread(target=self.clasificar_en_segundo_plano, args=argumentos, daemon=True).start()
+        if not self.esperando_clasificacion:
+            self.esperando_clasificacion = True
+            self.after(50, self.revisar_clasificacion)
+
+    def clasificar_en_segundo_plano(self, solicitud, fuente, filtro, kernels, mosaico, nn, version):
+        """Clasifica fuera del hilo de Tk; el resultado (o el error) se entrega por la cola."""
+        try:
+            imagen = self.imagen_para_prediccion(fuente, filtro, kernels)
+            if solicitud != self.solicitud_clasificacion:
+                return  # La interfaz ya cambió: no vale la pena predecir
+            if mosaico:
+                # Las ventanas se extraen de la imagen a resolución nativa; el mapa se dibuja sobre la vista previa
+                resultado = ClasificadorMosaico(nn, self.data_loader).clasificar(imagen)
+            else:
+                # Preparar la imagen para la predicción igual que las imágenes guardadas del dataset:
+                # pipeline a resolución nativa, reducción a TAMANO_GUARDADO y después al tamaño del modelo
+                # (escalado a [0, 1] y normalizado con las estadísticas del entrenamiento)
+                imagen = remuestrear(imagen, TAMANO_GUARDADO, 'exportacion')
+                input_data = self.data_loader.load_single_image(imagen).reshape(1, -1)
+                prediction, confidence = nn.predict(input_data)
+                resultado = (int(prediction[0]), float(confidence[0]))
+            self.cola_clasificacion.put((solicitud, mosaico, resultado, version))
+        except Exception as e:
+            self.cola_clasificacion.put((solicitud, mosaico, e, version))
 
+    def revisar_clasificacion(self):
+        """Muestra el resultado de la clasificación más reciente; descarta los de solicitudes anteriores."""
         try:
-            # Preparar la imagen para la predicción
-            # Usar el mismo tamaño que durante el entrenamiento
-            imagen_para_prediccion = self.imagen_procesada.resize((64, 64), Image.LANCZOS).convert("RGB")
-            input_data = np.array(imagen_para_prediccion).reshape(1, -1).astype(np.float32)
+            while True:
+                solicitud, mosaico, resultado, version = self.cola_clasificacion.get_nowait()
+                if solicitud != self.solicitud_clasificacion:
+                    continue
+                self.solicitud_mostrada = solicitud
+                if isinstance(resultado, Exception):
+                    messagebox.showerror("Error en Predicción", f"Ocurrió un error al realizar la predicción:\n{resultado}")
+                    self.lbl_resultado.config(text="Error en la predicción.")
+                elif mosaico:
+                    self.mostrar_regiones(resultado, version)
+                else:
+                    indice, confianza = resultado
+                    self.lbl_resultado.config(text=f"Pez Predicho: {self.classes[indice]} ({confianza * 100:.3f}% de confianza) · modelo {version}")
+        except queue.Empty:
+            pass
+        if self.solicitud_mostrada != self.solicitud_clasificacion:
+            self.after(50, self.revisar_clasificacion)
+        else:
+            self.esperando_clasificacion = False
 
-            # Realizar la predicción
-            prediction, confidence = self.nn.predict(input_data)
-            clase_predicha = self.classes[prediction[0]]
-            confianza = confidence[0] * 100
+    def mostrar_regiones(self, resultado, version):
+        """Superpone el mapa de clases del mosaico en la vista previa procesada y resume las regiones."""
+        with medir('render'):
+            imagen_mapa = superponer_mapa(self.redimensionar_imagen(self.imagen_procesada, (550, 350)), resultado)
+            self.imagen_procesada_tk = ImageTk.PhotoImage(imagen_mapa)
+            self.canvas_procesada.create_image(0, 0, anchor=tk.NW, image=self.imagen_procesada_tk)
 
-            # Mostrar el resultado
-            self.lbl_resultado.config(text=f"Pez Predicho: {clase_predicha} ({confianza:.3f}% de confianza)")
-        except Exception as e:
-            messagebox.showerror("Error en Predicción", f"Ocurrió un error al realizar la predicción:\n{e}")
+        regiones = resumen_regiones(resultado, self.classes)
+        detalle = ", ".join(f"{clase} {fraccion * 100:.0f}%" for clase, fraccion in regiones) or "sin regiones confiables"
+        self.lbl_resultado.config(text=f"Regiones: {detalle} · {resultado['ventanas']} ventanas en "
+                                       f"{resultado['tiempo_s'] * 1000:.0f} ms · modelo {version}")
 
 if __name__ == "__main__":
     root = tk.Tk()
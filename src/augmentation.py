@@ -0,0 +1,136 @@
+# src/augmentation.py
+
+import numpy as np
+
+class AugmentationPolicy:
+    def __init__(self, p_rotacion=0.5, rango_rotacion=(-30.0, 30.0),
+                 p_volteo=0.5,
+                 p_brillo=0.5, rango_brillo=(0.7, 1.3),
+                 p_contraste=0.5, rango_contraste=(0.7, 1.3),
+                 p_recorte=0.5, rango_recorte=(0.8, 1.0),
+                 seed=None):
+        """
+        Política de data augmentation aleatoria aplicada por mini-lote.
+
+        Parámetros:
+            - p_*: Probabilidad de aplicar cada transformación a una muestra.
+            - rango_rotacion: Ángulos mínimo y máximo en grados.
+            - rango_brillo / rango_contraste: Factores mínimo y máximo.
+            - rango_recorte: Fracción mínima y máxima del lado que se conserva en el recorte.
+            - seed: Semilla del generador aleatorio (reproducibilidad).
+        """
+        self.p_rotacion = p_rotacion
+        self.rango_rotacion = rango_rotacion
+        self.p_volteo = p_volteo
+        self.p_brillo = p_brillo
+        self.rango_brillo = rango_brillo
+        self.p_contraste = p_contraste
+        self.rango_contraste = rango_contraste
+        self.p_recorte = p_recorte
+        self.rango_recorte = rango_recorte
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, batch, rng=None):
+        return self.apply(batch, rng)
+
+    def apply(self, batch, rng=None):
+        """
+        Aplica la política a un lote de imágenes.
+
+        Parámetros:
+            - batch: Arreglo (N, alto, ancho, canales) en el rango [0, 1].
+            - rng: Generador opcional; si no se indica se usa el de la política.
+
+        Retorna un nuevo arreglo float32 con las imágenes transformadas.
+        """
+        rng = self.rng if rng is None else rng
+        batch = np.asarray(batch, dtype=np.float32)
+        n = batch.shape[0]
+        if n == 0:
+            return batch
+
+        batch = self._transformacion_geometrica(batch, rng)
+
+        # Brillo: multiplicar por un factor
+        factores = self._factores(rng, n, self.p_brillo, self.rango_brillo)
+        batch = batch * factores[:, None, None, None]
+
+        # Contraste: escalar respecto a la media de cada canal de cada imagen; un canal
+        # anulado por el filtro (todo ceros) tiene media 0 y sigue siendo 0
+        factores = self._factores(rng, n, self.p_contraste, self.rango_contraste)
+        media = batch.mean(axis=(1, 2), keepdims=True)
+        batch = (batch - media) * factores[:, None, None, None] + media
+
+        return np.clip(batch, 0.0, 1.0, out=batch)
+
+    def _factores(self, rng, n, probabilidad, rango):
+        """Devuelve un factor por muestra (1.0 para las muestras no seleccionadas)."""
+        aplicar = rng.random(n) < probabilidad
+        valores = rng.uniform(rango[0], rango[1], n)
+        return np.where(aplicar, valores, 1.0).astype(np.float32)
+
+    def _transformacion_geometrica(self, batch, rng):
+        """
+        Aplica rotación, volteo horizontal y recorte aleatorio en un solo remuestreo
+        (vecino más cercano) vectorizado sobre todo el lote.
+        """
+        n, alto, ancho = batch.shape[:3]
+
+        rotar = rng.random(n) < self.p_rotacion
+        angulos = np.where(rotar, rng.uniform(*self.rango_rotacion, n), 0.0)
+        voltear = rng.random(n) < self.p_volteo
+        recortar = rng.random(n) < self.p_recorte
+        escalas = np.where(recortar, rng.uniform(*self.rango_recorte, n), 1.0)
+
+        if not (rotar.any() or voltear.any() or recortar.any()):
+            return batch
+
+        # El recorte conserva una ventana de lado `escala` desplazada aleatoriamente
+        margen = 1.0 - escalas
+        desplaz_y = (rng.random(n) - 0.5) * margen * alto
+        desplaz_x = (rng.random(n) - 0.5) * margen * ancho
+
+        # Coordenadas de salida centradas
+        cy, cx = (alto - 1) / 2.0, (ancho - 1) / 2.0
+        ys, xs = np.meshgrid(np.arange(alto) - cy, np.arange(ancho) - cx, indexing='ij')
+        xs = np.where(voltear[:, None, None], -xs, xs)
+
+        # Transformación inversa: salida -> fuente
+        theta = np.deg2rad(angulos)[:, None, None]
+        cos, sin = np.cos(theta), np.sin(theta)
+        escalas = escalas[:, None, None]
+        src_y = (sin * xs + cos * ys) * escalas + cy + desplaz_y[:, None, None]
+        src_x = (cos * xs - sin * ys) * escalas + cx + desplaz_x[:, None, None]
+
+        src_y = np.rint(src_y).astype(np.intp)
+        src_x = np.rint(src_x).astype(np.intp)
+        fuera = (src_y < 0) | (src_y >= alto) | (src_x < 0) | (src_x >= ancho)
+        np.clip(src_y, 0, alto - 1, out=src_y)
+        np.clip(src_x, 0, ancho - 1, out=src_x)
+
+        indices = np.arange(n)[:, None, None]
+        resultado = batch[indices, src_y, src_x]
+        # Las zonas que quedan fuera de la imagen tras rotar se rellenan con negro,
+        # igual que Image.rotate
+        resultado[fuera] = 0.0
+        return resultado
+
+# Políticas con nombre (parámetros de AugmentationPolicy) para la búsqueda de hiperparámetros
+POLITICAS = {
+    'ninguna': None,
+    'suave': {
+        'p_rotacion': 0.3, 'rango_rotacion': (-15.0, 15.0),
+        'p_brillo': 0.3, 'rango_brillo': (0.85, 1.15),
+        'p_contraste': 0.3, 'rango_contraste': (0.85, 1.15),
+        'p_recorte': 0.3, 'rango_recorte': (0.9, 1.0),
+    },
+    'fuerte': {},  # Valores por defecto de AugmentationPolicy
+}
+
+def crear_politica(nombre, seed=None):
+    """Crea la política con nombre ('ninguna', 'suave' o 'fuerte'); 'ninguna' devuelve None."""
+    if nombre not in POLITICAS:
+        raise ValueError(f"Política de augmentation desconocida: {nombre}. Opciones: {', '.join(POLITICAS)}")
+    parametros = POLITICAS[nombre]
+    return None if parametros is None else AugmentationPolicy(**parametros, seed=seed)
@@ -0,0 +1,254 @@
+# src/benchmark.py
+
+"""
+Suite de benchmarks sin interfaz gráfica para el pipeline de clasificación.
+
+Genera peces sintéticos con distintos tamaños de dataset y resoluciones, mide
+cada etapa (decodificación, augmentation, normalización, época de
+entrenamiento, predicción por lotes y cadena de kernels) y la memoria pico, y
+escribe los resultados en JSON para compararlos entre commits.
+
+Las imágenes sintéticas se guardan a la resolución de origen, así que la
+resolución del caso pesa en la decodificación y en la cadena de kernels; las
+demás etapas trabajan, como en el entrenamiento real, sobre imágenes ya
+reducidas a --tamano-imagen.
+
+Uso:
+    python src/benchmark.py --salida bench.json
+    python src/benchmark.py --salida nuevo.json --comparar bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import numpy as np
+from PIL import Image, ImageDraw
+from data_loader import DataLoader, STD_MINIMA
+from dataset_manifest import DatasetManifest
+from image_store import guardar_imagen_en_almacen
+from neural_network import NeuralNetwork
+from pipeline import aplicar_kernels
+
+CLASES_SINTETICAS = {
+    # clase: (color del cuerpo, color de la aleta)
+    'Cirujano': ((30, 60, 200), (240, 220, 40)),
+    'Trucha Arcoíris': ((170, 170, 160), (230, 120, 150)),
+}
+
+def generar_pez(rng, clase, resolucion):
+    """Dibuja un pez sintético de la clase indicada sobre un fondo con ruido."""
+    ancho, alto = resolucion
+    color_cuerpo, color_aleta = CLASES_SINTETICAS[clase]
+    fondo = rng.integers(0, 80, size=(alto, ancho, 3), dtype=np.uint8)
+    fondo[..., 2] = np.clip(fondo[..., 2].astype(int) + 80, 0, 255)  # Agua azulada
+    imagen = Image.fromarray(fondo)
+    draw = ImageDraw.Draw(imagen)
+
+    largo = ancho * rng.uniform(0.35, 0.6)
+    grosor = largo * rng.uniform(0.3, 0.45)
+    cx = ancho * rng.uniform(0.35, 0.65)
+    cy = alto * rng.uniform(0.35, 0.65)
+    variacion = rng.integers(-25, 25, size=3)
+    cuerpo = tuple(int(np.clip(c + v, 0, 255)) for c, v in zip(color_cuerpo, variacion))
+
+    draw.ellipse([cx - largo / 2, cy - grosor / 2, cx + largo / 2, cy + grosor / 2], fill=cuerpo)
+    cola_x = cx + largo / 2
+    draw.polygon([(cola_x - largo * 0.05, cy), (cola_x + largo * 0.3, cy - grosor * 0.6),
+                  (cola_x + largo * 0.3, cy + grosor * 0.6)], fill=color_aleta)
+    ojo = grosor * 0.12
+    ojo_x = cx - largo * 0.3
+    draw.ellipse([ojo_x - ojo, cy - ojo, ojo_x + ojo, cy + ojo], fill=(10, 10, 10))
+
+    if rng.random() < 0.5:
+        imagen = imagen.transpose(Image.FLIP_LEFT_RIGHT)
+    return imagen
+
+def generar_dataset_sintetico(carpeta, cantidad, resolucion, seed=0, formato="JPEG"):
+    """
+    Genera un dataset sintético (almacén + manifiesto) y devuelve la ruta del JSON.
+
+    Las imágenes se guardan a la resolución de origen pedida (JPEG por defecto,
+    como las fotos reales), así que decodificación, augmentation, entrenamiento
+    y predicción dependen de verdad de la resolución del caso.
+    """
+    rng = np.random.default_rng(seed)
+    clases = list(CLASES_SINTETICAS)
+    manifest = DatasetManifest(os.path.join(carpeta, "imagenes_guardadas.json"))
+    entradas = []
+    for i in range(cantidad):
+        clase = clases[i % len(clases)]
+        imagen = generar_pez(rng, clase, resolucion)
+        entradas.append({
+            **guardar_imagen_en_almacen(imagen, carpeta, formato),
+            'filter': 'none',
+            'kernels_applied': [],
+            'tipo_pez': clase
+        })
+    manifest.agregar_varias(entradas)
+    return manifest.ruta_json
+
+def medir(funcion, repeticiones=3):
+    """Ejecuta una etapa varias veces y devuelve tiempos (s) y memoria pico (bytes)."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    # La memoria se mide en una ejecución aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    funcion()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'min_s': min(tiempos),
+        'mediana_s': statistics.median(tiempos),
+        'memoria_pico_bytes': pico
+    }, resultado
+
+def verificar_lote_acotado(X):
+    """
+    Comprueba que un lote aumentado y normalizado es finito y acotado: con píxeles
+    en [0, 1] y std >= STD_MINIMA ningún valor puede superar 1 / STD_MINIMA.
+    """
+    maximo = float(np.abs(X).max()) if len(X) else 0.0
+    if not np.isfinite(maximo) or maximo > 1.0 / STD_MINIMA:
+        raise RuntimeError(f"Lote normalizado fuera de rango (máximo |x| = {maximo:.3g}); revise la augmentation y std.")
+    return maximo
+
+def cargar_kernels(cantidad):
+    """Carga los primeros kernels de data/kernel.json para la cadena de kernels."""
+    ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "kernel.json")
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)['kernels'][:cantidad]
+
+def ejecutar_caso(carpeta, cantidad, resolucion, args):
+    """Ejecuta todas las etapas para un tamaño de dataset y una resolución de origen."""
+    etapas = {}
+    json_ruta = generar_dataset_sintetico(carpeta, cantidad, resolucion, seed=args.seed, formato=args.formato)
+    image_size = (args.tamano_imagen, args.tamano_imagen)
+
+    data_loader = DataLoader(json_ruta, image_size=image_size, augment_data=True, seed=args.seed)
+    etapas['decode'], (images, labels, classes) = medir(
+        lambda: _silencioso(data_loader.load_data), args.repeticiones)
+    etapas['decode']['imagenes_por_s'] = cantidad / etapas['decode']['min_s']
+
+    lote = images[:args.batch_size]
+    etapas['augment'], _ = medir(
+        lambda: data_loader.augmentation_policy.apply(np.asarray(lote, dtype=np.float32) / 255.0), args.repeticiones)
+    etapas['normalize'], _ = medir(lambda: data_loader.prepare_batch(lote, augment=False), args.repeticiones)
+    etapas['normalize']['max_abs_aumentado'] = verificar_lote_acotado(data_loader.prepare_batch(lote, augment=True))
+
+    input_size = int(np.prod(images.shape[1:]))
+    np.random.seed(args.seed)
+    nn = NeuralNetwork(input_size, args.hidden_size, len(classes), learning_rate=0.001)
+
+    def epoca():
+        for X_batch, y_batch in data_loader.iter_batches(images, labels, args.batch_size):
+            nn.train_step(X_batch, y_batch)
+
+    etapas['train_epoch'], _ = medir(epoca, args.repeticiones)
+    etapas['train_epoch']['muestras_por_s'] = cantidad / etapas['train_epoch']['min_s']
+
+    X_pred = data_loader.prepare_batch(images[:args.batch_size], augment=False)
+    etapas['predict_batch'], _ = medir(lambda: nn.predict(X_pred), args.repeticiones)
+
+    kernels = cargar_kernels(args.kernels)
+    origen = generar_pez(np.random.default_rng(args.seed), 'Cirujano', resolucion)
+    etapas['kernel_chain'], _ = medir(lambda: aplicar_kernels(origen, kernels), args.repeticiones)
+
+    return {
+        'cantidad': cantidad,
+        'resolucion': list(resolucion),
+        'formato': args.formato,
+        'etapas': etapas
+    }
+
+def _silencioso(funcion):
+    """Ejecuta una función suprimiendo sus print por imagen."""
+    with open(os.devnull, 'w') as nulo:
+        salida = sys.stdout
+        sys.stdout = nulo
+        try:
+            return funcion()
+        finally:
+            sys.stdout = salida
+
+def commit_actual():
+    """Devuelve el hash del commit actual, si hay git disponible."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def comparar(actual, base):
+    """Imprime la aceleración por etapa respecto a otro archivo de resultados."""
+    indice_base = {(c['cantidad'], tuple(c['resolucion'])): c for c in base['casos']}
+    for caso in actual['casos']:
+        clave = (caso['cantidad'], tuple(caso['resolucion']))
+        if clave not in indice_base:
+            continue
+        print(f"Caso {clave[0]} imágenes, {clave[1][0]}x{clave[1][1]}:")
+        for etapa, medida in caso['etapas'].items():
+            anterior = indice_base[clave]['etapas'].get(etapa)
+            if anterior is None:
+                continue
+            aceleracion = anterior['min_s'] / max(medida['min_s'], 1e-12)
+            print(f"  {etapa:<14} {anterior['min_s'] * 1000:10.2f} ms -> {medida['min_s'] * 1000:10.2f} ms  (x{aceleracion:.2f})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de clasificación de peces.")
+    parser.add_argument("--cantidades", type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument("--resoluciones", nargs='+', default=["320x240", "1280x960"])
+    parser.add_argument("--formato", choices=["JPEG", "PNG"], default="JPEG",
+                        help="Formato en que se guardan las imágenes sintéticas a la resolución de origen.")
+    parser.add_argument("--tamano-imagen", type=int, default=64)
+    parser.add_argument("--hidden-size", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--kernels", type=int, default=3, help="Número de kernels en la cadena.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", default="bench_output.json")
+    parser.add_argument("--comparar", default=None, help="Archivo de resultados previo para comparar.")
+    args = parser.parse_args()
+
+    resultados = {
+        'commit': commit_actual(),
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'parametros': vars(args),
+        'casos': []
+    }
+
+    for resolucion_txt in args.resoluciones:
+        resolucion = tuple(int(v) for v in resolucion_txt.lower().split('x'))
+        for cantidad in args.cantidades:
+            carpeta = tempfile.mkdtemp(prefix="peces_bench_")
+            try:
+                print(f"Ejecutando caso: {cantidad} imágenes, {resolucion_txt}...")
+                resultados['casos'].append(ejecutar_caso(carpeta, cantidad, resolucion, args))
+            finally:
+                shutil.rmtree(carpeta, ignore_errors=True)
+
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=4)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(resultados, json.load(f))
+
+if __name__ == "__main__":
+    main()
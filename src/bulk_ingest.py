@@ -0,0 +1,86 @@
+# src/bulk_ingest.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from pipeline import procesar_imagen, TAMANO_GUARDADO
+from image_store import guardar_imagen_en_almacen
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+def listar_trabajos(carpeta, clase_por_defecto):
+    """
+    Lista las imágenes a ingestar como pares (ruta, clase).
+
+    Las imágenes dentro de subcarpetas toman el nombre de la subcarpeta como
+    clase; las que están directamente en la carpeta usan la clase por defecto.
+    """
+    trabajos = []
+    for entrada in sorted(os.scandir(carpeta), key=lambda e: e.name):
+        if entrada.is_dir():
+            for sub in sorted(os.scandir(entrada.path), key=lambda e: e.name):
+                if sub.is_file() and sub.name.lower().endswith(EXTENSIONES_IMAGEN):
+                    trabajos.append((sub.path, entrada.name))
+        elif entrada.is_file() and entrada.name.lower().endswith(EXTENSIONES_IMAGEN):
+            trabajos.append((entrada.path, clase_por_defecto))
+    return trabajos
+
+def procesar_archivo(ruta_origen, clase, carpeta_guardado, filtro, kernels):
+    """Procesa una imagen con el pipeline actual, la guarda a 100x100 y devuelve su entrada del manifiesto."""
+    imagen = Image.open(ruta_origen).convert("RGB")
+    imagen = procesar_imagen(imagen, filtro, kernels)
+    imagen = imagen.resize(TAMANO_GUARDADO, Image.LANCZOS)
+
+    return {
+        **guardar_imagen_en_almacen(imagen, carpeta_guardado),
+        'filter': filtro,
+        'kernels_applied': [k['name'] for k in kernels],
+        'tipo_pez': clase,
+        'source': ruta_origen
+    }
+
+def _procesar_bloque(bloque, carpeta_guardado, filtro, kernels):
+    """Procesa un bloque de trabajos en un proceso hijo. Devuelve (entradas, errores)."""
+    entradas = []
+    errores = []
+    for ruta_origen, clase in bloque:
+        try:
+            entradas.append(procesar_archivo(ruta_origen, clase, carpeta_guardado, filtro, kernels))
+        except Exception as e:
+            errores.append((ruta_origen, str(e)))
+    return entradas, errores
+
+def ingestar(trabajos, carpeta_guardado, filtro, kernels, manifest,
+             max_workers=None, tamano_bloque=16, callback_progreso=None):
+    """
+    Ingesta en paralelo una lista de trabajos (ruta, clase).
+
+    Las entradas se anexan al manifiesto por bloques, con una escritura por bloque.
+    callback_progreso(hechos, total, imagenes_por_segundo) se llama al terminar cada bloque.
+
+    Retorna (numero_de_imagenes_guardadas, errores).
+    """
+    os.makedirs(carpeta_guardado, exist_ok=True)
+    bloques = [trabajos[i:i + tamano_bloque] for i in range(0, len(trabajos), tamano_bloque)]
+
+    total = len(trabajos)
+    hechos = 0
+    guardadas = 0
+    errores = []
+    inicio = time.time()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [executor.submit(_procesar_bloque, bloque, carpeta_guardado, filtro, kernels) for bloque in bloques]
+        for futuro, bloque in zip(futuros, bloques):
+            entradas, errores_bloque = futuro.result()
+            manifest.agregar_varias(entradas)
+            guardadas += len(entradas)
+            errores.extend(errores_bloque)
+            hechos += len(bloque)
+            if callback_progreso is not None:
+                transcurrido = max(time.time() - inicio, 1e-9)
+                callback_progreso(hechos, total, hechos / transcurrido)
+
+    for ruta, error in errores:
+        print(f"Error al ingestar la imagen {ruta}: {error}")
+    return guardadas, errores
@@ -0,0 +1,80 @@
+# src/checkpoint.py
+
+import os
+import time
+import pickle
+
+VERSION_CHECKPOINT = 1
+
+def crear_checkpoint(modelo, epoca, losses, best_accuracy, data_loader, classes,
+                     indices_train, indices_val, config, entrenador=None):
+    """
+    Reúne todo lo necesario para continuar un entrenamiento exactamente donde se detuvo.
+
+    Parámetros:
+        - modelo: Red (incluye los pesos y el estado del optimizador).
+        - epoca: Última época completada.
+        - losses: Historial de pérdidas por época.
+        - best_accuracy: Mejor precisión de validación alcanzada.
+        - data_loader: Aporta la normalización y los generadores aleatorios del orden
+          de los datos y de la augmentation.
+        - indices_train / indices_val: División usada (se reutiliza al reanudar).
+        - config: Hiperparámetros del entrenamiento (error deseado, lote, procesos...).
+        - entrenador: EntrenadorParalelo, si se usa (su generador y su contador de pasos).
+    """
+    politica = data_loader.augmentation_policy
+    return {
+        'version': VERSION_CHECKPOINT,
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'modelo': modelo,
+        'epoca': epoca,
+        'losses': list(losses),
+        'best_accuracy': best_accuracy,
+        'mean': data_loader.mean,
+        'std': data_loader.std,
+        'feature_extractor': data_loader.feature_extractor,
+        'image_size': tuple(data_loader.image_size),
+        'classes': list(classes),
+        'indices_train': indices_train,
+        'indices_val': indices_val,
+        'config': dict(config),
+        'rng_datos': data_loader.rng.bit_generator.state,
+        'rng_augmentation': politica.rng.bit_generator.state if politica is not None else None,
+        'rng_entrenador': entrenador.rng.bit_generator.state if entrenador is not None else None,
+        'pasos_entrenador': entrenador.pasos if entrenador is not None else 0,
+    }
+
+def guardar_checkpoint(ruta, checkpoint):
+    """Guarda el checkpoint de forma atómica (un corte a mitad de escritura no lo corrompe)."""
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(ruta_tmp, ruta)
+    return ruta
+
+def cargar_checkpoint(ruta):
+    """Carga un checkpoint y comprueba su versión."""
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"No se encontró un checkpoint para reanudar en:\n{ruta}")
+    with open(ruta, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get('version') != VERSION_CHECKPOINT:
+        raise ValueError(f"Versión de checkpoint no soportada: {checkpoint.get('version')}")
+    return checkpoint
+
+def restaurar_data_loader(checkpoint, data_loader):
+    """Restaura la normalización, el extractor de características y los generadores aleatorios del DataLoader."""
+    data_loader.mean = checkpoint['mean']
+    data_loader.std = checkpoint['std']
+    data_loader.feature_extractor = checkpoint.get('feature_extractor')
+    data_loader.rng.bit_generator.state = checkpoint['rng_datos']
+    if data_loader.augmentation_policy is not None and checkpoint['rng_augmentation'] is not None:
+        data_loader.augmentation_policy.rng.bit_generator.state = checkpoint['rng_augmentation']
+
+def restaurar_entrenador(checkpoint, entrenador):
+    """Restaura el orden de los datos y el contador de pasos de un EntrenadorParalelo."""
+    if checkpoint['rng_entrenador'] is not None:
+        entrenador.rng.bit_generator.state = checkpoint['rng_entrenador']
+        entrenador.pasos = checkpoint['pasos_entrenador']
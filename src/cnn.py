@@ -0,0 +1,257 @@
+# src/cnn.py
+
+import os
+import numpy as np
+import pickle
+from numpy.lib.stride_tricks import sliding_window_view
+from instrumentation import medir
+from optimizers import crear_optimizador, SGD
+
+class Conv2D:
+    """Convolución 2D 'same' con stride 1 implementada como im2col + GEMM."""
+    def __init__(self, canales_entrada, filtros, kernel_size=3):
+        self.kernel_size = kernel_size
+        fan_in = canales_entrada * kernel_size * kernel_size
+        # Pesos ya en forma de matriz (C*kh*kw, F) para la multiplicación con im2col
+        self.W = (np.random.randn(fan_in, filtros) * np.sqrt(2. / fan_in)).astype(np.float32)
+        self.b = np.zeros((1, filtros), dtype=np.float32)
+
+    def params(self):
+        return [self.W, self.b]
+
+    def forward(self, x):
+        n, alto, ancho, canales = x.shape
+        k = self.kernel_size
+        pad = k // 2
+        xp = np.pad(x, ((0, 0), (pad, pad), (pad, pad), (0, 0)))
+        # Vista (N, alto, ancho, C, kh, kw) sin copia; el reshape materializa im2col
+        ventanas = sliding_window_view(xp, (k, k), axis=(1, 2))
+        cols = ventanas.reshape(n * alto * ancho, canales * k * k)
+        salida = cols @ self.W + self.b
+        self.cache = (x.shape, cols)
+        return salida.reshape(n, alto, ancho, -1)
+
+    def backward(self, dout):
+        forma, cols = self.cache
+        n, alto, ancho, canales = forma
+        k = self.kernel_size
+        pad = k // 2
+        dout_flat = dout.reshape(-1, dout.shape[-1])
+        self.grads = [cols.T @ dout_flat, dout_flat.sum(axis=0, keepdims=True)]
+
+        # col2im: acumular cada desplazamiento del kernel sobre la entrada con padding
+        dcols = (dout_flat @ self.W.T).reshape(n, alto, ancho, canales, k, k)
+        dxp = np.zeros((n, alto + 2 * pad, ancho + 2 * pad, canales), dtype=dout.dtype)
+        for i in range(k):
+            for j in range(k):
+                dxp[:, i:i + alto, j:j + ancho, :] += dcols[..., i, j]
+        self.cache = None
+        return dxp[:, pad:pad + alto, pad:pad + ancho, :]
+
+class MaxPool2D:
+    """Max-pooling 2x2 con stride 2."""
+    def params(self):
+        return []
+
+    def forward(self, x):
+        n, alto, ancho, canales = x.shape
+        x = x[:, :alto - alto % 2, :ancho - ancho % 2, :]
+        bloques = x.reshape(n, alto // 2, 2, ancho // 2, 2, canales)
+        salida = bloques.max(axis=(2, 4))
+        self.cache = (x.shape, (n, alto, ancho, canales), bloques == salida[:, :, None, :, None, :])
+        return salida
+
+    def backward(self, dout):
+        forma_recortada, forma, mascara = self.cache
+        self.grads = []
+        dbloques = mascara * dout[:, :, None, :, None, :]
+        dx = np.zeros(forma, dtype=dout.dtype)
+        dx[:, :forma_recortada[1], :forma_recortada[2], :] = dbloques.reshape(forma_recortada)
+        self.cache = None
+        return dx
+
+class ReLU:
+    def params(self):
+        return []
+
+    def forward(self, x):
+        self.cache = x > 0
+        return x * self.cache
+
+    def backward(self, dout):
+        self.grads = []
+        return dout * self.cache
+
+class Flatten:
+    def params(self):
+        return []
+
+    def forward(self, x):
+        self.cache = x.shape
+        return x.reshape(x.shape[0], -1)
+
+    def backward(self, dout):
+        self.grads = []
+        return dout.reshape(self.cache)
+
+class Dense:
+    def __init__(self, entrada, salida):
+        self.W = (np.random.randn(entrada, salida) * np.sqrt(2. / entrada)).astype(np.float32)
+        self.b = np.zeros((1, salida), dtype=np.float32)
+
+    def params(self):
+        return [self.W, self.b]
+
+    def forward(self, x):
+        self.cache = x
+        return x @ self.W + self.b
+
+    def backward(self, dout):
+        x = self.cache
+        self.grads = [x.T @ dout, dout.sum(axis=0, keepdims=True)]
+        self.cache = None
+        return dout @ self.W.T
+
+class ConvolutionalNetwork:
+    def __init__(self, input_shape, output_size, learning_rate=0.01, conv_filters=(8, 16, 32),
+                 kernel_size=3, hidden_size=64, optimizer='sgd'):
+        """
+        Red convolucional en NumPy: bloques [Conv -> ReLU -> MaxPool] seguidos de capas densas.
+
+        Parámetros:
+            - input_shape: Forma de cada imagen (alto, ancho, canales).
+            - output_size: Número de clases.
+            - learning_rate: Tasa de aprendizaje.
+            - conv_filters: Filtros de cada bloque convolucional.
+            - kernel_size: Lado de los kernels de convolución.
+            - hidden_size: Neuronas de la capa densa oculta (int o lista).
+            - optimizer: Optimizador de los pesos ('sgd', 'momentum' o 'adam').
+        """
+        self.input_shape = tuple(int(v) for v in input_shape)
+        self.learning_rate = learning_rate
+        self.optimizer = crear_optimizador(optimizer, learning_rate)
+        self.conv_filters = list(conv_filters)
+        self.kernel_size = kernel_size
+
+        alto, ancho, canales = self.input_shape
+        self.layers = []
+        for filtros in self.conv_filters:
+            self.layers += [Conv2D(canales, filtros, kernel_size), ReLU(), MaxPool2D()]
+            canales = filtros
+            alto, ancho = alto // 2, ancho // 2
+        self.layers.append(Flatten())
+
+        hidden_sizes = [hidden_size] if np.isscalar(hidden_size) else list(hidden_size)
+        entrada = alto * ancho * canales
+        for salida in hidden_sizes:
+            self.layers += [Dense(entrada, salida), ReLU()]
+            entrada = salida
+        self.layers.append(Dense(entrada, output_size))
+        self.layer_sizes = [self.input_size] + [int(h) for h in hidden_sizes] + [int(output_size)]
+
+    def __setstate__(self, state):
+        """Permite cargar modelos guardados antes de que existiera el optimizador."""
+        if 'optimizer' not in state:
+            state = dict(state)
+            state['optimizer'] = SGD(state['learning_rate'])
+        self.__dict__.update(state)
+
+    @property
+    def input_size(self):
+        return int(np.prod(self.input_shape))
+
+    @property
+    def output_size(self):
+        return self.layer_sizes[-1]
+
+    def parameters(self):
+        """Devuelve la lista de parámetros de todas las capas (referencias, no copias)."""
+        return [p for layer in self.layers for p in layer.params()]
+
+    def set_parameters(self, parametros):
+        """Sustituye los arreglos de parámetros (mismo orden y forma que parameters())."""
+        parametros = iter(parametros)
+        for layer in self.layers:
+            if layer.params():
+                layer.W = next(parametros)
+                layer.b = next(parametros)
+
+    def num_parameters(self):
+        return int(sum(p.size for p in self.parameters()))
+
+    def softmax(self, x):
+        """Función softmax para la capa de salida."""
+        exp_scores = np.exp(x - np.max(x, axis=1, keepdims=True))  # Evitar overflow
+        return exp_scores / np.sum(exp_scores, axis=1, keepdims=True)
+
+    def _como_imagenes(self, X):
+        """Convierte vectores planos (N, alto*ancho*canales) en imágenes float32 (N, alto, ancho, canales)."""
+        return np.asarray(X, dtype=np.float32).reshape((-1,) + self.input_shape)
+
+    def forward(self, X):
+        a = self._como_imagenes(X)
+        for layer in self.layers:
+            a = layer.forward(a)
+        return self.softmax(a)
+
+    def compute_gradients(self, X, y):
+        """Calcula la pérdida y los gradientes de un lote sin actualizar los pesos."""
+        with medir('forward'):
+            probs = self.forward(X)
+            n = len(y)
+            loss = -np.sum(np.log(probs[np.arange(n), y] + 1e-15)) / n
+
+        with medir('backward'):
+            # Delta de la salida: softmax + cross-entropy (suma sobre el lote, como NeuralNetwork)
+            delta = probs
+            delta[np.arange(n), y] -= 1
+            for layer in reversed(self.layers):
+                delta = layer.backward(delta)
+            gradientes = [g for layer in self.layers for g in layer.grads]
+        return loss, gradientes
+
+    def apply_gradients(self, gradientes):
+        """Actualiza los pesos con el optimizador del modelo."""
+        with medir('update'):
+            self.optimizer.step(self.parameters(), gradientes)
+
+    def train_step(self, X, y):
+        """Realiza un paso de entrenamiento sobre un lote y devuelve la pérdida."""
+        loss, gradientes = self.compute_gradients(X, y)
+        self.apply_gradients(gradientes)
+        return loss
+
+    def predict_proba(self, X, batch_size=256):
+        """Devuelve las probabilidades de cada clase, procesando por lotes para acotar la memoria de im2col."""
+        resultados = []
+        for inicio in range(0, len(X), batch_size):
+            resultados.append(self.forward(X[inicio:inicio + batch_size]))
+        for layer in self.layers:
+            layer.cache = None
+        return np.concatenate(resultados) if resultados else np.zeros((0, self.output_size))
+
+    def predict(self, X):
+        """
+        Realiza una predicción sobre los datos de entrada X.
+
+        Retorna:
+            - predictions: Índices de las clases predichas.
+            - confidences: Confianza asociada a cada predicción.
+        """
+        probs = self.predict_proba(X)
+        return np.argmax(probs, axis=1), np.max(probs, axis=1)
+
+    def save_model(self, path):
+        """Guarda el modelo entrenado en un archivo (sin las caches de las capas)."""
+        for layer in self.layers:
+            layer.cache = None
+        path_tmp = path + ".tmp"
+        with open(path_tmp, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(path_tmp, path)
+
+    @staticmethod
+    def load_model(path):
+        """Carga un modelo entrenado desde un archivo."""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
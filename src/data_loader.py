@@ -1,114 +1,186 @@
 # src/data_loader.py
 
 import os
-import json
 import numpy as np
-from PIL import Image, ImageEnhance
+from augmentation import AugmentationPolicy
+from dataset_manifest import DatasetManifest
+from image_store import leer_imagen_verificada
+from image_decode import decodificar_reducida, remuestrear
+from packed_dataset import DatasetEmpaquetado, STD_MINIMA
+from instrumentation import medir
 
 class DataLoader:
-    def __init__(self, imagenes_guardadas_json_ruta, image_size=(64, 64), augment_data=True):
+    def __init__(self, imagenes_guardadas_json_ruta, image_size=(64, 64), augment_data=True,
+                 augmentation_policy=None, seed=None):
         self.imagenes_guardadas_json_ruta = imagenes_guardadas_json_ruta
         self.image_size = image_size
         self.mean = None
         self.std = None
         self.augment_data = augment_data
+        # La augmentation se aplica por mini-lote en iter_batches, no al cargar
+        if augment_data and augmentation_policy is None:
+            augmentation_policy = AugmentationPolicy(seed=seed)
+        self.augmentation_policy = augmentation_policy if augment_data else None
+        self.rng = np.random.default_rng(seed)
+        # ExtractorCaracteristicas ajustado (features.py); None = píxeles normalizados
+        self.feature_extractor = None
 
     def load_data(self):
-        """Carga los datos y etiquetas desde el archivo JSON y aplica data augmentation si está habilitado."""
-        if not os.path.exists(self.imagenes_guardadas_json_ruta):
+        """
+        Carga las imágenes y etiquetas desde el archivo JSON.
+
+        Retorna:
+            - images: Arreglo uint8 (N, alto, ancho, 3) sin aumentar.
+            - labels: Índices de clase.
+            - clases: Nombres de las clases ordenados.
+        """
+        with medir('load'):
+            return self._load_data()
+
+    def _load_data(self):
+        """Lee el manifiesto y decodifica las imágenes (ver load_data)."""
+        manifest = DatasetManifest(self.imagenes_guardadas_json_ruta)
+        if not manifest.existe():
             raise FileNotFoundError(f"No se encontró el archivo JSON en la ruta especificada:\n{self.imagenes_guardadas_json_ruta}")
 
-        with open(self.imagenes_guardadas_json_ruta, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if not data:
+        if not len(manifest):
             raise ValueError("El archivo JSON está vacío.")
 
         inputs = []
         labels = []
-        clases = set()
-
-        # Identificar todas las clases
-        for item in data:
-            clases.add(item['tipo_pez'])
 
-        clases = sorted(list(clases))  # Ordenar para consistencia
+        # Las clases se obtienen del índice en memoria del manifiesto
+        clases = manifest.clases()
         clase_a_indice = {clase: idx for idx, clase in enumerate(clases)}
         print(f"Clases encontradas: {clase_a_indice}")
 
-        for item in data:
-            nombre_imagen = item['name']  # 'name' contiene el nombre del archivo de imagen
+        for item in manifest:
+            nombre_imagen = item['name']  # Ruta relativa ('ab/cd/<sha256>.png' o el nombre heredado)
             tipo_pez = item['tipo_pez']
-            ruta_imagen = os.path.join(os.path.dirname(self.imagenes_guardadas_json_ruta), nombre_imagen)
-
-            if not os.path.exists(ruta_imagen):
-                print(f"Advertencia: La imagen {ruta_imagen} no existe. Se omitirá.")
-                continue
+            ruta_imagen = os.path.join(os.path.dirname(self.imagenes_guardadas_json_ruta), *nombre_imagen.split('/'))
 
             try:
-                imagen = Image.open(ruta_imagen).convert("RGB")
-                imagen = imagen.resize(self.image_size, Image.LANCZOS)
-                imagen_array = np.array(imagen) / 255.0  # Normalizar a [0, 1]
-                input_flat = imagen_array.flatten()
-                inputs.append(input_flat)
+                # Sin os.path.exists por entrada: tamaño y hash del manifiesto detectan
+                # archivos ausentes o corruptos antes de decodificar
+                # Decodificada directamente cerca del tamaño del modelo (draft en JPEG)
+                imagen = decodificar_reducida(leer_imagen_verificada(ruta_imagen, item.get('sha256'), item.get('size')),
+                                              self.image_size, 'entrenamiento')
+                inputs.append(np.asarray(imagen, dtype=np.uint8))
                 labels.append(clase_a_indice[tipo_pez])
 
-                if self.augment_data:
-                    # Aplicar Data Augmentation
-                    augmented_images = self.augment_image(imagen)
-                    for aug_imagen in augmented_images:
-                        imagen_array = np.array(aug_imagen) / 255.0
-                        input_flat = imagen_array.flatten()
-                        inputs.append(input_flat)
-                        labels.append(clase_a_indice[tipo_pez])
-
                 print(f"Imagen cargada y procesada: {ruta_imagen}, Clase: {tipo_pez}")
+            except FileNotFoundError:
+                print(f"Advertencia: La imagen {ruta_imagen} no existe. Se omitirá.")
             except Exception as e:
                 print(f"Error al procesar la imagen {ruta_imagen}: {e}")
 
-        inputs = np.array(inputs)
+        ancho, alto = self.image_size
+        inputs = np.array(inputs, dtype=np.uint8).reshape(-1, alto, ancho, 3)
         labels = np.array(labels)
 
         # Calcular la media y desviación estándar para normalización
-        self.mean = np.mean(inputs, axis=0)
-        self.std = np.std(inputs, axis=0) + 1e-8  # Evitar división por cero
+        self.compute_stats(inputs)
 
         print(f"Total de imágenes cargadas: {len(inputs)}")
         return inputs, labels, clases
 
-    def augment_image(self, image):
-        """Genera variaciones de la imagen para aumentar el conjunto de datos."""
-        augmented_images = []
-
-        # Rotaciones
-        for angle in [90, 180, 270]:
-            rotated = image.rotate(angle)
-            augmented_images.append(rotated)
-
-        # Volteo horizontal
-        flipped = image.transpose(Image.FLIP_LEFT_RIGHT)
-        augmented_images.append(flipped)
-
-        # Cambios de brillo
-        enhancer = ImageEnhance.Brightness(image)
-        for factor in [0.7, 1.3]:
-            bright = enhancer.enhance(factor)
-            augmented_images.append(bright)
-
-        # Cambios de contraste
-        enhancer = ImageEnhance.Contrast(image)
-        for factor in [0.7, 1.3]:
-            contrast = enhancer.enhance(factor)
-            augmented_images.append(contrast)
-
-        return augmented_images
+    def load_packed(self, ruta_empaquetado):
+        """
+        Carga un dataset empaquetado (ver packed_dataset.py) sin decodificar imágenes.
+
+        Las imágenes se devuelven como np.memmap uint8; la conversión a float se
+        hace por mini-lote en prepare_batch.
+        """
+        with medir('load'):
+            dataset = DatasetEmpaquetado(ruta_empaquetado)
+        if tuple(dataset.image_size) != tuple(self.image_size):
+            raise ValueError(f"El dataset empaquetado tiene tamaño {dataset.image_size}, se esperaba {self.image_size}.")
+        self.mean = dataset.mean
+        self.std = np.maximum(dataset.std, STD_MINIMA)  # Los empaquetados antiguos guardaban std + 1e-8
+        print(f"Dataset empaquetado cargado: {len(dataset)} imágenes, Clases: {dataset.classes}")
+        return dataset.images, np.asarray(dataset.labels, dtype=np.int64), dataset.classes
+
+    def compute_stats(self, images, chunk_size=1024, indices=None):
+        """
+        Calcula la media y desviación estándar por píxel recorriendo las imágenes por bloques.
+        Con indices se usan solo esas imágenes (p. ej. el entrenamiento de un pliegue).
+        """
+        n = len(images) if indices is None else len(indices)
+        suma = np.zeros(int(np.prod(images.shape[1:])), dtype=np.float64)
+        suma_cuadrados = np.zeros_like(suma)
+        for inicio in range(0, n, chunk_size):
+            if indices is None:
+                bloque = images[inicio:inicio + chunk_size]
+            else:
+                bloque = images[np.sort(indices[inicio:inicio + chunk_size])]
+            bloque = bloque.reshape(-1, suma.size) / 255.0
+            suma += bloque.sum(axis=0)
+            suma_cuadrados += np.square(bloque).sum(axis=0)
+        self.mean = suma / max(n, 1)
+        varianza = np.maximum(suma_cuadrados / max(n, 1) - np.square(self.mean), 0.0)
+        self.std = np.maximum(np.sqrt(varianza), STD_MINIMA)
+        return self.mean, self.std
+
+    def normalize(self, X):
+        """Normaliza vectores planos en [0, 1] con la media y desviación estándar del entrenamiento."""
+        if self.mean is None or self.std is None:
+            print("Advertencia: La media y desviación estándar no están definidas.")
+            return X
+        return (X - self.mean) / self.std
+
+    def prepare_batch(self, images, augment=False, rng=None):
+        """
+        Convierte un lote de imágenes uint8 en vectores normalizados, aplicando la augmentation si se pide.
+        rng permite fijar el generador de la augmentation (p. ej. por trabajador en paralelo).
+        Con feature_extractor definido se devuelven sus características en lugar de los píxeles.
+        """
+        with medir('to_float'):
+            batch = np.asarray(images, dtype=np.float32) / 255.0
+        if augment and self.augmentation_policy is not None:
+            with medir('augment'):
+                batch = self.augmentation_policy.apply(batch, rng=rng)
+        if self.feature_extractor is not None:
+            with medir('features'):
+                return self.feature_extractor.transformar(batch)
+        with medir('normalize'):
+            return self.normalize(batch.reshape(len(batch), -1))
+
+    def iter_batches(self, images, labels, batch_size=32, shuffle=True, augment=True, indices=None):
+        """
+        Genera mini-lotes (X, y) listos para la red neuronal.
+
+        La augmentation se aplica al muestrear cada lote, de modo que cada época ve
+        variantes distintas sin multiplicar los datos almacenados. Con indices se
+        recorre solo ese subconjunto, leyendo directamente de images (p. ej. un memmap).
+        """
+        if indices is not None:
+            orden = self.rng.permutation(indices) if shuffle else np.asarray(indices)
+            for inicio in range(0, len(orden), batch_size):
+                idx = np.sort(orden[inicio:inicio + batch_size])
+                yield self.prepare_batch(images[idx], augment=augment), labels[idx]
+            return
+
+        n = len(images)
+        if not shuffle:
+            # Cortes contiguos: sobre un np.memmap son vistas sin copia
+            for inicio in range(0, n, batch_size):
+                fin = inicio + batch_size
+                yield self.prepare_batch(images[inicio:fin], augment=augment), labels[inicio:fin]
+            return
+
+        indices = self.rng.permutation(n)
+        for inicio in range(0, n, batch_size):
+            idx = np.sort(indices[inicio:inicio + batch_size])  # Acceso secuencial a memoria
+            yield self.prepare_batch(images[idx], augment=augment), labels[idx]
 
     def load_single_image(self, image_pil):
         """Procesa una sola imagen PIL y la prepara para la predicción."""
         try:
             imagen = image_pil.convert("RGB")
-            imagen = imagen.resize(self.image_size, Image.LANCZOS)
+            imagen = remuestrear(imagen, self.image_size, 'entrenamiento')
             imagen_array = np.array(imagen) / 255.0  # Normalizar a [0, 1]
+            if self.feature_extractor is not None:
+                return self.feature_extractor.transformar(imagen_array[np.newaxis].astype(np.float32))[0]
             input_flat = imagen_array.flatten()
             # Normalizar con la media y desviación estándar del entrenamiento
             if self.mean is not None and self.std is not None:
@@ -0,0 +1,177 @@
+# src/dataset_manifest.py
+
+import os
+import json
+import threading
+from collections import defaultdict
+
+class DatasetManifest:
+    """
+    Manifiesto del dataset en formato JSONL de solo anexado.
+
+    Cada imagen guardada se registra como una línea JSON, de modo que guardar
+    una imagen cuesta O(1) sin reescribir el archivo completo. Las bajas se
+    registran como líneas con "deleted": true y se eliminan al compactar.
+
+    Uso:
+        manifest = DatasetManifest("imagenes_procesadas/imagenes_guardadas.json")
+        manifest.agregar({...})
+    """
+    def __init__(self, imagenes_guardadas_json_ruta):
+        # Se conserva la ruta del JSON heredado para migrarlo y exportarlo
+        self.ruta_json = imagenes_guardadas_json_ruta
+        self.ruta = os.path.splitext(imagenes_guardadas_json_ruta)[0] + ".jsonl"
+        self.carpeta = os.path.dirname(imagenes_guardadas_json_ruta)
+
+        self._lock = threading.Lock()
+        self._offset = 0  # Bytes del archivo ya indexados
+        self._inodo = None  # Cambia cuando otro proceso compacta el manifiesto
+        self.entradas = {}  # nombre -> entrada, en orden de inserción
+        self.por_clase = defaultdict(dict)  # clase -> {nombre: entrada}
+
+        self._migrar_json_heredado()
+        self.refrescar()
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def __iter__(self):
+        return iter(list(self.entradas.values()))
+
+    def existe(self):
+        """Indica si hay un manifiesto en disco."""
+        return os.path.exists(self.ruta)
+
+    def obtener(self, nombre):
+        """Devuelve la entrada con el nombre indicado o None."""
+        return self.entradas.get(nombre)
+
+    def clases(self):
+        """Devuelve las clases presentes ordenadas."""
+        return sorted(clase for clase, entradas in self.por_clase.items() if entradas)
+
+    def entradas_de_clase(self, clase):
+        """Devuelve las entradas de una clase."""
+        return list(self.por_clase.get(clase, {}).values())
+
+    def _migrar_json_heredado(self):
+        """Convierte el imagenes_guardadas.json heredado al formato JSONL la primera vez."""
+        if os.path.exists(self.ruta) or not os.path.exists(self.ruta_json):
+            return
+        with open(self.ruta_json, 'r', encoding='utf-8') as f:
+            data = json.load(f) or []
+        self._escribir_atomico(data)
+        print(f"Manifiesto migrado desde {self.ruta_json} ({len(data)} entradas).")
+
+    def _indexar(self, entrada):
+        nombre = entrada['name']
+        anterior = self.entradas.pop(nombre, None)
+        if anterior is not None:
+            self.por_clase[anterior.get('tipo_pez')].pop(nombre, None)
+        if entrada.get('deleted'):
+            return
+        self.entradas[nombre] = entrada
+        self.por_clase[entrada.get('tipo_pez')][nombre] = entrada
+
+    def refrescar(self):
+        """Indexa las líneas anexadas desde la última lectura (también las de otros procesos)."""
+        with self._lock:
+            self._sincronizar()
+
+    def _sincronizar(self):
+        """Lee lo pendiente; si el archivo fue reemplazado por una compactación, reindexa desde cero."""
+        try:
+            inodo = os.stat(self.ruta).st_ino
+        except FileNotFoundError:
+            return
+        if inodo != self._inodo:
+            self._inodo = inodo
+            self._offset = 0
+            self.entradas = {}
+            self.por_clase = defaultdict(dict)
+        for entrada in self.iter_entradas(desde=self._offset, actualizar_offset=True):
+            self._indexar(entrada)
+
+    def iter_entradas(self, desde=0, actualizar_offset=False):
+        """
+        Lee el manifiesto de forma incremental, línea a línea, sin cargarlo completo.
+
+        Una última línea sin salto de línea (escritura interrumpida) se ignora.
+        """
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, 'rb') as f:
+            f.seek(desde)
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                if actualizar_offset:
+                    self._offset += len(linea)
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    yield json.loads(linea.decode('utf-8'))
+                except ValueError as e:
+                    print(f"Advertencia: Línea inválida en el manifiesto {self.ruta}: {e}")
+
+    def agregar(self, entrada):
+        """Anexa una entrada al manifiesto."""
+        self.agregar_varias([entrada])
+
+    def agregar_varias(self, entradas):
+        """Anexa varias entradas con una sola escritura."""
+        if not entradas:
+            return
+        datos = b"".join(
+            (json.dumps(entrada, ensure_ascii=False) + "\n").encode('utf-8') for entrada in entradas
+        )
+        with self._lock:
+            # Sincronizar primero con anexados de otros procesos
+            self._sincronizar()
+            os.makedirs(self.carpeta or ".", exist_ok=True)
+            fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # Una sola llamada a write con O_APPEND: las líneas no se intercalan
+                os.write(fd, datos)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            # Otro proceso pudo anexar entre la sincronización y la escritura: en vez de
+            # avanzar el offset a mano se relee hasta el final real (incluidas estas líneas)
+            self._sincronizar()
+
+    def eliminar(self, nombre):
+        """Marca una entrada como eliminada."""
+        self.agregar({'name': nombre, 'deleted': True})
+
+    def _escribir_atomico(self, entradas):
+        """Reescribe el manifiesto completo de forma atómica (archivo temporal + os.replace)."""
+        os.makedirs(self.carpeta or ".", exist_ok=True)
+        ruta_tmp = self.ruta + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            for entrada in entradas:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_tmp, self.ruta)
+
+    def compactar(self):
+        """Elimina duplicados y bajas reescribiendo el manifiesto con las entradas vigentes."""
+        self.refrescar()
+        with self._lock:
+            self._escribir_atomico(self.entradas.values())
+            estado = os.stat(self.ruta)
+            self._offset = estado.st_size
+            self._inodo = estado.st_ino
+        print(f"Manifiesto compactado: {len(self.entradas)} entradas.")
+
+    def exportar_json(self, ruta=None):
+        """Exporta las entradas vigentes como el JSON indentado heredado."""
+        ruta = ruta or self.ruta_json
+        self.refrescar()
+        ruta_tmp = ruta + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(list(self.entradas.values()), f, ensure_ascii=False, indent=4)
+        os.replace(ruta_tmp, ruta)
+        return ruta
@@ -0,0 +1,163 @@
+# src/ensemble.py
+
+"""
+Conjuntos de modelos que promedian sus probabilidades.
+
+ModeloConjunto agrupa modelos que reciben exactamente la misma entrada (mismo
+tratamiento de imagen y misma normalización); se comporta como un modelo más
+(predict, predict_proba, input_size, output_size), así que sirve en la
+aplicación, en el mosaico o en cualquier sitio que use self.nn.
+
+PipelineConjunto agrupa PipelineInferencia arbitrarios con las mismas clases.
+Cada imagen se decodifica una sola vez, se prepara (kernels + filtro) una vez
+por tratamiento distinto y se vectoriza una vez por entrada distinta; el
+vector resultante es la concatenación de esas entradas, de modo que los lotes
+se apilan igual que con un único modelo. Al predecir, cada miembro toma su
+tramo de columnas y los miembros se ejecutan en hilos en paralelo (NumPy
+libera el GIL en los productos de matrices).
+"""
+
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from inference import abrir_imagen
+from instrumentation import medir
+
+def _en_paralelo(funciones):
+    """Ejecuta funciones sin argumentos en hilos y retorna sus resultados en orden."""
+    if len(funciones) == 1:
+        return [funciones[0]()]
+    with ThreadPoolExecutor(max_workers=len(funciones), thread_name_prefix='conjunto') as executor:
+        futuros = [executor.submit(funcion) for funcion in funciones]
+        return [futuro.result() for futuro in futuros]
+
+def _normalizar_pesos(pesos, n):
+    pesos = np.ones(n) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    if pesos.shape != (n,) or np.any(pesos < 0) or pesos.sum() <= 0:
+        raise ValueError("Los pesos del conjunto deben ser no negativos, uno por modelo, y no todos cero.")
+    return pesos / pesos.sum()
+
+def _promediar(probabilidades, pesos):
+    return np.tensordot(pesos, np.stack(probabilidades), axes=1)
+
+def _desde_probabilidades(probabilidades):
+    indices = np.argmax(probabilidades, axis=1)
+    return indices, probabilidades[np.arange(len(indices)), indices]
+
+class ModeloConjunto:
+    """
+    Promedio (ponderado) de modelos con la misma entrada.
+
+    Parámetros:
+        - modelos: NeuralNetwork, ConvolutionalNetwork o ModeloCuantizado con igual input_size y output_size.
+        - pesos: Peso de cada modelo (por defecto, todos iguales).
+    """
+    def __init__(self, modelos, pesos=None):
+        if not modelos:
+            raise ValueError("El conjunto necesita al menos un modelo.")
+        if len({(modelo.input_size, modelo.output_size) for modelo in modelos}) != 1:
+            raise ValueError("Los modelos del conjunto deben tener la misma entrada y el mismo número de clases.")
+        self.modelos = list(modelos)
+        self.input_size = self.modelos[0].input_size
+        self.output_size = self.modelos[0].output_size
+        self.pesos = _normalizar_pesos(pesos, len(self.modelos))
+
+    def predict_proba(self, X):
+        return _promediar(_en_paralelo([lambda modelo=modelo: modelo.predict_proba(X) for modelo in self.modelos]),
+                          self.pesos)
+
+    def predict(self, X):
+        """Retorna (índices de clase, confianza) a partir de las probabilidades promediadas."""
+        return _desde_probabilidades(self.predict_proba(X))
+
+def clave_entrada(pipeline):
+    """Identifica el vector de entrada de un pipeline: tratamiento de imagen + normalización o extractor."""
+    data_loader = pipeline.data_loader
+    if data_loader.feature_extractor is not None:
+        vector = ('extractor', id(data_loader.feature_extractor))
+    else:
+        resumen = hashlib.sha1(np.ascontiguousarray(data_loader.mean).tobytes()
+                               + np.ascontiguousarray(data_loader.std).tobytes()).hexdigest()
+        vector = ('pixeles', tuple(data_loader.image_size), resumen)
+    return pipeline.clave_pipeline, vector
+
+class PipelineConjunto:
+    """
+    Varios PipelineInferencia que comparten el preprocesamiento y promedian probabilidades.
+
+    Tiene la interfaz de PipelineInferencia (preprocesar, predecir, predecir_proba,
+    resultados, clasificar, validar, actual), así que el servidor, el demonio de
+    carpeta y el clasificador de video lo usan sin cambios.
+    """
+    def __init__(self, pipelines, pesos=None):
+        if not pipelines:
+            raise ValueError("El conjunto necesita al menos un modelo.")
+        self.miembros = list(pipelines)
+        self.classes = list(self.miembros[0].classes)
+        if any(list(miembro.classes) != self.classes for miembro in self.miembros):
+            raise ValueError("Los modelos del conjunto deben tener las mismas clases en el mismo orden.")
+        self.pesos = _normalizar_pesos(pesos, len(self.miembros))
+        self.version = "+".join(miembro.version for miembro in self.miembros)
+        self.modelo_path = ", ".join(miembro.modelo_path for miembro in self.miembros)
+        self.cargado = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        # Una entrada por vector distinto; cada miembro lee el tramo [inicio, fin) del vector concatenado
+        self._entradas = []
+        self._tramos = []
+        indice_por_clave = {}
+        inicio = 0
+        for miembro in self.miembros:
+            clave = clave_entrada(miembro)
+            if clave not in indice_por_clave:
+                indice_por_clave[clave] = len(self._entradas)
+                self._entradas.append((miembro, inicio, inicio + miembro.modelo.input_size))
+                inicio += miembro.modelo.input_size
+            _, desde, hasta = self._entradas[indice_por_clave[clave]]
+            self._tramos.append((desde, hasta))
+        print(f"Conjunto de {len(self.miembros)} modelos con {len(self._entradas)} preprocesamiento(s) distinto(s).")
+
+    @property
+    def actual(self):
+        return self
+
+    def validar(self):
+        for miembro in self.miembros:
+            miembro.validar()
+        return self
+
+    def preprocesar(self, imagen):
+        """Decodifica una vez y prepara una vez por tratamiento distinto; retorna el vector concatenado."""
+        with medir('preprocess'):
+            imagen = abrir_imagen(imagen)
+            preparadas = {}
+            vectores = []
+            for representante, _, _ in self._entradas:
+                clave = representante.clave_pipeline
+                if clave not in preparadas:
+                    preparadas[clave] = representante.preparar(imagen)
+                vectores.append(representante.vectorizar(preparadas[clave]))
+            return np.concatenate(vectores)
+
+    def predecir_proba(self, X):
+        """Probabilidades promediadas; cada miembro predice su tramo de columnas en un hilo."""
+        X = np.asarray(X)
+        with medir('predict'):
+            return _promediar(_en_paralelo([
+                lambda miembro=miembro, desde=desde, hasta=hasta: miembro.modelo.predict_proba(X[:, desde:hasta])
+                for miembro, (desde, hasta) in zip(self.miembros, self._tramos)
+            ]), self.pesos)
+
+    def predecir(self, X):
+        """Predice un lote de vectores ya preprocesados; retorna (indices, confianzas)."""
+        return _desde_probabilidades(self.predecir_proba(X))
+
+    def resultados(self, indices, confianzas):
+        return [{'clase': self.classes[int(indice)], 'indice': int(indice), 'confianza': float(confianza),
+                 'version': self.version}
+                for indice, confianza in zip(indices, confianzas)]
+
+    def clasificar(self, imagenes):
+        """Preprocesa y clasifica una lista de imágenes en un único lote."""
+        X = np.stack([self.preprocesar(imagen) for imagen in imagenes])
+        return self.resultados(*self.predecir(X))
@@ -0,0 +1,194 @@
+# src/features.py
+
+"""
+Extracción de características compactas como alternativa a los píxeles crudos.
+
+Las etapas trabajan sobre lotes de imágenes float en [0, 1] con forma
+(N, alto, ancho, 3) y están vectorizadas sobre todo el lote:
+    - HistogramaColor: histograma normalizado por canal RGB.
+    - HOG: histogramas de orientación del gradiente por celda, normalizados por bloques 2x2.
+    - Pixeles: el vector de píxeles (para reducirlo con PCA o proyección aleatoria).
+
+Un reductor opcional (PCA o ProyeccionAleatoria) se ajusta con el entrenamiento.
+El ExtractorCaracteristicas ajustado se guarda en estadisticas.pkl junto al
+modelo para aplicar exactamente la misma transformación en la inferencia.
+"""
+
+import numpy as np
+
+class HistogramaColor:
+    """Histograma de intensidades de cada canal RGB (3 * bins valores por imagen)."""
+    def __init__(self, bins=16):
+        self.bins = bins
+
+    def dimension(self, forma_imagen):
+        return 3 * self.bins
+
+    def __call__(self, images):
+        n, alto, ancho, canales = images.shape
+        cubetas = np.minimum((images * self.bins).astype(np.int64), self.bins - 1)
+        # Índice global (imagen, canal, cubeta) para un único bincount sobre todo el lote
+        desplazamiento = (np.arange(n)[:, None, None, None] * canales + np.arange(canales)) * self.bins
+        conteos = np.bincount((cubetas + desplazamiento).ravel(), minlength=n * canales * self.bins)
+        return conteos.reshape(n, canales * self.bins).astype(np.float32) / (alto * ancho)
+
+class HOG:
+    """Histograma de gradientes orientados (orientación sin signo) con normalización L2-Hys por bloques 2x2."""
+    def __init__(self, celda=8, orientaciones=9):
+        self.celda = celda
+        self.orientaciones = orientaciones
+
+    def dimension(self, forma_imagen):
+        celdas_y, celdas_x = forma_imagen[0] // self.celda, forma_imagen[1] // self.celda
+        return max(celdas_y - 1, 0) * max(celdas_x - 1, 0) * 4 * self.orientaciones
+
+    def __call__(self, images):
+        gris = images @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        n, alto, ancho = gris.shape
+        gx = np.zeros_like(gris)
+        gy = np.zeros_like(gris)
+        gx[:, :, 1:-1] = gris[:, :, 2:] - gris[:, :, :-2]
+        gy[:, 1:-1, :] = gris[:, 2:, :] - gris[:, :-2, :]
+        magnitud = np.hypot(gx, gy)
+        angulo = np.mod(np.arctan2(gy, gx), np.pi)
+        cubeta = np.minimum((angulo * (self.orientaciones / np.pi)).astype(np.int64), self.orientaciones - 1)
+
+        celdas_y, celdas_x = alto // self.celda, ancho // self.celda
+        alto_util, ancho_util = celdas_y * self.celda, celdas_x * self.celda
+        fila = np.arange(alto_util) // self.celda
+        columna = np.arange(ancho_util) // self.celda
+        celda = fila[:, None] * celdas_x + columna[None, :]
+        indice = ((np.arange(n)[:, None, None] * celdas_y * celdas_x + celda) * self.orientaciones
+                  + cubeta[:, :alto_util, :ancho_util])
+        histogramas = np.bincount(indice.ravel(), weights=magnitud[:, :alto_util, :ancho_util].ravel(),
+                                  minlength=n * celdas_y * celdas_x * self.orientaciones)
+        histogramas = histogramas.reshape(n, celdas_y, celdas_x, self.orientaciones)
+
+        # Bloques de 2x2 celdas solapados
+        bloques = np.concatenate([histogramas[:, :-1, :-1], histogramas[:, :-1, 1:],
+                                  histogramas[:, 1:, :-1], histogramas[:, 1:, 1:]], axis=-1)
+        bloques = bloques / np.sqrt(np.sum(bloques ** 2, axis=-1, keepdims=True) + 1e-6)
+        bloques = np.minimum(bloques, 0.2)
+        bloques = bloques / np.sqrt(np.sum(bloques ** 2, axis=-1, keepdims=True) + 1e-6)
+        return bloques.reshape(n, -1).astype(np.float32)
+
+class Pixeles:
+    """Píxeles crudos aplanados (útil como entrada de un reductor)."""
+    def dimension(self, forma_imagen):
+        return int(np.prod(forma_imagen))
+
+    def __call__(self, images):
+        return images.reshape(len(images), -1).astype(np.float32, copy=False)
+
+class PCA:
+    """Análisis de componentes principales ajustado con SVD sobre una muestra del entrenamiento."""
+    def __init__(self, componentes=64, max_muestras=2000, seed=0):
+        self.componentes = componentes
+        self.max_muestras = max_muestras
+        self.seed = seed
+        self.media = None
+        self.base = None
+
+    def ajustar(self, X):
+        if len(X) > self.max_muestras:
+            X = X[np.sort(np.random.default_rng(self.seed).choice(len(X), self.max_muestras, replace=False))]
+        self.media = X.mean(axis=0)
+        _, _, Vt = np.linalg.svd(X - self.media, full_matrices=False)
+        self.base = np.ascontiguousarray(Vt[:self.componentes].T, dtype=np.float32)
+        self.componentes = self.base.shape[1]
+        return self
+
+    def __call__(self, X):
+        return (X - self.media) @ self.base
+
+class ProyeccionAleatoria:
+    """Proyección aleatoria gaussiana (Johnson-Lindenstrauss); no necesita datos para ajustarse."""
+    def __init__(self, componentes=256, seed=0):
+        self.componentes = componentes
+        self.seed = seed
+        self.matriz = None
+
+    def ajustar(self, X):
+        rng = np.random.default_rng(self.seed)
+        self.matriz = (rng.standard_normal((X.shape[1], self.componentes)) / np.sqrt(self.componentes)).astype(np.float32)
+        return self
+
+    def __call__(self, X):
+        return X @ self.matriz
+
+class ExtractorCaracteristicas:
+    """
+    Etapas de características concatenadas, un reductor opcional y estandarización final.
+
+    Uso:
+        extractor = ExtractorCaracteristicas([HistogramaColor(), HOG()], reductor=PCA(64))
+        extractor.ajustar(imagenes_uint8_entrenamiento)
+        X = extractor.transformar(lote_float)  # (N, extractor.dimension)
+    """
+    def __init__(self, etapas, reductor=None, nombre=None):
+        self.etapas = list(etapas)
+        self.reductor = reductor
+        self.nombre = nombre
+        self.media = None
+        self.std = None
+
+    def _caracteristicas(self, images):
+        return np.concatenate([etapa(images) for etapa in self.etapas], axis=1)
+
+    def _por_bloques(self, images, funcion, chunk_size, indices=None):
+        """
+        Aplica una función a imágenes uint8 por bloques (acepta np.memmap sin cargarlo entero).
+        Con indices se leen solo esas imágenes, bloque a bloque.
+        """
+        if indices is None:
+            bloques = (images[i:i + chunk_size] for i in range(0, len(images), chunk_size))
+        else:
+            indices = np.sort(np.asarray(indices))
+            bloques = (images[indices[i:i + chunk_size]] for i in range(0, len(indices), chunk_size))
+        return np.concatenate([funcion(np.asarray(bloque, dtype=np.float32) / 255.0) for bloque in bloques])
+
+    def ajustar(self, images, chunk_size=512, indices=None):
+        """
+        Ajusta el reductor y la estandarización con imágenes uint8 (N, alto, ancho, 3) del entrenamiento.
+        Con indices se ajusta solo con ese subconjunto de images.
+        """
+        caracteristicas = self._por_bloques(images, self._caracteristicas, chunk_size, indices)
+        if self.reductor is not None:
+            self.reductor.ajustar(caracteristicas)
+            caracteristicas = self.reductor(caracteristicas)
+        self.media = caracteristicas.mean(axis=0).astype(np.float32)
+        self.std = (caracteristicas.std(axis=0) + 1e-6).astype(np.float32)
+        return self
+
+    @property
+    def dimension(self):
+        return len(self.media)
+
+    def transformar(self, images):
+        """Convierte un lote float en [0, 1] (N, alto, ancho, 3) en vectores de características estandarizados."""
+        caracteristicas = self._caracteristicas(images)
+        if self.reductor is not None:
+            caracteristicas = self.reductor(caracteristicas)
+        return (caracteristicas - self.media) / self.std
+
+# Configuraciones con nombre para la interfaz ('pixeles' = sin extractor)
+EXTRACTORES = {
+    'pixeles': None,
+    'histograma': lambda seed: ExtractorCaracteristicas([HistogramaColor()]),
+    'hog': lambda seed: ExtractorCaracteristicas([HOG()]),
+    'histograma_hog': lambda seed: ExtractorCaracteristicas([HistogramaColor(), HOG()]),
+    'histograma_hog_pca': lambda seed: ExtractorCaracteristicas([HistogramaColor(), HOG()], PCA(64, seed=seed)),
+    'pixeles_pca': lambda seed: ExtractorCaracteristicas([Pixeles()], PCA(64, seed=seed)),
+    'proyeccion_aleatoria': lambda seed: ExtractorCaracteristicas([Pixeles()], ProyeccionAleatoria(256, seed=seed)),
+}
+
+def crear_extractor(nombre, seed=0):
+    """Crea (sin ajustar) el extractor con nombre; 'pixeles' devuelve None."""
+    if nombre not in EXTRACTORES:
+        raise ValueError(f"Extractor de características desconocido: {nombre}. Opciones: {', '.join(EXTRACTORES)}")
+    fabrica = EXTRACTORES[nombre]
+    if fabrica is None:
+        return None
+    extractor = fabrica(seed)
+    extractor.nombre = nombre
+    return extractor
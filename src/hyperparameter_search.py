@@ -0,0 +1,328 @@
+# src/hyperparameter_search.py
+
+"""
+Búsqueda de hiperparámetros en paralelo.
+
+Estrategias: 'grid' (todas las combinaciones), 'random' (muestreo aleatorio) y
+'halving' (successive halving: muchos ensayos con pocas épocas, y solo el
+mejor 1/eta de cada ronda continúa con eta veces más épocas).
+
+Los ensayos se ejecutan en un pool de procesos. Todos leen el mismo dataset
+empaquetado como np.memmap (ver packed_dataset.py), de modo que los píxeles se
+comparten a través de la caché de páginas del sistema en lugar de copiarse en
+cada proceso. Los ensayos que divergen o dejan de mejorar se detienen antes.
+
+Uso:
+    python src/hyperparameter_search.py --estrategia halving --ensayos 27 --epocas 27
+"""
+
+import os
+import time
+import json
+import pickle
+import argparse
+import itertools
+import traceback
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from augmentation import crear_politica
+from data_loader import DataLoader, STD_MINIMA
+from packed_dataset import DatasetEmpaquetado, exportar_dataset_empaquetado, dataset_empaquetado_vigente
+from parallel_training import un_hilo_blas
+from model_selection import division_estratificada, crear_modelo
+
+ESPACIO_POR_DEFECTO = {
+    'hidden_size': [[64], [128], [256, 64]],
+    'learning_rate': [0.0001, 0.0003, 0.001, 0.003],
+    'optimizer': ['sgd', 'momentum', 'adam'],
+    'batch_size': [16, 32, 64],
+    'augmentation': ['ninguna', 'suave', 'fuerte'],
+}
+
+# Estado de cada proceso del pool (se inicializa una vez por proceso)
+_datos = {}
+
+def _inicializar_trabajador(ruta_empaquetado, indices_entrenamiento, indices_validacion, tipo_modelo):
+    """Abre el dataset empaquetado como memmap y prepara la validación una sola vez por proceso."""
+    dataset = DatasetEmpaquetado(ruta_empaquetado)
+    data_loader = DataLoader(None, image_size=dataset.image_size, augment_data=False)
+    data_loader.mean = dataset.mean
+    data_loader.std = np.maximum(dataset.std, STD_MINIMA)
+    labels = np.asarray(dataset.labels, dtype=np.int64)
+    indices_validacion = np.sort(indices_validacion)
+    _datos.update({
+        'images': dataset.images,
+        'labels': labels,
+        'classes': dataset.classes,
+        'data_loader': data_loader,
+        'indices_entrenamiento': np.asarray(indices_entrenamiento),
+        'X_val': data_loader.prepare_batch(dataset.images[indices_validacion]),
+        'y_val': labels[indices_validacion],
+        'tipo_modelo': tipo_modelo,
+    })
+
+def _ejecutar_ensayo(config, epocas, estado_previo=None, paciencia=None):
+    """
+    Entrena un ensayo durante `epocas` épocas (continuando desde estado_previo si se da).
+
+    Retorna un dict con la precisión de validación, la pérdida, el estado
+    ('completo', 'detenido' o 'divergente') y el modelo serializado.
+    """
+    try:
+        images = _datos['images']
+        labels = _datos['labels']
+        data_loader = _datos['data_loader']
+
+        if estado_previo is None:
+            modelo = crear_modelo(_datos['tipo_modelo'], images.shape[1:], len(_datos['classes']), config)
+            estado = {'epocas': 0, 'mejor_precision': 0.0, 'sin_mejora': 0, 'loss_inicial': None,
+                      'historial': [], 'mejor_modelo': None}
+        else:
+            modelo = pickle.loads(estado_previo['modelo'])
+            estado = dict(estado_previo)
+            estado['historial'] = list(estado_previo['historial'])
+
+        data_loader.augmentation_policy = crear_politica(config['augmentation'], seed=[config['seed'], estado['epocas']])
+        data_loader.rng = np.random.default_rng([config['seed'], estado['epocas']])
+        inicio = time.time()
+        resultado = 'completo'
+        for _ in range(epocas):
+            loss_total = 0.0
+            for X_batch, y_batch in data_loader.iter_batches(images, labels, config['batch_size'],
+                                                             indices=_datos['indices_entrenamiento']):
+                loss_total += modelo.train_step(X_batch, y_batch) * len(y_batch)
+            loss = loss_total / len(_datos['indices_entrenamiento'])
+            estado['epocas'] += 1
+
+            # Terminación temprana: pérdida no finita o muy por encima de la inicial
+            if estado['loss_inicial'] is None:
+                estado['loss_inicial'] = loss
+            if not np.isfinite(loss) or loss > 3 * estado['loss_inicial']:
+                resultado = 'divergente'
+                estado['historial'].append((loss, 0.0))
+                break
+
+            y_pred, _ = modelo.predict(_datos['X_val'])
+            precision = float(np.mean(y_pred == _datos['y_val']))
+            estado['historial'].append((loss, precision))
+            if precision > estado['mejor_precision'] or estado['mejor_modelo'] is None:
+                estado['mejor_precision'] = precision
+                estado['mejor_modelo'] = pickle.dumps(modelo)
+                estado['sin_mejora'] = 0
+            else:
+                estado['sin_mejora'] += 1
+                if paciencia and estado['sin_mejora'] >= paciencia:
+                    resultado = 'detenido'
+                    break
+
+        estado['modelo'] = pickle.dumps(modelo)
+        estado['duracion_s'] = estado.get('duracion_s', 0.0) + time.time() - inicio
+        estado['resultado'] = resultado
+        return estado
+    except Exception:
+        return {'resultado': 'error', 'error': traceback.format_exc()}
+
+def generar_configuraciones(espacio, estrategia, n_ensayos, seed=0):
+    """Genera la lista de configuraciones a probar a partir del espacio de búsqueda."""
+    claves = list(espacio)
+    if estrategia == 'grid':
+        combinaciones = [dict(zip(claves, valores)) for valores in itertools.product(*(espacio[c] for c in claves))]
+    else:
+        rng = np.random.default_rng(seed)
+        combinaciones = []
+        vistas = set()
+        total = int(np.prod([len(espacio[c]) for c in claves]))
+        while len(combinaciones) < min(n_ensayos, total):
+            indices = tuple(int(rng.integers(len(espacio[c]))) for c in claves)
+            if indices in vistas:
+                continue
+            vistas.add(indices)
+            combinaciones.append({c: espacio[c][i] for c, i in zip(claves, indices)})
+    for i, config in enumerate(combinaciones):
+        config['id'] = i
+        config['seed'] = seed + i
+    return combinaciones
+
+class BusquedaHiperparametros:
+    """
+    Ejecuta la búsqueda y mantiene la tabla de posiciones.
+
+    Parámetros:
+        - ruta_empaquetado: Dataset empaquetado compartido por todos los ensayos.
+        - espacio: Dict con la lista de valores de cada hiperparámetro.
+        - estrategia: 'grid', 'random' o 'halving'.
+        - epocas: Épocas por ensayo (máximo por ensayo en 'halving').
+        - eta: Factor de reducción de successive halving.
+        - paciencia: Épocas sin mejorar la validación antes de detener un ensayo.
+        - callback: Función llamada con cada ensayo terminado (p. ej. para la interfaz).
+    """
+    def __init__(self, ruta_empaquetado, espacio=None, estrategia='halving', n_ensayos=16, epocas=20,
+                 eta=3, epocas_minimas=2, paciencia=5, trabajadores=None, tipo_modelo='MLP', seed=0,
+                 callback=None):
+        if estrategia not in ('grid', 'random', 'halving'):
+            raise ValueError(f"Estrategia desconocida: {estrategia}. Opciones: grid, random, halving")
+        self.ruta_empaquetado = ruta_empaquetado
+        self.espacio = espacio or ESPACIO_POR_DEFECTO
+        self.estrategia = estrategia
+        self.n_ensayos = n_ensayos
+        self.epocas = epocas
+        self.eta = eta
+        self.epocas_minimas = epocas_minimas
+        self.paciencia = paciencia
+        self.trabajadores = trabajadores or os.cpu_count() or 1
+        self.tipo_modelo = tipo_modelo
+        self.seed = seed
+        self.callback = callback
+        self.ensayos = {}  # id -> {'config', 'estado'}
+
+    def ejecutar(self):
+        """Ejecuta la búsqueda completa y devuelve la tabla de posiciones."""
+        dataset = DatasetEmpaquetado(self.ruta_empaquetado)
+        self.classes = dataset.classes
+        indices_entrenamiento, indices_validacion = division_estratificada(np.asarray(dataset.labels))
+        configuraciones = generar_configuraciones(self.espacio, self.estrategia, self.n_ensayos, self.seed)
+        print(f"Búsqueda '{self.estrategia}': {len(configuraciones)} ensayos en {self.trabajadores} procesos.")
+
+        with un_hilo_blas(), ProcessPoolExecutor(
+                max_workers=self.trabajadores, mp_context=mp.get_context('spawn'),
+                initializer=_inicializar_trabajador,
+                initargs=(self.ruta_empaquetado, indices_entrenamiento, indices_validacion, self.tipo_modelo)) as executor:
+            if self.estrategia == 'halving':
+                self._successive_halving(executor, configuraciones)
+            else:
+                self._ronda(executor, configuraciones, self.epocas, self.paciencia)
+        return self.tabla()
+
+    def _ronda(self, executor, configuraciones, epocas_objetivo, paciencia, final=True):
+        """
+        Entrena en paralelo las configuraciones hasta `epocas_objetivo` épocas cada una.
+        Con final=True los ensayos no continúan y solo se conserva el modelo del mejor.
+        """
+        futuros = {}
+        for config in configuraciones:
+            previo = self.ensayos.get(config['id'], {}).get('estado')
+            epocas = epocas_objetivo - (previo['epocas'] if previo else 0)
+            futuros[executor.submit(_ejecutar_ensayo, config, epocas, previo, paciencia)] = config
+        for futuro in as_completed(futuros):
+            config = futuros[futuro]
+            estado = futuro.result()
+            if estado['resultado'] == 'error':
+                print(f"Error en el ensayo {config['id']}:\n{estado['error']}")
+            self.ensayos[config['id']] = {'config': config, 'estado': estado}
+            if final:
+                self._liberar_modelos()
+            if self.callback is not None:
+                self.callback(self._fila(config['id']))
+
+    def _successive_halving(self, executor, configuraciones):
+        epocas = min(self.epocas_minimas, self.epocas)
+        activas = configuraciones
+        while activas:
+            self._ronda(executor, activas, epocas, None, final=False)
+            # Solo continúan los ensayos sanos; se ordenan por la mejor precisión de validación
+            sanas = [c for c in activas if self.ensayos[c['id']]['estado']['resultado'] == 'completo']
+            sanas.sort(key=lambda c: -self.ensayos[c['id']]['estado']['mejor_precision'])
+            if epocas >= self.epocas or len(sanas) <= 1:
+                break
+            continuan = sanas[:max(1, len(sanas) // self.eta)]
+            for config in sanas[len(continuan):]:
+                self.ensayos[config['id']]['estado']['resultado'] = 'descartado'
+            print(f"Successive halving: {len(continuan)} de {len(activas)} ensayos pasan a {min(epocas * self.eta, self.epocas)} épocas.")
+            activas = continuan
+            epocas = min(epocas * self.eta, self.epocas)
+        self._liberar_modelos()
+
+    def _liberar_modelos(self):
+        """Descarta los modelos serializados de todos los ensayos excepto el mejor (acota la memoria)."""
+        tabla = self.tabla()
+        mejor = tabla[0]['id'] if tabla else None
+        for id_ensayo, ensayo in self.ensayos.items():
+            estado = ensayo['estado']
+            estado.pop('modelo', None)
+            if id_ensayo != mejor:
+                estado.pop('mejor_modelo', None)
+
+    def _fila(self, id_ensayo):
+        ensayo = self.ensayos[id_ensayo]
+        config, estado = ensayo['config'], ensayo['estado']
+        fila = {'id': id_ensayo, 'config': {k: v for k, v in config.items() if k != 'id'},
+                'resultado': estado['resultado']}
+        if estado['resultado'] != 'error':
+            fila.update({
+                'precision_validacion': estado['mejor_precision'],
+                'loss': estado['historial'][-1][0] if estado['historial'] else None,
+                'epocas': estado['epocas'],
+                'duracion_s': estado['duracion_s']
+            })
+        return fila
+
+    def tabla(self):
+        """Tabla de posiciones ordenada por precisión de validación."""
+        filas = [self._fila(i) for i in self.ensayos]
+        return sorted(filas, key=lambda f: -(f.get('precision_validacion') or 0.0))
+
+    def texto_tabla(self, limite=10):
+        lineas = [f"{'#':>3} {'Precisión':>10} {'Épocas':>7} {'Estado':>11}  Configuración"]
+        for posicion, fila in enumerate(self.tabla()[:limite], start=1):
+            config = fila['config']
+            descripcion = (f"capas={config['hidden_size']} lr={config['learning_rate']} opt={config['optimizer']} "
+                           f"lote={config['batch_size']} aug={config['augmentation']}")
+            precision = fila.get('precision_validacion')
+            precision = f"{precision * 100:9.2f}%" if precision is not None else f"{'-':>10}"
+            lineas.append(f"{posicion:>3} {precision} {fila.get('epocas', 0):>7} {fila['resultado']:>11}  {descripcion}")
+        return "\n".join(lineas) + "\n"
+
+    def mejor_modelo(self):
+        """Devuelve el mejor modelo encontrado (deserializado) y su fila de la tabla."""
+        for fila in self.tabla():
+            estado = self.ensayos[fila['id']]['estado']
+            if estado.get('mejor_modelo') is not None:
+                return pickle.loads(estado['mejor_modelo']), fila
+        return None, None
+
+    def guardar(self, ruta_tabla, ruta_modelo=None):
+        """Guarda la tabla de posiciones en JSON y, si se indica, el mejor modelo."""
+        with open(ruta_tabla, 'w', encoding='utf-8') as f:
+            json.dump({
+                'estrategia': self.estrategia,
+                'espacio': self.espacio,
+                'tipo_modelo': self.tipo_modelo,
+                'clases': self.classes,
+                'tabla': self.tabla()
+            }, f, ensure_ascii=False, indent=4)
+        if ruta_modelo:
+            modelo, _ = self.mejor_modelo()
+            if modelo is not None:
+                modelo.save_model(ruta_modelo)
+        return ruta_tabla
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de hiperparámetros en paralelo.")
+    parser.add_argument("--json", default=os.path.join("imagenes_procesadas", "imagenes_guardadas.json"))
+    parser.add_argument("--empaquetado", default=os.path.join("imagenes_procesadas", "dataset.pack"))
+    parser.add_argument("--estrategia", choices=['grid', 'random', 'halving'], default='halving')
+    parser.add_argument("--ensayos", type=int, default=16)
+    parser.add_argument("--epocas", type=int, default=20)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--paciencia", type=int, default=5)
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--modelo", choices=['MLP', 'CNN'], default='MLP')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", default=os.path.join("models", "busqueda.json"))
+    parser.add_argument("--modelo-salida", default=os.path.join("models", "modelo_busqueda.pkl"))
+    args = parser.parse_args()
+
+    if not dataset_empaquetado_vigente(args.empaquetado, args.json):
+        exportar_dataset_empaquetado(args.json, args.empaquetado)
+    busqueda = BusquedaHiperparametros(args.empaquetado, estrategia=args.estrategia, n_ensayos=args.ensayos,
+                                       epocas=args.epocas, eta=args.eta, paciencia=args.paciencia,
+                                       trabajadores=args.trabajadores, tipo_modelo=args.modelo, seed=args.seed)
+    busqueda.ejecutar()
+    print(busqueda.texto_tabla())
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    busqueda.guardar(args.salida, args.modelo_salida)
+    print(f"Tabla guardada en {args.salida}; mejor modelo en {args.modelo_salida}")
+
+if __name__ == "__main__":
+    main()
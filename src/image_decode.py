@@ -0,0 +1,90 @@
+# src/image_decode.py
+
+"""
+Decodificación a resolución reducida y calidad de remuestreo por etapa.
+
+Casi todas las imágenes se reducen enseguida a 64x64, 100x100 o al tamaño de
+la vista previa, así que decodificar una foto de varios megapíxeles completa
+es trabajo perdido. Para JPEG, Image.draft pide al decodificador una escala
+1/2, 1/4 u 1/8 que siga siendo al menos del tamaño necesario (la IDCT se hace
+a menor resolución); para el resto de formatos el remuestreo con reducing_gap
+aplica primero una reducción entera rápida (Image.reduce) y solo el último
+tramo con el filtro de calidad.
+
+Cada etapa elige su calidad:
+    - vista_previa: BILINEAR, pensado para la interfaz (se recalcula a menudo).
+    - entrenamiento: LANCZOS, para las imágenes que ve el modelo.
+    - exportacion: LANCZOS sin reducción previa (máxima calidad, lo más lento).
+"""
+
+import os
+from PIL import Image
+
+# Etapa -> (filtro de remuestreo, reducing_gap). El reducing_gap también fija
+# cuánto más grande que el destino se decodifica con draft.
+ETAPAS_REMUESTREO = {
+    'vista_previa': (Image.BILINEAR, 2.0),
+    'entrenamiento': (Image.LANCZOS, 3.0),
+    'exportacion': (Image.LANCZOS, None),
+}
+
+def remuestrear(imagen, tamano, etapa='entrenamiento'):
+    """Redimensiona una imagen PIL a `tamano` con la calidad de la etapa."""
+    filtro, reduccion = ETAPAS_REMUESTREO[etapa]
+    if imagen.size == tuple(tamano):
+        return imagen
+    return imagen.resize(tamano, filtro, reducing_gap=reduccion)
+
+def decodificar_reducida(imagen, tamano, etapa='entrenamiento'):
+    """
+    Decodifica una imagen recién abierta (sin cargar) directamente cerca de `tamano` y la remuestrea.
+
+    Retorna una imagen RGB de exactamente `tamano`. Si la imagen ya estaba
+    cargada, draft no tiene efecto y solo se remuestrea.
+    """
+    _, reduccion = ETAPAS_REMUESTREO[etapa]
+    margen = reduccion or 1.0
+    # draft solo actúa en JPEG: elige la mayor reducción que sigue cubriendo el tamaño pedido
+    imagen.draft(None, (int(tamano[0] * margen), int(tamano[1] * margen)))
+    return remuestrear(imagen.convert("RGB"), tamano, etapa)
+
+def abrir_reducida(ruta, tamano, etapa='entrenamiento'):
+    """Abre, decodifica a resolución reducida y remuestrea el archivo de `ruta` a `tamano`."""
+    with Image.open(ruta) as imagen:
+        return decodificar_reducida(imagen, tamano, etapa)
+
+class ImagenFuente:
+    """
+    Foto de origen con decodificación diferida.
+
+    Leer el tamaño y el formato solo lee la cabecera; la imagen completa se
+    decodifica una sola vez y solo cuando alguien la pide (procesar, clasificar
+    o guardar a tamaño real). Las copias reducidas para mostrar las da
+    PiramideImagen (image_pyramid.py), que en JPEG las decodifica con draft.
+
+    Uso:
+        fuente = ImagenFuente("foto.jpg")
+        completa = fuente.completa()               # Resolución nativa
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with Image.open(ruta) as imagen:
+            self.tamano = imagen.size
+            self.formato = imagen.format
+        self._completa = None
+
+    @property
+    def nombre(self):
+        return os.path.basename(self.ruta)
+
+    @property
+    def decodificada(self):
+        """True si la imagen completa ya está en memoria."""
+        return self._completa is not None
+
+    def completa(self):
+        """Imagen RGB a resolución nativa (se decodifica una sola vez)."""
+        if self._completa is None:
+            with Image.open(self.ruta) as imagen:
+                self._completa = imagen.convert("RGB")
+        return self._completa
@@ -1,12 +1,23 @@
 # src/image_processor.py
 
-import json
 import os
-import datetime
-from PIL import Image, ImageTk, ImageFilter
+import threading
+import queue
+from PIL import ImageTk
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from data_loader import DataLoader
+from instrumentation import medir
+from recursos import obtener_kernels
+from dataset_manifest import DatasetManifest
+from pipeline import crear_filtro_kernel, aplicar_filtro_color, procesar_imagen, TAMANO_GUARDADO
+from bulk_ingest import listar_trabajos, ingestar
+from image_store import guardar_imagen_en_almacen
+from image_decode import ImagenFuente, remuestrear
+from image_pyramid import PiramideImagen
+
+# Tamaño de las vistas previas (original y procesada)
+TAMANO_VISTA = (500, 350)
 
 class ToolTip:
     """
@@ -46,17 +57,25 @@ class TratamientoFrame(ttk.Frame):
         self.carpeta_guardado = carpeta_guardado
         os.makedirs(self.carpeta_guardado, exist_ok=True)
 
-        # Lista para almacenar información de imágenes guardadas
-        self.imagenes_guardadas = []
+        # Manifiesto de solo anexado con la información de las imágenes guardadas
+        self.manifest = DatasetManifest(os.path.join(self.carpeta_guardado, "imagenes_guardadas.json"))
 
         # Ruta del archivo JSON de kernels
         self.ruta_json = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data", "kernel.json")
 
         # Variables para almacenar imágenes
-        self.imagen_original = None
+        self.imagen_original = None  # Nivel de la pirámide sobre el que se calcula la vista previa
+        self.imagen_fuente = None  # ImagenFuente (la resolución nativa solo se decodifica al guardar)
+        self.piramide = None  # PiramideImagen con los niveles y las vistas en caché
         self.imagen_procesada = None
+        self.kernels_en_uso = []  # Kernels aplicados a la vista previa, para repetirlos a tamaño completo
         self.kernels = []
         self.check_vars = []
+        self.kernels_checkbuttons = []  # Kernel asociado a cada Checkbutton, en el mismo orden que check_vars
+
+        # Cola para comunicar la ingesta masiva (hilo en segundo plano) con la GUI
+        self.queue = queue.Queue()
+        self.ingesta_en_curso = False
 
         # Variables para almacenar filtros y kernels aplicados
         self.kernels_aplicados = []
@@ -85,20 +104,8 @@ class TratamientoFrame(ttk.Frame):
         self.configurar_gui()
 
     def cargar_kernels(self):
-        """Carga los kernels desde el archivo JSON."""
-        if not os.path.exists(self.ruta_json):
-            raise FileNotFoundError(f"No se encontró el archivo JSON en la ruta especificada:\n{self.ruta_json}")
-
-        with open(self.ruta_json, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        if 'kernels' not in data:
-            raise KeyError("La clave 'kernels' no se encontró en el archivo JSON.")
-
-        self.kernels = data['kernels']
-        if not self.kernels:
-            raise ValueError("La lista de kernels está vacía en el archivo JSON.")
-        print(f"Se cargaron {len(self.kernels)} kernels desde el archivo JSON.")
+        """Carga los kernels desde el archivo JSON (compartidos por todo el proceso)."""
+        self.kernels = obtener_kernels(self.ruta_json)
 
     # ... (El resto del código permanece igual)
 
@@ -238,6 +245,17 @@ class TratamientoFrame(ttk.Frame):
         btn_generar_json = ttk.Button(frame_controles_lateral, text="📄 Generar JSON", command=self.generar_json)
         btn_generar_json.pack(padx=5, pady=5, fill=tk.X)
 
+        # Botón para la ingesta masiva de una carpeta
+        btn_ingesta = ttk.Button(frame_controles_lateral, text="📁 Ingesta Masiva", command=self.ingesta_masiva)
+        btn_ingesta.pack(padx=5, pady=5, fill=tk.X)
+        self.agregar_tooltip(btn_ingesta, "Procesa todas las imágenes de una carpeta con el filtro y los kernels actuales.\nLas subcarpetas se usan como tipo de pez.")
+
+        # Barra de progreso y rendimiento de la ingesta masiva
+        self.progress_ingesta = ttk.Progressbar(frame_controles_lateral, orient='horizontal', mode='determinate')
+        self.progress_ingesta.pack(padx=5, pady=2, fill=tk.X)
+        self.lbl_ingesta = ttk.Label(frame_controles_lateral, text="")
+        self.lbl_ingesta.pack(padx=5, pady=2, anchor='w')
+
         # *** Sección: Selección del Tipo de Pez ***
         frame_tipo_pez = ttk.LabelFrame(frame_controles_lateral, text="Seleccionar Tipo de Pez", padding=10)
         frame_tipo_pez.pack(fill=tk.X, padx=5, pady=5)
@@ -278,7 +296,7 @@ class TratamientoFrame(ttk.Frame):
         # *** Fin de la Sección ***
 
         # Barra de estado
-        self.barra_estado = ttk.Label(self.master, text="Listo", relief=tk.SUNKEN, anchor='w')
+        self.barra_estado = ttk.Label(self, text="Listo", relief=tk.SUNKEN, anchor='w')
         self.barra_estado.pack(fill=tk.X, side=tk.BOTTOM, ipady=2)
 
     def bind_scroll_events(self, canvas):
@@ -323,6 +341,7 @@ class TratamientoFrame(ttk.Frame):
             chk = ttk.Checkbutton(parent, text=kernel['name'], variable=var, command=self.on_kernel_toggle)
             chk.pack(anchor='w', padx=5, pady=2)
             self.check_vars.append(var)
+            self.kernels_checkbuttons.append(kernel)
             # Añadir tooltip para la descripción
             self.agregar_tooltip(chk, kernel.get('description', 'Sin descripción'))
 
@@ -340,10 +359,14 @@ class TratamientoFrame(ttk.Frame):
             return
 
         try:
-            # Cargar la imagen en PIL
-            self.imagen_original = Image.open(ruta_imagen).convert("RGB")  # Asegurarse de que está en RGB
+            # Cargar la imagen en PIL: la vista previa trabaja sobre el nivel más pequeño de la
+            # pirámide que cubre el tamaño de pantalla, no sobre la resolución nativa
+            self.imagen_fuente = ImagenFuente(ruta_imagen)
+            self.piramide = PiramideImagen(self.imagen_fuente)
+            self.imagen_original = self.piramide.nivel_para(TAMANO_VISTA)
             self.imagen_procesada = self.imagen_original.copy()  # Iniciar la imagen procesada como una copia
             self.kernels_aplicados = []  # Reiniciar la lista de kernels aplicados
+            self.kernels_en_uso = []
             self.actualizar_imagen()  # Llamar para mostrar la imagen cargada según el estado del filtro
             self.barra_estado.config(text="Imagen cargada exitosamente.")
         except Exception as e:
@@ -356,34 +379,7 @@ class TratamientoFrame(ttk.Frame):
             return None
 
         try:
-            filtro = self.filtro_color.get()
-
-            if filtro == 'grayscale':
-                return self.imagen_procesada.convert("L").convert("RGB")
-            elif filtro == 'red':
-                r, g, b = self.imagen_procesada.split()
-                return Image.merge("RGB", (r, Image.new("L", r.size), Image.new("L", r.size)))
-            elif filtro == 'green':
-                r, g, b = self.imagen_procesada.split()
-                return Image.merge("RGB", (Image.new("L", g.size), g, Image.new("L", g.size)))
-            elif filtro == 'blue':
-                r, g, b = self.imagen_procesada.split()
-                return Image.merge("RGB", (Image.new("L", b.size), Image.new("L", b.size), b))
-            elif filtro == 'white':
-                # Convertir a escala de grises y aplicar un umbral para resaltar las áreas blancas
-                grayscale = self.imagen_procesada.convert("L")
-                threshold = 200  # Puedes ajustar este valor
-                binary = grayscale.point(lambda x: 255 if x > threshold else 0, '1')
-                return binary.convert("RGB")
-            elif filtro == 'black':
-                # Convertir a escala de grises y aplicar un umbral para resaltar las áreas negras
-                grayscale = self.imagen_procesada.convert("L")
-                threshold = 50  # Puedes ajustar este valor
-                binary = grayscale.point(lambda x: 0 if x < threshold else 255, '1')
-                return binary.convert("RGB")
-            else:
-                # Ningún filtro aplicado
-                return self.imagen_procesada
+            return aplicar_filtro_color(self.imagen_procesada, self.filtro_color.get())
         except Exception as e:
             messagebox.showerror("Error al Aplicar Filtro de Color", f"Ocurrió un error al aplicar el filtro de color:\n{e}")
             self.barra_estado.config(text="Error al aplicar el filtro de color.")
@@ -395,28 +391,31 @@ class TratamientoFrame(ttk.Frame):
             return
 
         try:
-            # Mostrar la imagen original sin cambios
-            imagen_original_pil = self.redimensionar_imagen(self.imagen_original, (500, 350))
-            imagen_original_tk = ImageTk.PhotoImage(imagen_original_pil)
-            self.label_original.config(image=imagen_original_tk)
-            self.label_original.image = imagen_original_tk  # Mantener una referencia
-
-            # Obtener la imagen procesada con el filtro de color aplicado
-            imagen_procesada_mostrar = self.get_filtered_image()
-
-            # Redimensionar y mostrar la imagen procesada
-            imagen_procesada_pil = self.redimensionar_imagen(imagen_procesada_mostrar, (500, 350))
-            imagen_procesada_tk = ImageTk.PhotoImage(imagen_procesada_pil)
-            self.label_procesada.config(image=imagen_procesada_tk)
-            self.label_procesada.image = imagen_procesada_tk  # Mantener una referencia
+            with medir('render'):
+                # Mostrar la imagen original sin cambios (PhotoImage en caché: solo se crea al cargar)
+                imagen_original_tk = self.piramide.en_cache(
+                    ('foto', 'original'), lambda: ImageTk.PhotoImage(self.piramide.vista(TAMANO_VISTA)))
+                self.label_original.config(image=imagen_original_tk)
+                self.label_original.image = imagen_original_tk  # Mantener una referencia
+
+                # Imagen procesada con el filtro de color aplicado, redimensionada; en caché por kernels y filtro
+                clave = ('foto', tuple(self.kernels_aplicados), self.filtro_color.get())
+                imagen_procesada_tk = self.piramide.en_cache(
+                    clave, lambda: ImageTk.PhotoImage(self.redimensionar_imagen(self.get_filtered_image(), TAMANO_VISTA)))
+                self.label_procesada.config(image=imagen_procesada_tk)
+                self.label_procesada.image = imagen_procesada_tk  # Mantener una referencia
 
         except Exception as e:
             messagebox.showerror("Error al Actualizar Imagen", f"Ocurrió un error al actualizar la imagen:\n{e}")
             self.barra_estado.config(text="Error al actualizar la imagen.")
 
     def redimensionar_imagen(self, imagen_pil, tamaño):
-        """Redimensiona una imagen PIL manteniendo la relación de aspecto."""
-        return imagen_pil.resize(tamaño, Image.LANCZOS)
+        """Redimensiona una imagen PIL para la vista previa (remuestreo rápido)."""
+        return remuestrear(imagen_pil, tamaño, 'vista_previa')
+
+    def obtener_kernels_seleccionados(self):
+        """Devuelve los kernels marcados, en el orden de los Checkbuttons."""
+        return [k for k, var in zip(self.kernels_checkbuttons, self.check_vars) if var.get()]
 
     def on_kernel_toggle(self):
         """Callback para cuando se selecciona o deselecciona un kernel."""
@@ -426,33 +425,15 @@ class TratamientoFrame(ttk.Frame):
             return  # No hay imagen cargada
 
         # Aplicar todos los kernels seleccionados
-        seleccion = [var.get() for var in self.check_vars]
-        kernels_seleccionados = [k for k, seleccionado in zip(self.kernels, seleccion) if seleccionado]
+        kernels_seleccionados = self.obtener_kernels_seleccionados()
 
         imagen_procesada = self.imagen_original.copy()
         nombres_aplicados = []
 
         for kernel in kernels_seleccionados:
-            matriz = kernel['matrix']
-
-            # Convertir la matriz a una lista plana
-            kernel_flat = [item for sublist in matriz for item in sublist]
-
-            # Tamaño del kernel
-            size = kernel.get('size', '3x3')  # Usar 3x3 por defecto si no está especificado
-            if 'x' in size.lower():
-                ancho, alto = map(int, size.lower().split('x'))
-            else:
-                ancho, alto = 3, 3  # Valor por defecto
-
             # Crear el filtro de kernel
             try:
-                filtro = ImageFilter.Kernel(
-                    size=(ancho, alto),
-                    kernel=kernel_flat,
-                    scale=sum(kernel_flat) if sum(kernel_flat) != 0 else 1,
-                    offset=0
-                )
+                filtro = crear_filtro_kernel(kernel)
             except Exception as e:
                 messagebox.showerror("Error al Crear Filtro", f"Ocurrió un error al crear el filtro de kernel '{kernel['name']}':\n{e}")
                 self.barra_estado.config(text="Error al crear el filtro de kernel.")
@@ -470,6 +451,7 @@ class TratamientoFrame(ttk.Frame):
         # Guardar la imagen procesada
         self.imagen_procesada = imagen_procesada
         self.kernels_aplicados = nombres_aplicados  # Actualizar la lista de kernels aplicados
+        self.kernels_en_uso = kernels_seleccionados
         self.actualizar_imagen()  # Actualizar la imagen en la interfaz
         self.barra_estado.config(text=f"Kernels aplicados: {', '.join(nombres_aplicados)}.")
 
@@ -481,53 +463,106 @@ class TratamientoFrame(ttk.Frame):
             return
 
         try:
-            # Obtener la imagen procesada con el filtro de color aplicado
-            imagen_guardar = self.get_filtered_image()
+            # Repetir el pipeline (kernels y después filtro de color) sobre la imagen a resolución nativa
+            imagen_guardar = procesar_imagen(self.imagen_fuente.completa(), self.filtro_color.get(), self.kernels_en_uso)
 
             # Redimensionar la imagen a 100x100 píxeles
-            imagen_guardar_resized = imagen_guardar.resize((100, 100), Image.LANCZOS)
+            imagen_guardar_resized = remuestrear(imagen_guardar, TAMANO_GUARDADO, 'exportacion')
 
-            # Generar un nombre único para la imagen
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            nombre_archivo = f"imagen_procesada_{timestamp}.png"
-            ruta_guardado = os.path.join(self.carpeta_guardado, nombre_archivo)
+            # Guardar con nombre por hash de contenido en subcarpetas (sin colisiones)
+            almacenada = guardar_imagen_en_almacen(imagen_guardar_resized, self.carpeta_guardado)
+            ruta_guardado = almacenada['path']
 
-            # Guardar la imagen redimensionada
-            imagen_guardar_resized.save(ruta_guardado)
-
-            # Añadir la información de la imagen guardada a la lista
-            self.imagenes_guardadas.append({
-                'name': nombre_archivo,
-                'path': ruta_guardado,
+            # Anexar la información de la imagen guardada al manifiesto
+            self.manifest.agregar({
+                **almacenada,
                 'filter': self.filtro_color.get(),
                 'kernels_applied': self.kernels_aplicados.copy(),
                 'tipo_pez': self.tipo_pez.get()
             })
 
-            # Guardar la lista en el archivo JSON
-            with open(os.path.join(self.carpeta_guardado, "imagenes_guardadas.json"), 'w', encoding='utf-8') as f:
-                json.dump(self.imagenes_guardadas, f, ensure_ascii=False, indent=4)
-
-            messagebox.showinfo("Éxito al Guardar", f"Imagen procesada guardada exitosamente en:\n{ruta_guardado}")
+            # Sin messagebox bloqueante: la confirmación se muestra en la barra de estado
             self.barra_estado.config(text=f"Imagen guardada en: {ruta_guardado}")
         except Exception as e:
             messagebox.showerror("Error al Guardar", f"Ocurrió un error al guardar la imagen:\n{e}")
             self.barra_estado.config(text="Error al guardar la imagen.")
 
     def generar_json(self):
-        """Genera un archivo JSON con el nombre, ruta, filtros, kernels aplicados y tipo de pez de las imágenes guardadas."""
-        if not self.imagenes_guardadas:
+        """Compacta el manifiesto y exporta el JSON con el nombre, ruta, filtros, kernels aplicados y tipo de pez de las imágenes guardadas."""
+        self.manifest.refrescar()
+        if not len(self.manifest):
             messagebox.showwarning("Sin Imágenes Guardadas", "No hay imágenes guardadas para generar el JSON.")
             self.barra_estado.config(text="Intento de generar JSON sin imágenes guardadas.")
             return
 
         try:
-            ruta_json = os.path.join(self.carpeta_guardado, "imagenes_guardadas.json")
-            with open(ruta_json, 'w', encoding='utf-8') as f:
-                json.dump(self.imagenes_guardadas, f, ensure_ascii=False, indent=4)
+            self.manifest.compactar()
+            ruta_json = self.manifest.exportar_json()
 
             messagebox.showinfo("JSON Generado", f"Archivo JSON generado exitosamente en:\n{ruta_json}")
             self.barra_estado.config(text=f"JSON generado en: {ruta_json}")
         except Exception as e:
             messagebox.showerror("Error al Generar JSON", f"Ocurrió un error al generar el JSON:\n{e}")
             self.barra_estado.config(text="Error al generar el JSON.")
+
+    def ingesta_masiva(self):
+        """Procesa en paralelo todas las imágenes de una carpeta (o de sus subcarpetas por clase)."""
+        if self.ingesta_en_curso:
+            messagebox.showwarning("Ingesta en Curso", "Ya hay una ingesta masiva en curso.")
+            return
+
+        carpeta = filedialog.askdirectory(title="Seleccionar Carpeta de Imágenes")
+        if not carpeta:
+            return
+
+        trabajos = listar_trabajos(carpeta, self.tipo_pez.get())
+        if not trabajos:
+            messagebox.showwarning("Sin Imágenes", f"No se encontraron imágenes en:\n{carpeta}")
+            return
+
+        filtro = self.filtro_color.get()
+        kernels = self.obtener_kernels_seleccionados()
+
+        self.ingesta_en_curso = True
+        self.progress_ingesta.config(maximum=len(trabajos), value=0)
+        self.lbl_ingesta.config(text=f"0/{len(trabajos)} imágenes")
+        self.barra_estado.config(text=f"Ingesta masiva iniciada: {len(trabajos)} imágenes.")
+
+        threading.Thread(target=self.ejecutar_ingesta, args=(trabajos, filtro, kernels), daemon=True).start()
+        self.after(100, self.process_queue)
+
+    def ejecutar_ingesta(self, trabajos, filtro, kernels):
+        """Ejecuta la ingesta masiva en un hilo separado."""
+        def progreso(hechos, total, velocidad):
+            self.queue.put(('progress', (hechos, total, velocidad)))
+
+        try:
+            guardadas, errores = ingestar(
+                trabajos, self.carpeta_guardado, filtro, kernels, self.manifest,
+                callback_progreso=progreso
+            )
+            self.queue.put(('done', (guardadas, len(errores))))
+        except Exception as e:
+            self.queue.put(('error', str(e)))
+
+    def process_queue(self):
+        """Procesa los mensajes de la ingesta masiva para actualizar la interfaz gráfica."""
+        try:
+            while True:
+                message_type, value = self.queue.get_nowait()
+                if message_type == 'progress':
+                    hechos, total, velocidad = value
+                    self.progress_ingesta['value'] = hechos
+                    self.lbl_ingesta.config(text=f"{hechos}/{total} imágenes ({velocidad:.1f} img/s)")
+                elif message_type == 'done':
+                    guardadas, num_errores = value
+                    self.ingesta_en_curso = False
+                    self.barra_estado.config(text=f"Ingesta masiva completada: {guardadas} imágenes guardadas, {num_errores} errores.")
+                elif message_type == 'error':
+                    self.ingesta_en_curso = False
+                    messagebox.showerror("Error en Ingesta Masiva", f"Ocurrió un error durante la ingesta:\n{value}")
+                    self.barra_estado.config(text="Error durante la ingesta masiva.")
+        except queue.Empty:
+            pass
+        if self.ingesta_en_curso:
+            self.after(100, self.process_queue)
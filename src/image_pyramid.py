@@ -0,0 +1,91 @@
+# src/image_pyramid.py
+
+"""
+Pirámide multirresolución de una imagen cargada en la interfaz.
+
+El nivel k mide 1/2^k de la imagen original (redondeando hacia arriba). Los
+niveles 1 a 3 de un JPEG salen directamente del decodificador con draft, sin
+decodificar la imagen completa; el resto se obtiene con Image.reduce(2) del
+nivel anterior. Las vistas previas aplican kernels y filtros sobre el nivel más
+pequeño que sigue cubriendo el tamaño de pantalla, así que su coste no depende
+de la resolución de la foto; la imagen completa solo se decodifica al guardar
+o exportar.
+
+La pirámide guarda además en una caché LRU los resultados derivados (vistas de
+pantalla, imágenes procesadas, ImageTk.PhotoImage) por clave, para que un
+redibujado que no cambió nada no vuelva a calcularlos.
+"""
+
+import math
+from collections import OrderedDict
+from PIL import Image
+from image_decode import remuestrear
+
+# Niveles que el decodificador JPEG puede entregar con draft (escalas 1/2, 1/4 y 1/8)
+NIVELES_DRAFT = 3
+
+class PiramideImagen:
+    """
+    Niveles potencia de dos y resultados de vista previa de una ImagenFuente.
+
+    Uso:
+        piramide = PiramideImagen(ImagenFuente("foto.jpg"))
+        base = piramide.nivel_para((550, 350))      # Imagen sobre la que procesar la vista previa
+        vista = piramide.vista((550, 350))          # Original a tamaño de pantalla
+        foto = piramide.en_cache(('foto', 'original'), lambda: ImageTk.PhotoImage(vista))
+    """
+    def __init__(self, fuente, max_resultados=16):
+        self.fuente = fuente
+        self.max_resultados = max_resultados
+        self._niveles = {}
+        self._resultados = OrderedDict()  # clave -> resultado derivado, en orden de uso
+
+    def tamano_nivel(self, k):
+        ancho, alto = self.fuente.tamano
+        return (math.ceil(ancho / 2 ** k), math.ceil(alto / 2 ** k))
+
+    def indice_para(self, tamano):
+        """Mayor nivel cuyo tamaño sigue siendo al menos `tamano` en ambas dimensiones (0 si ninguno)."""
+        k = 0
+        while True:
+            ancho, alto = self.tamano_nivel(k + 1)
+            if ancho < tamano[0] or alto < tamano[1] or (ancho, alto) == self.tamano_nivel(k):
+                return k
+            k += 1
+
+    def nivel(self, k):
+        """Imagen RGB del nivel k (0 = resolución nativa)."""
+        if k == 0:
+            return self.fuente.completa()
+        if k not in self._niveles:
+            if self.fuente.formato == 'JPEG' and k <= NIVELES_DRAFT and not self.fuente.decodificada:
+                with Image.open(self.fuente.ruta) as imagen:
+                    imagen.draft(None, self.tamano_nivel(k))
+                    imagen = imagen.convert("RGB")
+                # draft puede quedarse en una escala menor si el archivo no la admite
+                if imagen.size != self.tamano_nivel(k):
+                    imagen = remuestrear(imagen, self.tamano_nivel(k), 'entrenamiento')
+                self._niveles[k] = imagen
+            else:
+                self._niveles[k] = self.nivel(k - 1).reduce(2)
+        return self._niveles[k]
+
+    def nivel_para(self, tamano):
+        """El nivel más pequeño adecuado para mostrar o procesar a `tamano`."""
+        return self.nivel(self.indice_para(tamano))
+
+    def vista(self, tamano):
+        """Original a tamaño de pantalla, remuestreado desde el nivel adecuado."""
+        return self.en_cache(('vista', tuple(tamano)),
+                             lambda: remuestrear(self.nivel_para(tamano), tamano, 'vista_previa'))
+
+    def en_cache(self, clave, crear):
+        """Devuelve el resultado guardado con `clave` o lo crea con crear() y lo guarda."""
+        if clave in self._resultados:
+            self._resultados.move_to_end(clave)
+            return self._resultados[clave]
+        resultado = crear()
+        self._resultados[clave] = resultado
+        while len(self._resultados) > self.max_resultados:
+            self._resultados.popitem(last=False)
+        return resultado
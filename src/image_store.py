@@ -0,0 +1,59 @@
+# src/image_store.py
+
+import io
+import os
+import hashlib
+from PIL import Image
+
+# Niveles de subcarpetas (2 caracteres hexadecimales cada uno) del almacén
+NIVELES_SHARD = 2
+
+def ruta_relativa_por_hash(digest, extension=".png"):
+    """Devuelve la ruta relativa 'ab/cd/abcd....png' para un hash SHA-256."""
+    partes = [digest[2 * i:2 * i + 2] for i in range(NIVELES_SHARD)]
+    return "/".join(partes + [digest + extension])
+
+# Formato de guardado -> extensión del archivo en el almacén
+EXTENSIONES = {"PNG": ".png", "JPEG": ".jpg"}
+
+def guardar_imagen_en_almacen(imagen, carpeta, formato="PNG"):
+    """
+    Guarda una imagen PIL en el almacén direccionado por contenido.
+
+    El nombre es el SHA-256 del archivo codificado (PNG por defecto), repartido en
+    subcarpetas, así que dos guardados nunca se pisan y una imagen idéntica se
+    guarda una sola vez.
+
+    Retorna un dict con 'name' (ruta relativa a la carpeta), 'path', 'sha256' y 'size'.
+    """
+    buffer = io.BytesIO()
+    imagen.save(buffer, format=formato)
+    datos = buffer.getvalue()
+    digest = hashlib.sha256(datos).hexdigest()
+
+    nombre = ruta_relativa_por_hash(digest, EXTENSIONES[formato])
+    ruta = os.path.join(carpeta, *nombre.split("/"))
+    if not os.path.exists(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Escritura atómica: un lector nunca ve un archivo a medio escribir
+        ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(ruta_tmp, 'wb') as f:
+            f.write(datos)
+        os.replace(ruta_tmp, ruta)
+
+    return {'name': nombre, 'path': ruta, 'sha256': digest, 'size': len(datos)}
+
+def leer_imagen_verificada(ruta, sha256=None, size=None):
+    """
+    Lee una imagen del almacén comprobando tamaño y hash antes de decodificarla.
+
+    Lanza FileNotFoundError si no existe y ValueError si el contenido no coincide
+    con el manifiesto (archivo corrupto o truncado).
+    """
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    if size is not None and len(datos) != size:
+        raise ValueError(f"Tamaño inesperado ({len(datos)} bytes, se esperaban {size}); archivo corrupto.")
+    if sha256 is not None and hashlib.sha256(datos).hexdigest() != sha256:
+        raise ValueError("El hash SHA-256 no coincide con el manifiesto; archivo corrupto.")
+    return Image.open(io.BytesIO(datos))
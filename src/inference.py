@@ -0,0 +1,263 @@
+# src/inference.py
+
+"""
+Pipeline de inferencia sin interfaz gráfica.
+
+Reúne lo que ApplicationApp hace dentro de la ventana de Tk: carga el modelo
+una sola vez junto con estadisticas.pkl (normalización, clases, extractor de
+características y el filtro/kernels con que se procesó el dataset) y prepara
+cada imagen exactamente como las del entrenamiento:
+    kernels + filtro de color -> 100x100 (imagen guardada) -> tamaño del modelo -> normalización
+
+ModeloRecargable vigila los archivos del modelo y cambia a la nueva versión
+en caliente: la carga y validación se hacen en segundo plano y el cambio es
+una sola asignación, así que lo que ya está en curso termina con la versión
+anterior. Cada predicción lleva el id de versión del modelo que la produjo.
+"""
+
+import io
+import os
+import time
+import pickle
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+from data_loader import DataLoader
+from instrumentation import medir
+from pipeline import procesar_imagen, TAMANO_GUARDADO
+from recursos import obtener_kernels
+
+def leer_artefacto(ruta):
+    """
+    Carga un pickle y calcula su id de versión a partir de los mismos bytes.
+    Retorna (objeto, version), con version = primeros 12 hex del SHA-256 del archivo.
+    """
+    with open(ruta, 'rb') as f:
+        datos = f.read()
+    return pickle.loads(datos), hashlib.sha256(datos).hexdigest()[:12]
+
+def abrir_imagen(imagen):
+    """Acepta una imagen PIL, la ruta de un archivo o sus bytes codificados; retorna una imagen PIL."""
+    if isinstance(imagen, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(imagen))
+    if isinstance(imagen, (str, os.PathLike)):
+        with Image.open(imagen) as archivo:
+            return archivo.convert("RGB")
+    return imagen
+
+class PipelineInferencia:
+    """
+    Modelo y preprocesamiento listos para clasificar lotes de imágenes PIL o bytes codificados.
+
+    Uso:
+        pipeline = PipelineInferencia.desde_carpeta(os.getcwd())
+        resultados = pipeline.clasificar([Image.open("pez.jpg")])
+    """
+    def __init__(self, modelo_path, estadisticas_path, kernels_path=None):
+        if not os.path.exists(modelo_path):
+            raise FileNotFoundError(f"No se encontró el modelo entrenado en la ruta:\n{modelo_path}")
+        if not os.path.exists(estadisticas_path):
+            raise FileNotFoundError(f"No se encontraron las estadísticas del modelo en la ruta:\n{estadisticas_path}")
+        self.modelo_path = modelo_path
+        self.estadisticas_path = estadisticas_path
+        self.modelo, self.version = leer_artefacto(modelo_path)
+        estadisticas, _ = leer_artefacto(estadisticas_path)
+        self.cargado = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.classes = list(estadisticas['classes'])
+        self.filtro = estadisticas.get('filter', 'none')
+        self.kernels = self._resolver_kernels(estadisticas.get('kernels_applied', []), kernels_path)
+
+        self.data_loader = DataLoader(None, image_size=tuple(estadisticas.get('image_size', (64, 64))), augment_data=False)
+        self.data_loader.feature_extractor = estadisticas.get('extractor')
+        if self.data_loader.feature_extractor is None:
+            self.data_loader.mean = estadisticas['mean']
+            self.data_loader.std = estadisticas['std']
+        entrada = (self.data_loader.feature_extractor.dimension if self.data_loader.feature_extractor is not None
+                   else len(self.data_loader.mean))
+        if entrada != self.modelo.input_size or len(self.classes) != self.modelo.output_size:
+            raise ValueError("Las estadísticas guardadas no corresponden al modelo (tamaño de entrada o número de clases).")
+
+    @classmethod
+    def desde_carpeta(cls, carpeta_raiz, modelo_path=None):
+        """Crea el pipeline con las rutas estándar del proyecto (models/ y data/kernel.json)."""
+        models_dir = os.path.join(carpeta_raiz, "models")
+        return cls(modelo_path or os.path.join(models_dir, "modelo_neural.pkl"),
+                   os.path.join(models_dir, "estadisticas.pkl"),
+                   os.path.join(carpeta_raiz, "data", "kernel.json"))
+
+    @property
+    def actual(self):
+        """Un pipeline fijo es su propia fuente (misma interfaz que ModeloRecargable)."""
+        return self
+
+    def validar(self):
+        """Predicción de prueba: el modelo debe producir probabilidades finitas para todas las clases."""
+        if self.data_loader.feature_extractor is not None:
+            ancho, alto = self.data_loader.image_size
+            X = self.data_loader.feature_extractor.transformar(np.full((1, alto, ancho, 3), 0.5, dtype=np.float32))
+        else:
+            X = np.zeros((1, self.modelo.input_size))
+        probabilidades = self.modelo.predict_proba(X)
+        if probabilidades.shape != (1, len(self.classes)) or not np.all(np.isfinite(probabilidades)):
+            raise ValueError("El modelo produce salidas no válidas (NaN, infinito o forma incorrecta).")
+        return self
+
+    @staticmethod
+    def _resolver_kernels(nombres, kernels_path):
+        """Convierte los nombres de kernels_applied en los kernels de kernel.json, en el mismo orden."""
+        if not nombres:
+            return []
+        if kernels_path is None:
+            raise ValueError("El modelo se entrenó con kernels aplicados pero no se indicó kernel.json.")
+        por_nombre = {kernel['name']: kernel for kernel in obtener_kernels(kernels_path)}
+        faltantes = [nombre for nombre in nombres if nombre not in por_nombre]
+        if faltantes:
+            raise ValueError(f"Kernels del entrenamiento no encontrados en kernel.json: {', '.join(faltantes)}")
+        return [por_nombre[nombre] for nombre in nombres]
+
+    @property
+    def clave_pipeline(self):
+        """Identifica el tratamiento de imagen (filtro y kernels); igual clave = misma imagen preparada."""
+        return (self.filtro, tuple(kernel['name'] for kernel in self.kernels))
+
+    def preparar(self, imagen):
+        """Aplica a una imagen PIL los kernels y el filtro del entrenamiento y la lleva a TAMANO_GUARDADO."""
+        imagen = procesar_imagen(imagen, self.filtro, self.kernels)
+        return imagen.resize(TAMANO_GUARDADO, Image.LANCZOS)
+
+    def vectorizar(self, imagen_preparada):
+        """Convierte una imagen ya preparada en el vector de entrada del modelo."""
+        vector = self.data_loader.load_single_image(imagen_preparada)
+        if vector is None:
+            raise ValueError("No se pudo preparar la imagen para la predicción.")
+        return vector
+
+    def preprocesar(self, imagen):
+        """Convierte una imagen PIL (o la ruta o los bytes de un archivo de imagen) en el vector de entrada del modelo."""
+        with medir('preprocess'):
+            return self.vectorizar(self.preparar(abrir_imagen(imagen)))
+
+    def predecir(self, X):
+        """Predice un lote de vectores ya preprocesados; retorna (indices, confianzas)."""
+        with medir('predict'):
+            return self.modelo.predict(np.asarray(X))
+
+    def predecir_proba(self, X):
+        """Probabilidades por clase de un lote de vectores ya preprocesados."""
+        with medir('predict'):
+            return self.modelo.predict_proba(np.asarray(X))
+
+    def resultados(self, indices, confianzas):
+        """Convierte la salida de predecir en dicts serializables (con la versión del modelo)."""
+        return [{'clase': self.classes[int(indice)], 'indice': int(indice), 'confianza': float(confianza),
+                 'version': self.version}
+                for indice, confianza in zip(indices, confianzas)]
+
+    def clasificar(self, imagenes):
+        """Preprocesa y clasifica una lista de imágenes en un único lote."""
+        X = np.stack([self.preprocesar(imagen) for imagen in imagenes])
+        return self.resultados(*self.predecir(X))
+
+class ModeloRecargable:
+    """
+    Fuente de PipelineInferencia que se actualiza sola cuando cambian los archivos del modelo.
+
+    Un hilo consulta cada `intervalo` segundos la firma (mtime, tamaño) de las
+    rutas vigiladas. Cuando cambian y se mantienen estables durante una consulta
+    (el entrenamiento guarda el modelo y las estadísticas por separado), se crea
+    y valida el pipeline nuevo en ese mismo hilo y se publica en `actual`. Si la
+    validación falla se sigue sirviendo la versión anterior.
+
+    Uso:
+        fuente = ModeloRecargable.desde_carpeta(os.getcwd())
+        fuente.iniciar()
+        pipeline = fuente.actual  # Tomar una referencia por solicitud o por lote
+    """
+    def __init__(self, crear_pipeline, rutas, intervalo=2.0, callback=None):
+        self.crear_pipeline = crear_pipeline
+        self.rutas = list(rutas)
+        self.intervalo = intervalo
+        self.callback = callback
+        self.recargas = 0
+        self.ultimo_error = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._firmas_cargadas = self._firmas()
+        self._firmas_pendientes = None
+        self.actual = crear_pipeline().validar()
+
+    @classmethod
+    def desde_carpeta(cls, carpeta_raiz, modelo_path=None, intervalo=2.0, callback=None):
+        models_dir = os.path.join(carpeta_raiz, "models")
+        modelo_path = modelo_path or os.path.join(models_dir, "modelo_neural.pkl")
+        estadisticas_path = os.path.join(models_dir, "estadisticas.pkl")
+        kernels_path = os.path.join(carpeta_raiz, "data", "kernel.json")
+        return cls(lambda: PipelineInferencia(modelo_path, estadisticas_path, kernels_path),
+                   [modelo_path, estadisticas_path], intervalo, callback)
+
+    def _firmas(self):
+        firmas = []
+        for ruta in self.rutas:
+            try:
+                estado = os.stat(ruta)
+                firmas.append((estado.st_mtime_ns, estado.st_size))
+            except FileNotFoundError:
+                firmas.append(None)
+        return tuple(firmas)
+
+    def comprobar(self):
+        """Una consulta de la vigilancia; retorna True si se instaló una versión nueva."""
+        firmas = self._firmas()
+        if firmas == self._firmas_cargadas or None in firmas:
+            self._firmas_pendientes = None
+            return False
+        if firmas != self._firmas_pendientes:
+            self._firmas_pendientes = firmas  # Esperar a que los archivos dejen de cambiar
+            return False
+        return self.recargar(firmas)
+
+    def recargar(self, firmas=None):
+        """Carga, valida y publica el pipeline nuevo; retorna True si se instaló."""
+        firmas = firmas or self._firmas()
+        with self._lock:
+            self._firmas_cargadas = firmas  # No reintentar hasta que los archivos vuelvan a cambiar
+            self._firmas_pendientes = None
+            try:
+                nuevo = self.crear_pipeline().validar()
+            except Exception as e:
+                self.ultimo_error = f"{time.strftime('%Y-%m-%dT%H:%M:%S')}: {e}"
+                print(f"Advertencia: No se pudo recargar el modelo, se mantiene la versión {self.actual.version}: {e}")
+                return False
+            if nuevo.version == self.actual.version:
+                return False  # Mismos modelos (p. ej. en el registro solo cambió otra etiqueta)
+            anterior = self.actual
+            self.actual = nuevo  # Cambio atómico: las solicitudes en curso conservan su referencia
+            self.recargas += 1
+            self.ultimo_error = None
+        print(f"Modelo recargado: versión {anterior.version} -> {nuevo.version}")
+        if self.callback is not None:
+            self.callback(nuevo)
+        return True
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.comprobar()
+            except Exception as e:
+                print(f"Error al vigilar el modelo: {e}")
+
+    def iniciar(self):
+        """Inicia la vigilancia en un hilo en segundo plano."""
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._vigilar, name='vigilancia_modelo', daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
@@ -0,0 +1,334 @@
+# src/inference_server.py
+
+"""
+Servidor HTTP local de inferencia con micro-lotes dinámicos (solo biblioteca estándar + numpy).
+
+El modelo se carga una vez al arrancar. Las solicitudes concurrentes se
+preprocesan en un pool de hilos y se agrupan en micro-lotes para una sola
+llamada a predict: un lote se cierra al llegar a --max-lote imágenes o cuando
+la primera lleva --max-espera-ms esperando, lo que ocurra antes.
+
+Rutas:
+    POST /predecir   Cuerpo: bytes de la imagen (JPEG, PNG...). Responde JSON con la clase.
+    GET  /metricas   Latencias (p50/p95/p99), rendimiento y tamaños de lote.
+    GET  /salud      Estado del servidor y versión del modelo servido.
+
+El modelo se recarga en caliente cuando cambian sus archivos (ver
+ModeloRecargable en inference.py); cada respuesta indica la versión usada.
+Con --modelos se sirven versiones del registro (model_registry.py); varias
+forman un conjunto que comparte el preprocesamiento y promedia probabilidades.
+
+Uso:
+    python src/inference_server.py --puerto 8080 --max-lote 32 --max-espera-ms 5 --intervalo-recarga 2
+    python src/inference_server.py --modelos produccion candidato
+    curl --data-binary @pez.jpg http://127.0.0.1:8080/predecir
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from model_registry import crear_fuente
+
+MAX_CUERPO = 20 * 1024 * 1024  # Bytes máximos por imagen subida
+ESTADOS_HTTP = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class CuerpoDemasiadoGrande(Exception):
+    """La imagen subida supera MAX_CUERPO."""
+
+class MetricasServidor:
+    """Contadores y ventanas deslizantes de latencia y tamaño de lote."""
+    def __init__(self, ventana=10000):
+        self.inicio = time.perf_counter()
+        self.latencias = deque(maxlen=ventana)  # (instante, segundos)
+        self.tamanos_lote = Counter()
+        self.solicitudes = 0
+        self.errores = 0
+        self.lotes = 0
+        self.tiempo_prediccion = 0.0
+
+    def registrar_solicitud(self, latencia, error=False):
+        self.solicitudes += 1
+        if error:
+            self.errores += 1
+        else:
+            self.latencias.append((time.perf_counter(), latencia))
+
+    def registrar_lote(self, tamano, duracion):
+        self.lotes += 1
+        self.tamanos_lote[tamano] += 1
+        self.tiempo_prediccion += duracion
+
+    def resumen(self, ventana_reciente=10.0):
+        ahora = time.perf_counter()
+        activo = ahora - self.inicio
+        latencias = np.array([latencia for _, latencia in self.latencias]) * 1000
+        recientes = sum(1 for instante, _ in self.latencias if ahora - instante <= ventana_reciente)
+        imagenes = sum(tamano * veces for tamano, veces in self.tamanos_lote.items())
+        resumen = {
+            'tiempo_activo_s': activo,
+            'solicitudes': self.solicitudes,
+            'errores': self.errores,
+            'solicitudes_por_s': self.solicitudes / activo if activo > 0 else 0.0,
+            'solicitudes_por_s_recientes': recientes / min(ventana_reciente, activo) if activo > 0 else 0.0,
+            'lotes': self.lotes,
+            'tamano_lote_medio': imagenes / self.lotes if self.lotes else 0.0,
+            'histograma_lotes': {str(tamano): veces for tamano, veces in sorted(self.tamanos_lote.items())},
+            'prediccion_ms_por_lote': self.tiempo_prediccion / self.lotes * 1000 if self.lotes else 0.0,
+        }
+        if len(latencias):
+            p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+            resumen['latencia_ms'] = {'media': float(latencias.mean()), 'p50': float(p50), 'p95': float(p95),
+                                      'p99': float(p99), 'max': float(latencias.max())}
+        return resumen
+
+class LoteadorDinamico:
+    """
+    Agrupa las solicitudes concurrentes en micro-lotes para el modelo.
+
+    El preprocesado (decodificar, kernels, filtro, normalización) corre en un pool
+    de hilos; la predicción en un único hilo dedicado, de modo que mientras el
+    modelo procesa un lote el siguiente ya se va formando.
+
+    fuente es un PipelineInferencia o un ModeloRecargable: cada solicitud toma
+    fuente.actual al llegar y se predice con ese mismo pipeline aunque el modelo
+    se recargue mientras espera.
+    """
+    def __init__(self, fuente, max_lote=32, max_espera_ms=5.0, hilos_preprocesado=None, metricas=None):
+        self.fuente = fuente
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000.0
+        self.metricas = metricas or MetricasServidor()
+        self._preprocesado = ThreadPoolExecutor(max_workers=hilos_preprocesado or os.cpu_count() or 1,
+                                                thread_name_prefix='preprocesado')
+        self._prediccion = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prediccion')
+        self._cola = None
+        self._hay_datos = None
+        self._tarea = None
+
+    async def iniciar(self):
+        self._cola = asyncio.Queue()
+        self._hay_datos = asyncio.Event()
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def cerrar(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+        self._preprocesado.shutdown(wait=False)
+        self._prediccion.shutdown(wait=False)
+
+    async def clasificar(self, datos):
+        """Preprocesa los bytes de una imagen y espera el resultado de su micro-lote."""
+        loop = asyncio.get_running_loop()
+        pipeline = self.fuente.actual
+        vector = await loop.run_in_executor(self._preprocesado, pipeline.preprocesar, datos)
+        futuro = loop.create_future()
+        self._cola.put_nowait((pipeline, vector, futuro))
+        self._hay_datos.set()
+        return await futuro
+
+    async def _formar_lote(self):
+        """Espera la primera solicitud y añade las que lleguen hasta max_lote o max_espera."""
+        loop = asyncio.get_running_loop()
+        lote = [await self._cola.get()]
+        limite = loop.time() + self.max_espera
+        while len(lote) < self.max_lote:
+            try:
+                lote.append(self._cola.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            restante = limite - loop.time()
+            if restante <= 0:
+                break
+            self._hay_datos.clear()
+            try:
+                await asyncio.wait_for(self._hay_datos.wait(), restante)
+            except asyncio.TimeoutError:
+                break
+        return lote
+
+    async def _bucle(self):
+        while True:
+            lote = await self._formar_lote()
+            # Durante una recarga un lote puede mezclar versiones: cada grupo usa su pipeline
+            grupos = {}
+            for pipeline, vector, futuro in lote:
+                grupos.setdefault(id(pipeline), (pipeline, []))[1].append((vector, futuro))
+            for pipeline, elementos in grupos.values():
+                await self._predecir_grupo(pipeline, elementos)
+
+    async def _predecir_grupo(self, pipeline, elementos):
+        loop = asyncio.get_running_loop()
+        X = np.stack([vector for vector, _ in elementos])
+        inicio = time.perf_counter()
+        try:
+            indices, confianzas = await loop.run_in_executor(self._prediccion, pipeline.predecir, X)
+            resultados = pipeline.resultados(indices, confianzas)
+        except Exception as e:
+            for _, futuro in elementos:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        finally:
+            self.metricas.registrar_lote(len(elementos), time.perf_counter() - inicio)
+        for (_, futuro), resultado in zip(elementos, resultados):
+            if not futuro.done():  # El cliente pudo desconectarse mientras tanto
+                resultado['tamano_lote'] = len(elementos)
+                futuro.set_result(resultado)
+
+class ServidorInferencia:
+    """Servidor HTTP/1.1 mínimo (con keep-alive) sobre asyncio."""
+    def __init__(self, fuente, host='127.0.0.1', puerto=8080, max_lote=32, max_espera_ms=5.0,
+                 hilos_preprocesado=None):
+        self.fuente = fuente
+        self.host = host
+        self.puerto = puerto
+        self.metricas = MetricasServidor()
+        self.loteador = LoteadorDinamico(fuente, max_lote, max_espera_ms, hilos_preprocesado, self.metricas)
+        self._servidor = None
+
+    async def iniciar(self):
+        await self.loteador.iniciar()
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]  # Puerto real si se pidió el 0
+        print(f"Servidor de inferencia escuchando en http://{self.host}:{self.puerto} "
+              f"(max_lote={self.loteador.max_lote}, max_espera={self.loteador.max_espera * 1000:.1f} ms)")
+
+    async def servir(self):
+        await self.iniciar()
+        try:
+            async with self._servidor:
+                await self._servidor.serve_forever()
+        finally:
+            await self.loteador.cerrar()
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        await self.loteador.cerrar()
+
+    async def _leer_solicitud(self, reader):
+        """Lee una solicitud HTTP; retorna (metodo, ruta, cabeceras, cuerpo) o None si el cliente cerró."""
+        try:
+            encabezado = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        lineas = encabezado.decode('latin-1').split("\r\n")
+        metodo, ruta, _ = lineas[0].split(" ", 2)
+        cabeceras = {}
+        for linea in lineas[1:]:
+            if ":" in linea:
+                nombre, valor = linea.split(":", 1)
+                cabeceras[nombre.strip().lower()] = valor.strip()
+        longitud = int(cabeceras.get('content-length', 0))
+        if longitud > MAX_CUERPO:
+            raise CuerpoDemasiadoGrande(longitud)
+        cuerpo = await reader.readexactly(longitud) if longitud else b""
+        return metodo, ruta.split("?", 1)[0], cabeceras, cuerpo
+
+    async def _responder(self, writer, estado, contenido, mantener):
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode('utf-8')
+        writer.write((f"HTTP/1.1 {estado} {ESTADOS_HTTP[estado]}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(cuerpo)}\r\n"
+                      f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n").encode('latin-1') + cuerpo)
+        await writer.drain()
+
+    async def _atender(self, reader, writer):
+        """Atiende una conexión; con keep-alive sirve varias solicitudes seguidas."""
+        try:
+            while True:
+                try:
+                    solicitud = await self._leer_solicitud(reader)
+                except CuerpoDemasiadoGrande:
+                    await self._responder(writer, 413, {'error': f"La imagen supera {MAX_CUERPO} bytes."}, False)
+                    break
+                except (ValueError, asyncio.LimitOverrunError):
+                    estado = 400
+                    await self._responder(writer, estado, {'error': ESTADOS_HTTP[estado]}, False)
+                    break
+                if solicitud is None:
+                    break
+                metodo, ruta, cabeceras, cuerpo = solicitud
+                mantener = cabeceras.get('connection', '').lower() != 'close'
+                estado, contenido = await self._despachar(metodo, ruta, cuerpo)
+                await self._responder(writer, estado, contenido, mantener)
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _despachar(self, metodo, ruta, cuerpo):
+        if ruta == '/predecir':
+            if metodo != 'POST':
+                return 405, {'error': "Usa POST con los bytes de la imagen como cuerpo."}
+            if not cuerpo:
+                return 400, {'error': "La solicitud no contiene una imagen."}
+            inicio = time.perf_counter()
+            try:
+                resultado = await self.loteador.clasificar(cuerpo)
+            except ValueError as e:
+                self.metricas.registrar_solicitud(time.perf_counter() - inicio, error=True)
+                return 400, {'error': str(e)}
+            except Exception as e:
+                self.metricas.registrar_solicitud(time.perf_counter() - inicio, error=True)
+                # PIL lanza UnidentifiedImageError (OSError) con bytes que no son una imagen
+                return (400 if isinstance(e, OSError) else 500), {'error': str(e)}
+            latencia = time.perf_counter() - inicio
+            self.metricas.registrar_solicitud(latencia)
+            resultado['latencia_ms'] = latencia * 1000
+            return 200, resultado
+        if ruta == '/metricas' and metodo == 'GET':
+            resumen = self.metricas.resumen()
+            resumen['max_lote'] = self.loteador.max_lote
+            resumen['max_espera_ms'] = self.loteador.max_espera * 1000
+            resumen['version'] = self.fuente.actual.version
+            resumen['recargas'] = getattr(self.fuente, 'recargas', 0)
+            return 200, resumen
+        if ruta == '/salud' and metodo == 'GET':
+            pipeline = self.fuente.actual
+            return 200, {'estado': 'ok', 'modelo': pipeline.modelo_path, 'version': pipeline.version,
+                         'cargado': pipeline.cargado, 'clases': pipeline.classes,
+                         'recargas': getattr(self.fuente, 'recargas', 0),
+                         'ultimo_error_recarga': getattr(self.fuente, 'ultimo_error', None)}
+        return 404, {'error': f"Ruta no encontrada: {ruta}"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP local de inferencia con micro-lotes dinámicos.")
+    parser.add_argument("--carpeta", default=os.getcwd(), help="Carpeta raíz del proyecto (models/ y data/).")
+    parser.add_argument("--modelo", default=None, help="Modelo a servir (por defecto models/modelo_neural.pkl).")
+    parser.add_argument("--modelos", nargs='+', default=None,
+                        help="Versiones o etiquetas del registro de modelos; varias forman un conjunto.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--max-lote", type=int, default=32, help="Imágenes máximas por micro-lote.")
+    parser.add_argument("--max-espera-ms", type=float, default=5.0,
+                        help="Espera máxima de la primera imagen de un lote antes de predecir.")
+    parser.add_argument("--hilos", type=int, default=None, help="Hilos de preprocesado (por defecto, núcleos).")
+    parser.add_argument("--intervalo-recarga", type=float, default=2.0,
+                        help="Segundos entre comprobaciones del modelo para recargarlo en caliente (0 = sin recarga).")
+    args = parser.parse_args()
+
+    fuente = crear_fuente(args.carpeta, args.modelo, args.modelos, args.intervalo_recarga)
+    print(f"Modelo cargado: versión {fuente.actual.version}")
+    servidor = ServidorInferencia(fuente, args.host, args.puerto, args.max_lote, args.max_espera_ms, args.hilos)
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# src/instrumentation.py
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+class _TemporizadorNulo:
+    """Contexto vacío que se devuelve cuando la instrumentación está desactivada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULO = _TemporizadorNulo()
+
+class _Temporizador:
+    __slots__ = ('instrumentacion', 'nombre', 'inicio')
+
+    def __init__(self, instrumentacion, nombre):
+        self.instrumentacion = instrumentacion
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentacion.registrar_tiempo(self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+class Instrumentacion:
+    """
+    Temporizadores y contadores con nombre para las rutas críticas del pipeline.
+
+    Se activa con la variable de entorno PECES_INSTRUMENTACION=1. Con
+    PECES_PERFIL=cprofile o PECES_PERFIL=tracemalloc se captura además un perfil
+    entre iniciar_captura() y detener_captura().
+
+    Uso:
+        with instrumentacion.medir("forward"):
+            ...
+    """
+    def __init__(self, habilitada=None, modo_perfil=None):
+        if habilitada is None:
+            habilitada = os.environ.get('PECES_INSTRUMENTACION', '') not in ('', '0')
+        if modo_perfil is None:
+            modo_perfil = os.environ.get('PECES_PERFIL', '').lower()
+        self.habilitada = habilitada or bool(modo_perfil)
+        self.modo_perfil = modo_perfil
+        self._lock = threading.Lock()
+        self._perfil = None
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Borra los tiempos, contadores y el último perfil capturado."""
+        with self._lock:
+            self.tiempos = {}  # nombre -> [llamadas, total_s, max_s]
+            self.contadores = {}
+            self.texto_perfil = None
+            self.inicio = time.time()
+
+    def medir(self, nombre):
+        """Devuelve un contexto que mide el tiempo del bloque (no hace nada si está desactivada)."""
+        if not self.habilitada:
+            return _NULO
+        return _Temporizador(self, nombre)
+
+    def registrar_tiempo(self, nombre, segundos):
+        with self._lock:
+            registro = self.tiempos.get(nombre)
+            if registro is None:
+                self.tiempos[nombre] = [1, segundos, segundos]
+            else:
+                registro[0] += 1
+                registro[1] += segundos
+                if segundos > registro[2]:
+                    registro[2] = segundos
+
+    def contar(self, nombre, cantidad=1):
+        """Incrementa un contador con nombre."""
+        if not self.habilitada:
+            return
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def iniciar_captura(self):
+        """Inicia la captura de perfil configurada (solo afecta al hilo que la llama en cProfile)."""
+        if self.modo_perfil == 'cprofile':
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        elif self.modo_perfil == 'tracemalloc':
+            tracemalloc.start(10)
+
+    @property
+    def capturando(self):
+        """True mientras hay una captura de perfil activa."""
+        if self.modo_perfil == 'cprofile':
+            return self._perfil is not None
+        return self.modo_perfil == 'tracemalloc' and tracemalloc.is_tracing()
+
+    def detener_captura(self, limite=25):
+        """Detiene la captura y guarda un resumen en texto de las entradas más costosas."""
+        texto = None
+        if self.modo_perfil == 'cprofile' and self._perfil is not None:
+            self._perfil.disable()
+            salida = io.StringIO()
+            pstats.Stats(self._perfil, stream=salida).sort_stats('cumulative').print_stats(limite)
+            texto = salida.getvalue()
+            self._perfil = None
+        elif self.modo_perfil == 'tracemalloc' and tracemalloc.is_tracing():
+            actual, pico = tracemalloc.get_traced_memory()
+            estadisticas = tracemalloc.take_snapshot().statistics('lineno')[:limite]
+            tracemalloc.stop()
+            lineas = [f"Memoria actual: {actual / 1e6:.1f} MB, pico: {pico / 1e6:.1f} MB"]
+            lineas.extend(str(e) for e in estadisticas)
+            texto = "\n".join(lineas)
+        self.texto_perfil = texto
+        return texto
+
+    def resumen(self):
+        """Devuelve un dict con los tiempos agregados, los contadores y el perfil."""
+        with self._lock:
+            tiempos = {
+                nombre: {
+                    'llamadas': llamadas,
+                    'total_s': total,
+                    'media_ms': total / llamadas * 1000,
+                    'max_ms': maximo * 1000
+                }
+                for nombre, (llamadas, total, maximo) in self.tiempos.items()
+            }
+            return {
+                'duracion_s': time.time() - self.inicio,
+                'tiempos': tiempos,
+                'contadores': dict(self.contadores),
+                'perfil': self.texto_perfil
+            }
+
+    def texto_resumen(self):
+        """Formatea el resumen como tabla de texto para la consola."""
+        resumen = self.resumen()
+        lineas = [f"{'Etapa':<14}{'Llamadas':>10}{'Total (s)':>12}{'Media (ms)':>12}{'Máx (ms)':>12}"]
+        ordenados = sorted(resumen['tiempos'].items(), key=lambda item: -item[1]['total_s'])
+        for nombre, t in ordenados:
+            lineas.append(f"{nombre:<14}{t['llamadas']:>10}{t['total_s']:>12.3f}{t['media_ms']:>12.3f}{t['max_ms']:>12.3f}")
+        for nombre, valor in sorted(resumen['contadores'].items()):
+            lineas.append(f"{nombre}: {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def guardar_resumen(self, ruta):
+        """Guarda el resumen en JSON."""
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=4)
+        return ruta
+
+# Instancia compartida por todo el proceso
+instrumentacion = Instrumentacion()
+
+def medir(nombre):
+    """Atajo para instrumentacion.medir(nombre)."""
+    return instrumentacion.medir(nombre)
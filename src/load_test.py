@@ -0,0 +1,130 @@
+# src/load_test.py
+
+"""
+Prueba de carga del servidor de inferencia (inference_server.py) en localhost.
+
+Abre --concurrencia conexiones keep-alive que envían la misma imagen en bucle
+durante --duracion segundos y reporta rendimiento y latencias del lado del
+cliente junto con las métricas del servidor (tamaño medio de los micro-lotes).
+
+Uso:
+    python src/inference_server.py --max-lote 32 --max-espera-ms 5 &
+    python src/load_test.py --imagen pez.jpg --concurrencia 32 --duracion 10
+"""
+
+import io
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from PIL import Image
+
+async def _solicitud(reader, writer, host, metodo, ruta, cuerpo=b""):
+    """Envía una solicitud HTTP/1.1 keep-alive y devuelve (estado, json)."""
+    writer.write((f"{metodo} {ruta} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/octet-stream\r\n"
+                  f"Content-Length: {len(cuerpo)}\r\n\r\n").encode('latin-1') + cuerpo)
+    await writer.drain()
+    encabezado = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1').split("\r\n")
+    estado = int(encabezado[0].split(" ")[1])
+    longitud = 0
+    for linea in encabezado[1:]:
+        if linea.lower().startswith("content-length:"):
+            longitud = int(linea.split(":", 1)[1])
+    return estado, json.loads(await reader.readexactly(longitud))
+
+async def _cliente(host, puerto, imagen, fin, latencias, errores):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            estado, _ = await _solicitud(reader, writer, host, "POST", "/predecir", imagen)
+            if estado == 200:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                errores.append(estado)
+    finally:
+        writer.close()
+
+async def consultar(host, puerto, ruta):
+    """Consulta una ruta GET del servidor (p. ej. /metricas) y devuelve su JSON."""
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        return (await _solicitud(reader, writer, host, "GET", ruta))[1]
+    finally:
+        writer.close()
+
+async def prueba_carga(host, puerto, imagen, concurrencia=16, duracion=10.0):
+    """Ejecuta la prueba y devuelve un dict con el rendimiento y las latencias observadas por los clientes."""
+    latencias = []
+    errores = []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*[_cliente(host, puerto, imagen, fin, latencias, errores) for _ in range(concurrencia)])
+    transcurrido = time.perf_counter() - inicio
+    latencias_ms = np.array(latencias) * 1000
+    resultado = {
+        'concurrencia': concurrencia,
+        'duracion_s': transcurrido,
+        'solicitudes': len(latencias),
+        'errores': len(errores),
+        'solicitudes_por_s': len(latencias) / transcurrido,
+    }
+    if len(latencias_ms):
+        p50, p95, p99 = np.percentile(latencias_ms, [50, 95, 99])
+        resultado['latencia_ms'] = {'media': float(latencias_ms.mean()), 'p50': float(p50), 'p95': float(p95),
+                                    'p99': float(p99), 'max': float(latencias_ms.max())}
+    resultado['servidor'] = await consultar(host, puerto, "/metricas")
+    return resultado
+
+def imagen_sintetica(resolucion=(640, 480), seed=0):
+    """Imagen JPEG aleatoria para probar sin depender de archivos del dataset."""
+    rng = np.random.default_rng(seed)
+    pixeles = rng.integers(0, 256, size=(resolucion[1], resolucion[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixeles).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def texto_resultado(resultado):
+    texto = (f"Concurrencia {resultado['concurrencia']}: {resultado['solicitudes']} solicitudes en "
+             f"{resultado['duracion_s']:.2f}s -> {resultado['solicitudes_por_s']:.1f} solicitudes/s, "
+             f"{resultado['errores']} errores\n")
+    if 'latencia_ms' in resultado:
+        latencia = resultado['latencia_ms']
+        texto += (f"Latencia (cliente): media {latencia['media']:.1f} ms, p50 {latencia['p50']:.1f} ms, "
+                  f"p95 {latencia['p95']:.1f} ms, p99 {latencia['p99']:.1f} ms\n")
+    servidor = resultado['servidor']
+    texto += (f"Servidor: {servidor['lotes']} lotes, tamaño medio {servidor['tamano_lote_medio']:.1f} "
+              f"(max_lote={servidor['max_lote']}, max_espera={servidor['max_espera_ms']:.1f} ms), "
+              f"predicción {servidor['prediccion_ms_por_lote']:.2f} ms por lote\n")
+    return texto
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de inferencia local.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--imagen", default=None, help="Imagen a enviar (por defecto, una sintética 640x480).")
+    parser.add_argument("--concurrencia", type=int, nargs='+', default=[1, 8, 32],
+                        help="Clientes simultáneos; con varios valores se prueba cada uno.")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por nivel de concurrencia.")
+    parser.add_argument("--salida", default=None, help="Guardar los resultados en JSON.")
+    args = parser.parse_args()
+
+    if args.imagen:
+        with open(args.imagen, 'rb') as f:
+            imagen = f.read()
+    else:
+        imagen = imagen_sintetica()
+
+    resultados = []
+    for concurrencia in args.concurrencia:
+        resultado = asyncio.run(prueba_carga(args.host, args.puerto, imagen, concurrencia, args.duracion))
+        print(texto_resultado(resultado))
+        resultados.append(resultado)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=4)
+        print(f"Resultados guardados en {args.salida}")
+
+if __name__ == "__main__":
+    main()
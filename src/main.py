@@ -3,9 +3,10 @@
 import tkinter as tk
 from tkinter import ttk
 import os
-from image_processor import TratamientoFrame
-from training_app import TrainingApp
-from application_app import ApplicationApp
+from instrumentation import medir
+
+# Los frames se importan al mostrarlos por primera vez: training_app arrastra
+# matplotlib y no hace falta cargarlo para arrancar en Tratamiento de Imágenes.
 
 class MainApp(tk.Tk):
     def __init__(self):
@@ -27,10 +28,11 @@ class MainApp(tk.Tk):
         # Crear los botones de navegación
         self.create_navigation_buttons()
 
-        # Inicializar las variables para los frames
+        # Inicializar las variables para los frames (se crean una vez y se reutilizan)
         self.tratamiento_frame = None
         self.entrenamiento_frame = None
         self.aplicacion_frame = None
+        self.frame_visible = None
 
         # Mostrar el frame inicial (Tratamiento de Imágenes)
         self.mostrar_tratamiento()
@@ -63,37 +65,50 @@ class MainApp(tk.Tk):
 
     def mostrar_tratamiento(self):
         """Muestra la fase de Tratamiento de Imágenes."""
-        self.limpiar_frame_contenedor()
-        self.tratamiento_frame = TratamientoFrame(
-            self.frame_contenedor,
-            carpeta_guardado=os.path.join(
-                self.carpeta_raiz, "imagenes_procesadas"
-            )
-        )
-        self.tratamiento_frame.pack(fill=tk.BOTH, expand=True)
+        if self.tratamiento_frame is None:
+            with medir('tab_tratamiento'):
+                from image_processor import TratamientoFrame
+                self.tratamiento_frame = TratamientoFrame(
+                    self.frame_contenedor,
+                    carpeta_guardado=os.path.join(
+                        self.carpeta_raiz, "imagenes_procesadas"
+                    )
+                )
+        self.mostrar_frame(self.tratamiento_frame)
 
     def mostrar_entrenamiento(self):
         """Muestra la fase de Entrenamiento."""
-        self.limpiar_frame_contenedor()
-        self.entrenamiento_frame = TrainingApp(
-            self.frame_contenedor,
-            carpeta_raiz=self.carpeta_raiz
-        )
-        self.entrenamiento_frame.pack(fill=tk.BOTH, expand=True)
+        if self.entrenamiento_frame is None:
+            with medir('tab_entrenamiento'):
+                from training_app import TrainingApp
+                self.entrenamiento_frame = TrainingApp(
+                    self.frame_contenedor,
+                    carpeta_raiz=self.carpeta_raiz
+                )
+        self.mostrar_frame(self.entrenamiento_frame)
 
     def mostrar_aplicacion(self):
         """Muestra la fase de Aplicación."""
-        self.limpiar_frame_contenedor()
-        self.aplicacion_frame = ApplicationApp(
-            self.frame_contenedor,
-            carpeta_raiz=self.carpeta_raiz
-        )
-        self.aplicacion_frame.pack(fill=tk.BOTH, expand=True)
-
-    def limpiar_frame_contenedor(self):
-        """Limpia el frame contenedor antes de mostrar una nueva fase."""
-        for widget in self.frame_contenedor.winfo_children():
-            widget.destroy()
+        if self.aplicacion_frame is None:
+            with medir('tab_aplicacion'):
+                from application_app import ApplicationApp
+                self.aplicacion_frame = ApplicationApp(
+                    self.frame_contenedor,
+                    carpeta_raiz=self.carpeta_raiz
+                )
+        else:
+            # Recoger un modelo recién entrenado (solo recarga si el archivo cambió)
+            self.aplicacion_frame.refrescar_modelo()
+        self.mostrar_frame(self.aplicacion_frame)
+
+    def mostrar_frame(self, frame):
+        """Oculta la fase visible y muestra la indicada, sin destruir ni reconstruir frames."""
+        if self.frame_visible is frame:
+            return
+        if self.frame_visible is not None:
+            self.frame_visible.pack_forget()
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.frame_visible = frame
 
 if __name__ == "__main__":
     app = MainApp()
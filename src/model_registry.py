@@ -0,0 +1,247 @@
+# src/model_registry.py
+
+"""
+Registro de modelos versionados.
+
+Estructura (dentro de models/registro):
+    indice.json                   {"versiones": [ids en orden], "etiquetas": {"produccion": id, ...}}
+    <id>/modelo_neural.pkl
+    <id>/estadisticas.pkl
+    <id>/metadatos.json           precisión, huella del dataset, pipeline, arquitectura, clases...
+
+Cada entrenamiento se registra como una versión nueva e inmutable (id = fecha y
+versión del modelo); models/modelo_neural.pkl sigue siendo el modelo "actual".
+Las etiquetas apuntan a una versión y se mueven reescribiendo solo indice.json,
+que es el archivo que vigila ModeloRecargable cuando se sirve desde el registro.
+
+Referencias admitidas: id completo, prefijo único de un id, etiqueta o 'ultimo'.
+Varias referencias forman un conjunto que promedia probabilidades.
+
+Uso:
+    python src/model_registry.py listar
+    python src/model_registry.py registrar --precision 0.91 --etiqueta candidato
+    python src/model_registry.py etiquetar 20261019_103000 produccion
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from dataset_manifest import DatasetManifest
+from inference import PipelineInferencia, ModeloRecargable, leer_artefacto
+from ensemble import PipelineConjunto
+
+ARCHIVO_MODELO = "modelo_neural.pkl"
+ARCHIVO_ESTADISTICAS = "estadisticas.pkl"
+ARCHIVO_METADATOS = "metadatos.json"
+
+def huella_dataset(imagenes_guardadas_json_ruta):
+    """Hash corto del contenido del dataset (hash de cada imagen y su clase), independiente del orden."""
+    manifest = DatasetManifest(imagenes_guardadas_json_ruta)
+    if not manifest.existe():
+        return None
+    lineas = sorted(f"{item.get('sha256') or item['name']}:{item['tipo_pez']}" for item in manifest)
+    return hashlib.sha256("\n".join(lineas).encode('utf-8')).hexdigest()[:16]
+
+def _escribir_json_atomico(ruta, datos):
+    ruta_tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(ruta_tmp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_tmp, ruta)
+
+class RegistroModelos:
+    """
+    Directorio de versiones de modelos con metadatos y etiquetas.
+
+    Uso:
+        registro = RegistroModelos.desde_carpeta(os.getcwd())
+        id_version = registro.registrar("models/modelo_neural.pkl", "models/estadisticas.pkl",
+                                        {'precision_validacion': 0.91}, etiquetas=['candidato'])
+        pipeline = registro.crear_pipeline(['produccion', 'candidato'], "data/kernel.json")
+    """
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.ruta_indice = os.path.join(carpeta, "indice.json")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_carpeta(cls, carpeta_raiz):
+        return cls(os.path.join(carpeta_raiz, "models", "registro"))
+
+    def _leer_indice(self):
+        if not os.path.exists(self.ruta_indice):
+            return {'versiones': [], 'etiquetas': {}}
+        with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def registrar(self, modelo_path, estadisticas_path, metadatos=None, etiquetas=()):
+        """
+        Copia el modelo y sus estadísticas como versión nueva y retorna su id.
+        Si el mismo modelo (mismos bytes) ya está registrado, solo se actualizan sus etiquetas.
+        """
+        modelo, version = leer_artefacto(modelo_path)
+        estadisticas, _ = leer_artefacto(estadisticas_path)
+        with self._lock:
+            os.makedirs(self.carpeta, exist_ok=True)
+            indice = self._leer_indice()
+            existente = next((id_version for id_version in indice['versiones'] if id_version.endswith(version)), None)
+            if existente is None:
+                id_version = f"{time.strftime('%Y%m%d_%H%M%S')}_{version}"
+                extractor = estadisticas.get('extractor')
+                datos = {
+                    'id': id_version,
+                    'version': version,
+                    'creado': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    'arquitectura': {'tipo': type(modelo).__name__, 'input_size': modelo.input_size,
+                                     'output_size': modelo.output_size},
+                    'clases': list(estadisticas['classes']),
+                    'pipeline': {'filter': estadisticas.get('filter', 'none'),
+                                 'kernels_applied': list(estadisticas.get('kernels_applied', [])),
+                                 'image_size': list(estadisticas.get('image_size', (64, 64))),
+                                 'caracteristicas': (extractor.nombre or 'personalizado') if extractor is not None else 'pixeles'},
+                    **(metadatos or {})
+                }
+                # La versión se escribe completa en una carpeta temporal y se publica con un rename
+                carpeta_tmp = os.path.join(self.carpeta, f".{id_version}.{os.getpid()}.tmp")
+                os.makedirs(carpeta_tmp)
+                shutil.copy2(modelo_path, os.path.join(carpeta_tmp, ARCHIVO_MODELO))
+                shutil.copy2(estadisticas_path, os.path.join(carpeta_tmp, ARCHIVO_ESTADISTICAS))
+                _escribir_json_atomico(os.path.join(carpeta_tmp, ARCHIVO_METADATOS), datos)
+                os.replace(carpeta_tmp, os.path.join(self.carpeta, id_version))
+                indice['versiones'].append(id_version)
+            else:
+                id_version = existente
+            for etiqueta in etiquetas:
+                indice['etiquetas'][etiqueta] = id_version
+            _escribir_json_atomico(self.ruta_indice, indice)
+        print(f"Modelo registrado: {id_version}")
+        return id_version
+
+    def resolver(self, referencia):
+        """Convierte un id, un prefijo único, una etiqueta o 'ultimo' en el id de la versión."""
+        indice = self._leer_indice()
+        versiones = indice['versiones']
+        if referencia in indice['etiquetas']:
+            return indice['etiquetas'][referencia]
+        if referencia == 'ultimo' and versiones:
+            return versiones[-1]
+        if referencia in versiones:
+            return referencia
+        candidatas = [id_version for id_version in versiones if id_version.startswith(referencia)]
+        if len(candidatas) == 1:
+            return candidatas[0]
+        if candidatas:
+            raise ValueError(f"La referencia '{referencia}' es ambigua: {', '.join(candidatas)}")
+        raise ValueError(f"No existe la versión o etiqueta '{referencia}' en el registro {self.carpeta}.")
+
+    def metadatos(self, referencia):
+        id_version = self.resolver(referencia)
+        with open(os.path.join(self.carpeta, id_version, ARCHIVO_METADATOS), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def rutas(self, referencia):
+        """Retorna (modelo_path, estadisticas_path) de una versión."""
+        carpeta = os.path.join(self.carpeta, self.resolver(referencia))
+        return os.path.join(carpeta, ARCHIVO_MODELO), os.path.join(carpeta, ARCHIVO_ESTADISTICAS)
+
+    def listar(self):
+        """Metadatos de todas las versiones en orden de registro, con sus etiquetas."""
+        indice = self._leer_indice()
+        etiquetas_por_id = {}
+        for etiqueta, id_version in indice['etiquetas'].items():
+            etiquetas_por_id.setdefault(id_version, []).append(etiqueta)
+        versiones = []
+        for id_version in indice['versiones']:
+            datos = self.metadatos(id_version)
+            datos['etiquetas'] = sorted(etiquetas_por_id.get(id_version, []))
+            versiones.append(datos)
+        return versiones
+
+    def etiquetar(self, referencia, etiqueta):
+        """Mueve (o crea) la etiqueta para que apunte a la versión indicada."""
+        with self._lock:
+            id_version = self.resolver(referencia)
+            indice = self._leer_indice()
+            indice['etiquetas'][etiqueta] = id_version
+            _escribir_json_atomico(self.ruta_indice, indice)
+        return id_version
+
+    def quitar_etiqueta(self, etiqueta):
+        with self._lock:
+            indice = self._leer_indice()
+            if indice['etiquetas'].pop(etiqueta, None) is None:
+                raise ValueError(f"La etiqueta '{etiqueta}' no existe.")
+            _escribir_json_atomico(self.ruta_indice, indice)
+
+    def crear_pipeline(self, referencias, kernels_path=None, pesos=None):
+        """PipelineInferencia para una referencia o PipelineConjunto para varias."""
+        pipelines = [PipelineInferencia(*self.rutas(referencia), kernels_path) for referencia in referencias]
+        if len(pipelines) == 1 and pesos is None:
+            return pipelines[0]
+        return PipelineConjunto(pipelines, pesos)
+
+def crear_fuente(carpeta_raiz, modelo_path=None, referencias=None, intervalo=0.0):
+    """
+    Fuente de modelo para los modos por lotes (servidor, carpeta vigilada, video).
+
+    Sin referencias se usa modelo_path (o models/modelo_neural.pkl); con
+    referencias del registro se usa esa versión o el conjunto de ellas. Con
+    intervalo > 0 la fuente se recarga en caliente (al cambiar el modelo o, en
+    el registro, al moverse una etiqueta).
+    """
+    if not referencias:
+        if intervalo > 0:
+            return ModeloRecargable.desde_carpeta(carpeta_raiz, modelo_path, intervalo).iniciar()
+        return PipelineInferencia.desde_carpeta(carpeta_raiz, modelo_path).validar()
+    registro = RegistroModelos.desde_carpeta(carpeta_raiz)
+    kernels_path = os.path.join(carpeta_raiz, "data", "kernel.json")
+    if intervalo > 0:
+        return ModeloRecargable(lambda: registro.crear_pipeline(referencias, kernels_path),
+                                [registro.ruta_indice], intervalo).iniciar()
+    return registro.crear_pipeline(referencias, kernels_path).validar()
+
+def texto_versiones(versiones):
+    lineas = []
+    for datos in versiones:
+        precision = datos.get('precision_validacion')
+        texto_precision = f"{precision * 100:.2f}%" if precision is not None else "-"
+        etiquetas = f" [{', '.join(datos['etiquetas'])}]" if datos.get('etiquetas') else ""
+        lineas.append(f"{datos['id']}  {datos['arquitectura']['tipo']:<20} precisión {texto_precision:>7}  "
+                      f"dataset {datos.get('dataset') or '-'}  {datos['pipeline']['caracteristicas']}{etiquetas}")
+    return "\n".join(lineas) if lineas else "El registro está vacío."
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de modelos versionados.")
+    parser.add_argument("accion", choices=['listar', 'registrar', 'etiquetar', 'quitar-etiqueta', 'mostrar'])
+    parser.add_argument("argumentos", nargs='*', help="etiquetar: REFERENCIA ETIQUETA; quitar-etiqueta: ETIQUETA; "
+                                                       "mostrar: REFERENCIA")
+    parser.add_argument("--proyecto", default=os.getcwd(), help="Carpeta raíz del proyecto (models/).")
+    parser.add_argument("--modelo", default=None, help="registrar: modelo a registrar (por defecto el actual).")
+    parser.add_argument("--precision", type=float, default=None, help="registrar: precisión en validación (0-1).")
+    parser.add_argument("--etiqueta", action='append', default=[], help="registrar: etiqueta a asignar (repetible).")
+    args = parser.parse_args()
+
+    registro = RegistroModelos.desde_carpeta(args.proyecto)
+    if args.accion == 'listar':
+        print(texto_versiones(registro.listar()))
+    elif args.accion == 'mostrar' and len(args.argumentos) == 1:
+        print(json.dumps(registro.metadatos(args.argumentos[0]), ensure_ascii=False, indent=2))
+    elif args.accion == 'registrar':
+        models_dir = os.path.join(args.proyecto, "models")
+        metadatos = {'dataset': huella_dataset(os.path.join(args.proyecto, "imagenes_procesadas", "imagenes_guardadas.json"))}
+        if args.precision is not None:
+            metadatos['precision_validacion'] = args.precision
+        registro.registrar(args.modelo or os.path.join(models_dir, ARCHIVO_MODELO),
+                           os.path.join(models_dir, ARCHIVO_ESTADISTICAS), metadatos, args.etiqueta)
+    elif args.accion == 'etiquetar' and len(args.argumentos) == 2:
+        print(f"{args.argumentos[1]} -> {registro.etiquetar(*args.argumentos)}")
+    elif args.accion == 'quitar-etiqueta' and len(args.argumentos) == 1:
+        registro.quitar_etiqueta(args.argumentos[0])
+    else:
+        parser.error(f"Argumentos incorrectos para '{args.accion}'.")
+
+if __name__ == "__main__":
+    main()
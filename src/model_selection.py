@@ -0,0 +1,210 @@
+# src/model_selection.py
+
+"""
+Divisiones estratificadas, validación cruzada k-fold en paralelo y métricas
+de clasificación vectorizadas (sin depender de scikit-learn).
+
+Uso (validación cruzada sobre el dataset empaquetado):
+    python src/model_selection.py --pliegues 5 --epocas 20
+"""
+
+import os
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+def division_estratificada(labels, test_size=0.2, seed=42):
+    """
+    Divide los índices en entrenamiento y validación conservando la proporción de cada clase.
+
+    Cada clase con al menos dos muestras aporta como mínimo una a validación.
+    Retorna (indices_entrenamiento, indices_validacion), ordenados.
+    """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+    entrenamiento = []
+    validacion = []
+    for clase in np.unique(labels):
+        indices = rng.permutation(np.flatnonzero(labels == clase))
+        n_validacion = int(round(len(indices) * test_size))
+        if len(indices) > 1:
+            n_validacion = min(max(n_validacion, 1), len(indices) - 1)
+        validacion.append(indices[:n_validacion])
+        entrenamiento.append(indices[n_validacion:])
+    return np.sort(np.concatenate(entrenamiento)), np.sort(np.concatenate(validacion))
+
+def k_fold_estratificado(labels, k=5, seed=42):
+    """
+    Genera k pliegues estratificados.
+
+    Las muestras de cada clase se barajan y se reparten en turno rotatorio
+    entre los pliegues, empezando en un pliegue distinto por clase para
+    equilibrar los tamaños. Retorna una lista de (indices_entrenamiento, indices_validacion).
+    """
+    labels = np.asarray(labels)
+    if k < 2:
+        raise ValueError("La validación cruzada necesita al menos 2 pliegues.")
+    rng = np.random.default_rng(seed)
+    pliegue = np.empty(len(labels), dtype=np.int64)
+    desplazamiento = 0
+    for clase in np.unique(labels):
+        indices = rng.permutation(np.flatnonzero(labels == clase))
+        pliegue[indices] = (np.arange(len(indices)) + desplazamiento) % k
+        desplazamiento += len(indices)
+    return [(np.flatnonzero(pliegue != i), np.flatnonzero(pliegue == i)) for i in range(k)]
+
+def matriz_confusion(y_true, y_pred, n_clases):
+    """Matriz de confusión (filas: clase real, columnas: clase predicha) con un único bincount."""
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    return np.bincount(y_true * n_clases + y_pred, minlength=n_clases * n_clases).reshape(n_clases, n_clases)
+
+def metricas_por_clase(matriz):
+    """Devuelve (precision, recall, f1, soporte) por clase a partir de la matriz de confusión."""
+    verdaderos_positivos = np.diag(matriz).astype(np.float64)
+    predichos = matriz.sum(axis=0)
+    soporte = matriz.sum(axis=1)
+    precision = verdaderos_positivos / (predichos + 1e-15)
+    recall = verdaderos_positivos / (soporte + 1e-15)
+    f1 = 2 * precision * recall / (precision + recall + 1e-15)
+    return precision, recall, f1, soporte
+
+def reporte_clasificacion(y_true, y_pred, classes, matriz=None):
+    """Genera el reporte de clasificación por clase (precisión, recall, F1 y soporte)."""
+    if matriz is None:
+        matriz = matriz_confusion(y_true, y_pred, len(classes))
+    precision, recall, f1, soporte = metricas_por_clase(matriz)
+    report_text = ""
+    for idx, cls in enumerate(classes):
+        report_text += f"Clase: {cls}\n"
+        report_text += f"  Precisión: {precision[idx]:.4f}\n"
+        report_text += f"  Recall: {recall[idx]:.4f}\n"
+        report_text += f"  F1-Score: {f1[idx]:.4f}\n"
+        report_text += f"  Soporte: {soporte[idx]}\n\n"
+    return report_text
+
+def crear_modelo(tipo_modelo, forma_imagen, n_clases, config):
+    """
+    Crea un modelo nuevo a partir de una configuración de hiperparámetros.
+
+    config: dict con hidden_size, learning_rate y opcionalmente optimizer,
+    activation, conv_filters y seed. input_size sustituye al tamaño de la
+    imagen cuando el MLP recibe características (features.py).
+    """
+    from neural_network import NeuralNetwork
+    from cnn import ConvolutionalNetwork
+
+    if 'seed' in config:
+        np.random.seed(config['seed'])
+    optimizer = config.get('optimizer', 'sgd')
+    if tipo_modelo == 'CNN':
+        return ConvolutionalNetwork(forma_imagen, n_clases, config['learning_rate'],
+                                    conv_filters=config.get('conv_filters', (8, 16, 32)),
+                                    hidden_size=config['hidden_size'], optimizer=optimizer)
+    input_size = config.get('input_size') or int(np.prod(forma_imagen))
+    return NeuralNetwork(input_size, config['hidden_size'], n_clases, config['learning_rate'],
+                         activation=config.get('activation', 'relu'), optimizer=optimizer)
+
+def _entrenar_pliegue(ruta_empaquetado, tipo_modelo, config, indices_entrenamiento, indices_validacion, epocas):
+    """Entrena un pliegue en un proceso hijo y devuelve (y_val, y_pred) del modelo tras la última época."""
+    from augmentation import crear_politica
+    from data_loader import DataLoader
+    from features import crear_extractor
+    from packed_dataset import DatasetEmpaquetado
+
+    dataset = DatasetEmpaquetado(ruta_empaquetado)
+    data_loader = DataLoader(None, image_size=dataset.image_size, augment_data=False, seed=config.get('seed'))
+    data_loader.augmentation_policy = crear_politica(config.get('augmentation', 'fuerte'), seed=config.get('seed'))
+    # La normalización se calcula solo con el entrenamiento del pliegue (sin fuga de validación)
+    data_loader.compute_stats(dataset.images, indices=indices_entrenamiento)
+    data_loader.feature_extractor = crear_extractor(config.get('caracteristicas', 'pixeles'), seed=config.get('seed') or 0)
+    if data_loader.feature_extractor is not None:
+        data_loader.feature_extractor.ajustar(dataset.images, indices=indices_entrenamiento)
+        config = dict(config, input_size=data_loader.feature_extractor.dimension)
+    labels = np.asarray(dataset.labels, dtype=np.int64)
+    X_val = data_loader.prepare_batch(dataset.images[indices_validacion])
+    y_val = labels[indices_validacion]
+
+    modelo = crear_modelo(tipo_modelo, dataset.images.shape[1:], len(dataset.classes), config)
+    for _ in range(epocas):
+        for X_batch, y_batch in data_loader.iter_batches(dataset.images, labels, config['batch_size'],
+                                                         indices=indices_entrenamiento):
+            modelo.train_step(X_batch, y_batch)
+    # Se evalúa el modelo de la última época: elegir la época con el propio pliegue
+    # de validación sesgaría la estimación hacia arriba
+    y_pred, _ = modelo.predict(X_val)
+    return y_val, y_pred
+
+def validacion_cruzada(ruta_empaquetado, config, tipo_modelo='MLP', k=5, epocas=20, trabajadores=None, seed=42):
+    """
+    Validación cruzada k-fold estratificada con los pliegues entrenados en paralelo.
+
+    Todos los procesos leen el mismo dataset empaquetado como np.memmap.
+    Retorna un dict con la precisión de cada pliegue, su media y desviación,
+    la matriz de confusión acumulada y el reporte por clase.
+    """
+    from packed_dataset import DatasetEmpaquetado
+    from parallel_training import un_hilo_blas
+
+    dataset = DatasetEmpaquetado(ruta_empaquetado)
+    classes = dataset.classes
+    pliegues = k_fold_estratificado(np.asarray(dataset.labels), k, seed)
+    trabajadores = min(trabajadores or os.cpu_count() or 1, k)
+
+    with un_hilo_blas(), ProcessPoolExecutor(max_workers=trabajadores, mp_context=mp.get_context('spawn')) as executor:
+        futuros = [executor.submit(_entrenar_pliegue, ruta_empaquetado, tipo_modelo, config,
+                                   entrenamiento, validacion, epocas)
+                   for entrenamiento, validacion in pliegues]
+        resultados = [futuro.result() for futuro in futuros]
+
+    matriz = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    precisiones = []
+    for y_val, y_pred in resultados:
+        matriz += matriz_confusion(y_val, y_pred, len(classes))
+        precisiones.append(float(np.mean(y_pred == y_val)))
+    return {
+        'precisiones': precisiones,
+        'media': float(np.mean(precisiones)),
+        'desviacion': float(np.std(precisiones)),
+        'matriz_confusion': matriz,
+        'classes': classes,
+        'reporte': reporte_clasificacion(None, None, classes, matriz=matriz)
+    }
+
+def main():
+    from features import EXTRACTORES
+    from packed_dataset import exportar_dataset_empaquetado, dataset_empaquetado_vigente
+
+    parser = argparse.ArgumentParser(description="Validación cruzada k-fold estratificada en paralelo.")
+    parser.add_argument("--json", default=os.path.join("imagenes_procesadas", "imagenes_guardadas.json"))
+    parser.add_argument("--empaquetado", default=os.path.join("imagenes_procesadas", "dataset.pack"))
+    parser.add_argument("--pliegues", type=int, default=5)
+    parser.add_argument("--epocas", type=int, default=20)
+    parser.add_argument("--modelo", choices=['MLP', 'CNN'], default='MLP')
+    parser.add_argument("--hidden-size", type=int, nargs='+', default=[64])
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    parser.add_argument("--optimizador", default='sgd')
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--augmentation", choices=['ninguna', 'suave', 'fuerte'], default='fuerte')
+    parser.add_argument("--caracteristicas", choices=list(EXTRACTORES), default='pixeles')
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not dataset_empaquetado_vigente(args.empaquetado, args.json):
+        exportar_dataset_empaquetado(args.json, args.empaquetado)
+    config = {'hidden_size': args.hidden_size, 'learning_rate': args.learning_rate,
+              'optimizer': args.optimizador, 'batch_size': args.batch_size,
+              'augmentation': args.augmentation, 'caracteristicas': args.caracteristicas, 'seed': args.seed}
+    resultado = validacion_cruzada(args.empaquetado, config, args.modelo, args.pliegues, args.epocas,
+                                   args.trabajadores, args.seed)
+    for i, precision in enumerate(resultado['precisiones'], start=1):
+        print(f"Pliegue {i}: {precision * 100:.2f}%")
+    print(f"Precisión media: {resultado['media'] * 100:.2f}% ± {resultado['desviacion'] * 100:.2f}%")
+    print("Matriz de confusión (filas: real, columnas: predicha):")
+    print(resultado['matriz_confusion'])
+    print(resultado['reporte'])
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,73 @@
 # src/neural_network.py
 
+import os
 import numpy as np
 import pickle
+from instrumentation import medir
+from optimizers import crear_optimizador, SGD
 
 class NeuralNetwork:
-    def __init__(self, input_size, hidden_size, output_size, learning_rate=0.01):
+    def __init__(self, input_size, hidden_size, output_size, learning_rate=0.01, activation='relu', optimizer='sgd'):
         """
-        Inicializa la red neuronal con una capa oculta.
+        Inicializa un perceptrón multicapa con una o varias capas ocultas.
 
         Parámetros:
             - input_size: Número de neuronas en la capa de entrada.
-            - hidden_size: Número de neuronas en la capa oculta.
+            - hidden_size: Neuronas de la capa oculta (int) o lista con las de cada
+              capa oculta, p. ej. [256, 64].
             - output_size: Número de neuronas en la capa de salida.
             - learning_rate: Tasa de aprendizaje.
+            - activation: Activación de las capas ocultas ('relu', 'leaky_relu', 'tanh' o 'sigmoid').
+            - optimizer: Optimizador de los pesos ('sgd', 'momentum' o 'adam').
         """
-        # Inicializar pesos y biases
-        self.W1 = np.random.randn(input_size, hidden_size) * np.sqrt(2. / input_size)
-        self.b1 = np.zeros((1, hidden_size))
-        self.W2 = np.random.randn(hidden_size, output_size) * np.sqrt(2. / hidden_size)
-        self.b2 = np.zeros((1, output_size))
+        if activation not in self.ACTIVACIONES:
+            raise ValueError(f"Activación desconocida: {activation}. Opciones: {', '.join(self.ACTIVACIONES)}")
+        hidden_sizes = [hidden_size] if np.isscalar(hidden_size) else list(hidden_size)
+        self.layer_sizes = [int(input_size)] + [int(h) for h in hidden_sizes] + [int(output_size)]
+        self.activation = activation
         self.learning_rate = learning_rate
+        self.optimizer = crear_optimizador(optimizer, learning_rate)
+
+        # Inicializar pesos y biases (He para ReLU, Xavier para tanh/sigmoid)
+        ganancia = 2. if activation in ('relu', 'leaky_relu') else 1.
+        self.weights = []
+        self.biases = []
+        for entrada, salida in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            self.weights.append(np.random.randn(entrada, salida) * np.sqrt(ganancia / entrada))
+            self.biases.append(np.zeros((1, salida)))
+
+    def __setstate__(self, state):
+        """Permite cargar modelos guardados con versiones anteriores (W1/b1/W2/b2, sin optimizador)."""
+        if 'W1' in state and 'weights' not in state:
+            state = dict(state)
+            state['weights'] = [state.pop('W1'), state.pop('W2')]
+            state['biases'] = [state.pop('b1'), state.pop('b2')]
+            state['layer_sizes'] = [state['weights'][0].shape[0], state['weights'][0].shape[1], state['weights'][1].shape[1]]
+            state.setdefault('activation', 'relu')
+        if 'optimizer' not in state:
+            state = dict(state)
+            state['optimizer'] = SGD(state['learning_rate'])
+        self.__dict__.update(state)
+
+    @property
+    def input_size(self):
+        return self.layer_sizes[0]
+
+    @property
+    def output_size(self):
+        return self.layer_sizes[-1]
+
+    def parameters(self):
+        """Devuelve la lista de parámetros [W1, b1, W2, b2, ...] (referencias, no copias)."""
+        parametros = []
+        for W, b in zip(self.weights, self.biases):
+            parametros.extend([W, b])
+        return parametros
+
+    def set_parameters(self, parametros):
+        """Sustituye los arreglos de parámetros (mismo orden y forma que parameters())."""
+        self.weights = list(parametros[0::2])
+        self.biases = list(parametros[1::2])
 
     def relu(self, x):
         """Función de activación ReLU."""
@@ -34,44 +82,95 @@ class NeuralNetwork:
         exp_scores = np.exp(x - np.max(x, axis=1, keepdims=True))  # Evitar overflow
         return exp_scores / np.sum(exp_scores, axis=1, keepdims=True)
 
-    def train_step(self, X, y):
+    # Cada activación se define como (función, derivada a partir de z y de a = f(z))
+    ACTIVACIONES = {
+        'relu': (lambda z: np.maximum(z, 0), lambda z, a: z > 0),
+        'leaky_relu': (lambda z: np.where(z > 0, z, 0.01 * z), lambda z, a: np.where(z > 0, 1.0, 0.01)),
+        'tanh': (np.tanh, lambda z, a: 1.0 - a * a),
+        'sigmoid': (lambda z: 1.0 / (1.0 + np.exp(-z)), lambda z, a: a * (1.0 - a)),
+    }
+
+    def forward(self, X):
         """
-        Realiza un paso de entrenamiento utilizando retropropagación.
+        Propagación hacia adelante por todas las capas.
 
-        Parámetros:
-            - X: Datos de entrada.
-            - y: Etiquetas verdaderas.
+        Retorna (probabilidades, cache) donde cache guarda las entradas y
+        preactivaciones de cada capa para la retropropagación.
+        """
+        activar, _ = self.ACTIVACIONES[self.activation]
+        entradas = [X]
+        preactivaciones = []
+        a = X
+        ultima = len(self.weights) - 1
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            z = a.dot(W) + b
+            preactivaciones.append(z)
+            if i == ultima:
+                a = self.softmax(z)
+            else:
+                a = activar(z)
+                entradas.append(a)
+        return a, (entradas, preactivaciones)
+
+    def backward(self, probs, cache, y):
         """
-        # Forward propagation
-        z1 = X.dot(self.W1) + self.b1
-        a1 = self.relu(z1)
-        z2 = a1.dot(self.W2) + self.b2
-        a2 = self.softmax(z2)
+        Retropropagación vectorizada.
 
-        # Convertir y a one-hot encoding
-        y_onehot = np.zeros_like(a2)
-        y_onehot[np.arange(len(y)), y] = 1
+        Retorna (loss, gradientes) con los gradientes en el mismo orden que parameters().
+        """
+        _, derivada = self.ACTIVACIONES[self.activation]
+        entradas, preactivaciones = cache
+        n = len(y)
 
         # Calcular pérdida (cross-entropy)
-        loss = -np.sum(y_onehot * np.log(a2 + 1e-15)) / len(y)
-
-        # Backpropagation
-        delta2 = a2 - y_onehot
-        dW2 = a1.T.dot(delta2)
-        db2 = np.sum(delta2, axis=0, keepdims=True)
+        loss = -np.sum(np.log(probs[np.arange(n), y] + 1e-15)) / n
+
+        # Delta de la salida: softmax + cross-entropy
+        delta = probs.copy()
+        delta[np.arange(n), y] -= 1
+
+        gradientes = [None] * (2 * len(self.weights))
+        for i in range(len(self.weights) - 1, -1, -1):
+            gradientes[2 * i] = entradas[i].T.dot(delta)
+            gradientes[2 * i + 1] = np.sum(delta, axis=0, keepdims=True)
+            if i > 0:
+                delta = delta.dot(self.weights[i].T) * derivada(preactivaciones[i - 1], entradas[i])
+        return loss, gradientes
+
+    def compute_gradients(self, X, y):
+        """Calcula la pérdida y los gradientes de un lote sin actualizar los pesos."""
+        with medir('forward'):
+            probs, cache = self.forward(X)
+        with medir('backward'):
+            return self.backward(probs, cache, y)
+
+    def apply_gradients(self, gradientes):
+        """Actualiza los pesos con el optimizador del modelo."""
+        with medir('update'):
+            self.optimizer.step(self.parameters(), gradientes)
 
-        delta1 = delta2.dot(self.W2.T) * self.relu_derivative(z1)
-        dW1 = X.T.dot(delta1)
-        db1 = np.sum(delta1, axis=0)
-
-        # Actualizar pesos y biases
-        self.W1 -= self.learning_rate * dW1
-        self.b1 -= self.learning_rate * db1
-        self.W2 -= self.learning_rate * dW2
-        self.b2 -= self.learning_rate * db2
+    def train_step(self, X, y):
+        """
+        Realiza un paso de entrenamiento utilizando retropropagación.
 
+        Parámetros:
+            - X: Datos de entrada.
+            - y: Etiquetas verdaderas.
+        """
+        loss, gradientes = self.compute_gradients(X, y)
+        self.apply_gradients(gradientes)
         return loss
 
+    def predict_proba(self, X):
+        """Devuelve las probabilidades de cada clase (sin guardar la cache de la retropropagación)."""
+        activar, _ = self.ACTIVACIONES[self.activation]
+        a = X
+        ultima = len(self.weights) - 1
+        for i, (W, b) in enumerate(zip(self.weights, self.biases)):
+            z = a.dot(W) + b
+            a = self.softmax(z) if i == ultima else activar(z)
+        return a
+
     def predict(self, X):
         """
         Realiza una predicción sobre los datos de entrada X.
@@ -80,20 +179,18 @@ class NeuralNetwork:
             - predictions: Índices de las clases predichas.
             - confidences: Confianza asociada a cada predicción.
         """
-        # Forward propagation
-        z1 = X.dot(self.W1) + self.b1
-        a1 = self.relu(z1)
-        z2 = a1.dot(self.W2) + self.b2
-        a2 = self.softmax(z2)
-
-        predictions = np.argmax(a2, axis=1)
-        confidences = np.max(a2, axis=1)
+        probs = self.predict_proba(X)
+        predictions = np.argmax(probs, axis=1)
+        confidences = np.max(probs, axis=1)
         return predictions, confidences
 
     def save_model(self, path):
         """Guarda el modelo entrenado en un archivo."""
-        with open(path, 'wb') as f:
+        # Escritura atómica: quien lea el archivo nunca ve un modelo a medio escribir
+        path_tmp = path + ".tmp"
+        with open(path_tmp, 'wb') as f:
             pickle.dump(self, f)
+        os.replace(path_tmp, path)
 
     @staticmethod
     def load_model(path):
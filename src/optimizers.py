@@ -0,0 +1,66 @@
+# src/optimizers.py
+
+import numpy as np
+
+class SGD:
+    """Descenso por gradiente simple (el comportamiento original de la red)."""
+    def __init__(self, learning_rate=0.01):
+        self.learning_rate = learning_rate
+
+    def step(self, parametros, gradientes):
+        """Actualiza los parámetros en su sitio."""
+        for parametro, gradiente in zip(parametros, gradientes):
+            parametro -= self.learning_rate * gradiente
+
+class Momentum:
+    """Descenso por gradiente con momento."""
+    def __init__(self, learning_rate=0.01, momentum=0.9):
+        self.learning_rate = learning_rate
+        self.momentum = momentum
+        self.velocidades = None
+
+    def step(self, parametros, gradientes):
+        if self.velocidades is None:
+            self.velocidades = [np.zeros_like(p) for p in parametros]
+        for parametro, gradiente, velocidad in zip(parametros, gradientes, self.velocidades):
+            velocidad *= self.momentum
+            velocidad -= self.learning_rate * gradiente
+            parametro += velocidad
+
+class Adam:
+    """Adam con corrección de sesgo."""
+    def __init__(self, learning_rate=0.001, beta1=0.9, beta2=0.999, epsilon=1e-8):
+        self.learning_rate = learning_rate
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        self.t = 0
+        self.m = None
+        self.v = None
+
+    def step(self, parametros, gradientes):
+        if self.m is None:
+            self.m = [np.zeros_like(p) for p in parametros]
+            self.v = [np.zeros_like(p) for p in parametros]
+        self.t += 1
+        correccion1 = 1 - self.beta1 ** self.t
+        correccion2 = 1 - self.beta2 ** self.t
+        paso = self.learning_rate * np.sqrt(correccion2) / correccion1
+        for parametro, gradiente, m, v in zip(parametros, gradientes, self.m, self.v):
+            m *= self.beta1
+            m += (1 - self.beta1) * gradiente
+            v *= self.beta2
+            v += (1 - self.beta2) * np.square(gradiente)
+            parametro -= (paso * m / (np.sqrt(v) + self.epsilon)).astype(parametro.dtype, copy=False)
+
+OPTIMIZADORES = {
+    'sgd': SGD,
+    'momentum': Momentum,
+    'adam': Adam,
+}
+
+def crear_optimizador(nombre, learning_rate):
+    """Crea un optimizador por nombre ('sgd', 'momentum' o 'adam')."""
+    if nombre not in OPTIMIZADORES:
+        raise ValueError(f"Optimizador desconocido: {nombre}. Opciones: {', '.join(OPTIMIZADORES)}")
+    return OPTIMIZADORES[nombre](learning_rate)
@@ -0,0 +1,178 @@
+# src/packed_dataset.py
+
+import os
+import json
+import struct
+import numpy as np
+from dataset_manifest import DatasetManifest
+from image_store import leer_imagen_verificada
+from image_decode import decodificar_reducida
+
+# Estructura del archivo empaquetado:
+#   [0:8]   MAGIC
+#   [8:16]  offset de la cabecera JSON (uint64, little-endian)
+#   [64:]   píxeles uint8 (N, alto, ancho, 3), etiquetas int32 (N,),
+#           media y desviación estándar float64 (alto*ancho*3,)
+#   [offset_cabecera:] cabecera JSON con clases, procedencia y offsets
+MAGIC = b"PECESPK1"
+ALINEACION = 64
+
+# Desviación mínima por píxel al normalizar (también la usa DataLoader): los píxeles
+# constantes en todo el dataset (p. ej. canales anulados por el filtro) no se
+# dividen por ~0, así que un vector normalizado nunca supera 1 / STD_MINIMA
+STD_MINIMA = 1e-3
+
+def _alinear(f):
+    """Rellena con ceros hasta la siguiente posición alineada y la devuelve."""
+    posicion = f.tell()
+    relleno = (-posicion) % ALINEACION
+    f.write(b"\0" * relleno)
+    return posicion + relleno
+
+def exportar_dataset_empaquetado(imagenes_guardadas_json_ruta, ruta_salida, image_size=(64, 64)):
+    """
+    Empaqueta el dataset procesado en un único archivo mapeable en memoria.
+
+    Las imágenes se decodifican y escriben una a una, así que la memoria usada
+    no depende del tamaño del dataset. Retorna la ruta del archivo generado.
+    """
+    manifest = DatasetManifest(imagenes_guardadas_json_ruta)
+    if not len(manifest):
+        raise ValueError("El archivo JSON está vacío.")
+
+    carpeta = os.path.dirname(imagenes_guardadas_json_ruta)
+    clases = manifest.clases()
+    clase_a_indice = {clase: idx for idx, clase in enumerate(clases)}
+
+    ruta_tmp = ruta_salida + ".tmp"
+    try:
+        n = _escribir_empaquetado(ruta_tmp, manifest, carpeta, clases, clase_a_indice, image_size)
+    except BaseException:
+        # Sin imágenes válidas, error de escritura o interrupción: no dejar el .tmp a medias
+        if os.path.exists(ruta_tmp):
+            os.remove(ruta_tmp)
+        raise
+    os.replace(ruta_tmp, ruta_salida)
+    print(f"Dataset empaquetado: {n} imágenes en {ruta_salida}")
+    return ruta_salida
+
+def _escribir_empaquetado(ruta_tmp, manifest, carpeta, clases, clase_a_indice, image_size):
+    """Escribe el archivo empaquetado completo en ruta_tmp y retorna el número de imágenes."""
+    ancho, alto = image_size
+    tamano_muestra = alto * ancho * 3
+    etiquetas = []
+    procedencia = []
+    suma = np.zeros(tamano_muestra, dtype=np.float64)
+    suma_cuadrados = np.zeros(tamano_muestra, dtype=np.float64)
+
+    with open(ruta_tmp, 'wb') as f:
+        f.write(MAGIC + struct.pack("<Q", 0))
+        offset_imagenes = _alinear(f)
+
+        for item in manifest:
+            ruta_imagen = os.path.join(carpeta, *item['name'].split('/'))
+            try:
+                imagen = decodificar_reducida(leer_imagen_verificada(ruta_imagen, item.get('sha256'), item.get('size')),
+                                              image_size, 'entrenamiento')
+            except Exception as e:
+                print(f"Error al empaquetar la imagen {ruta_imagen}: {e}")
+                continue
+            pixeles = np.asarray(imagen, dtype=np.uint8)
+            f.write(pixeles.tobytes())
+
+            plano = pixeles.reshape(-1) / 255.0
+            suma += plano
+            suma_cuadrados += np.square(plano)
+            etiquetas.append(clase_a_indice[item['tipo_pez']])
+            procedencia.append({
+                'name': item['name'],
+                'sha256': item.get('sha256'),
+                'tipo_pez': item['tipo_pez'],
+                'filter': item.get('filter'),
+                'kernels_applied': item.get('kernels_applied', [])
+            })
+
+        n = len(etiquetas)
+        if n == 0:
+            raise ValueError("No se pudo empaquetar ninguna imagen.")
+
+        offset_etiquetas = _alinear(f)
+        f.write(np.asarray(etiquetas, dtype='<i4').tobytes())
+
+        media = suma / n
+        desviacion = np.maximum(np.sqrt(np.maximum(suma_cuadrados / n - np.square(media), 0.0)), STD_MINIMA)
+        offset_media = _alinear(f)
+        f.write(media.astype('<f8').tobytes())
+        offset_desviacion = _alinear(f)
+        f.write(desviacion.astype('<f8').tobytes())
+
+        offset_cabecera = _alinear(f)
+        cabecera = {
+            'version': 1,
+            'count': n,
+            'shape': [n, alto, ancho, 3],
+            'image_size': [ancho, alto],
+            'classes': clases,
+            'offset_imagenes': offset_imagenes,
+            'offset_etiquetas': offset_etiquetas,
+            'offset_media': offset_media,
+            'offset_desviacion': offset_desviacion,
+            'provenance': procedencia
+        }
+        f.write(json.dumps(cabecera, ensure_ascii=False).encode('utf-8'))
+        f.seek(len(MAGIC))
+        f.write(struct.pack("<Q", offset_cabecera))
+        f.flush()
+        os.fsync(f.fileno())
+    return n
+
+class DatasetEmpaquetado:
+    """
+    Lector de un dataset empaquetado. Los píxeles y etiquetas son np.memmap de
+    solo lectura: el archivo no se carga completo y los cortes son vistas.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            preambulo = f.read(len(MAGIC) + 8)
+            if preambulo[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"El archivo no es un dataset empaquetado válido:\n{ruta}")
+            (offset_cabecera,) = struct.unpack("<Q", preambulo[len(MAGIC):])
+            f.seek(offset_cabecera)
+            self.cabecera = json.loads(f.read().decode('utf-8'))
+
+        n, alto, ancho, canales = self.cabecera['shape']
+        self.classes = self.cabecera['classes']
+        self.image_size = tuple(self.cabecera['image_size'])
+        self.provenance = self.cabecera['provenance']
+        self.images = np.memmap(ruta, dtype=np.uint8, mode='r',
+                                offset=self.cabecera['offset_imagenes'], shape=(n, alto, ancho, canales))
+        self.labels = np.memmap(ruta, dtype='<i4', mode='r',
+                                offset=self.cabecera['offset_etiquetas'], shape=(n,))
+        tamano_muestra = alto * ancho * canales
+        self.mean = np.array(np.memmap(ruta, dtype='<f8', mode='r',
+                                       offset=self.cabecera['offset_media'], shape=(tamano_muestra,)))
+        self.std = np.array(np.memmap(ruta, dtype='<f8', mode='r',
+                                      offset=self.cabecera['offset_desviacion'], shape=(tamano_muestra,)))
+
+    def __len__(self):
+        return len(self.labels)
+
+def dataset_empaquetado_vigente(ruta_empaquetado, imagenes_guardadas_json_ruta):
+    """Indica si el archivo empaquetado existe y es más reciente que el manifiesto."""
+    if not os.path.exists(ruta_empaquetado):
+        return False
+    manifest_ruta = os.path.splitext(imagenes_guardadas_json_ruta)[0] + ".jsonl"
+    if not os.path.exists(manifest_ruta):
+        return True
+    return os.path.getmtime(ruta_empaquetado) >= os.path.getmtime(manifest_ruta)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Empaqueta el dataset procesado en un único archivo.")
+    parser.add_argument("--json", default=os.path.join("imagenes_procesadas", "imagenes_guardadas.json"))
+    parser.add_argument("--salida", default=os.path.join("imagenes_procesadas", "dataset.pack"))
+    parser.add_argument("--tamano", type=int, default=64, help="Lado de las imágenes empaquetadas.")
+    args = parser.parse_args()
+    exportar_dataset_empaquetado(args.json, args.salida, image_size=(args.tamano, args.tamano))
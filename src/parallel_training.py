@@ -0,0 +1,348 @@
+# src/parallel_training.py
+
+"""
+Entrenamiento paralelo por datos (data-parallel) en varios procesos.
+
+Cada mini-lote se reparte en fragmentos, uno por trabajador. Los pesos del
+modelo viven en memoria compartida (multiprocessing.shared_memory): el proceso
+principal los actualiza en su sitio y los trabajadores los leen sin copias.
+Cada trabajador escribe los gradientes de su fragmento en su propio búfer
+compartido y el proceso principal los reduce en orden fijo antes de actualizar.
+
+Uso (curva de escalado con datos sintéticos):
+    python src/parallel_training.py --trabajadores 4 --cantidad 800
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import shutil
+import traceback
+import contextlib
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+# Variables de entorno de los hilos BLAS: un hilo por trabajador para no sobresuscribir los núcleos
+_VARIABLES_HILOS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+@contextlib.contextmanager
+def un_hilo_blas():
+    """Fija un hilo BLAS en los procesos hijos creados dentro del bloque (no afecta al proceso actual)."""
+    entorno_previo = {nombre: os.environ.get(nombre) for nombre in _VARIABLES_HILOS}
+    os.environ.update({nombre: '1' for nombre in _VARIABLES_HILOS})
+    try:
+        yield
+    finally:
+        for nombre, valor in entorno_previo.items():
+            if valor is None:
+                os.environ.pop(nombre, None)
+            else:
+                os.environ[nombre] = valor
+
+def _vistas(buffer, formas, dtype):
+    """Divide un búfer plano en arreglos con las formas de los parámetros (vistas, sin copia)."""
+    plano = np.ndarray((sum(int(np.prod(f)) for f in formas),), dtype=dtype, buffer=buffer)
+    vistas = []
+    inicio = 0
+    for forma in formas:
+        tamano = int(np.prod(forma))
+        vistas.append(plano[inicio:inicio + tamano].reshape(forma))
+        inicio += tamano
+    return plano, vistas
+
+def _trabajador(conexion, modelo, data_loader, nombres, formas, dtype, forma_imagenes, etiquetas):
+    """Bucle de un proceso trabajador: calcula gradientes sobre los fragmentos que recibe."""
+    memorias = []
+    try:
+        memorias = [shared_memory.SharedMemory(name=nombre) for nombre in nombres]
+        memoria_pesos, memoria_gradientes, memoria_imagenes = memorias
+        _, pesos = _vistas(memoria_pesos.buf, formas, dtype)
+        _, gradientes = _vistas(memoria_gradientes.buf, formas, dtype)
+        imagenes = np.ndarray(forma_imagenes, dtype=np.uint8, buffer=memoria_imagenes.buf)
+        modelo.set_parameters(pesos)
+        conexion.send(('listo', None))
+
+        while True:
+            mensaje, carga = conexion.recv()
+            if mensaje == 'detener':
+                break
+            indices, semilla, augment = carga
+            try:
+                rng = np.random.default_rng(semilla)
+                X = data_loader.prepare_batch(imagenes[indices], augment=augment, rng=rng)
+                loss, grads = modelo.compute_gradients(X, etiquetas[indices])
+                for destino, origen in zip(gradientes, grads):
+                    destino[...] = origen
+                conexion.send(('ok', loss * len(indices)))
+            except Exception:
+                conexion.send(('error', traceback.format_exc()))
+    except Exception:
+        conexion.send(('error', traceback.format_exc()))
+    finally:
+        # Soltar las vistas antes de cerrar los segmentos
+        pesos = gradientes = imagenes = None
+        modelo = None
+        for memoria in memorias:
+            memoria.close()
+        conexion.close()
+
+class EntrenadorParalelo:
+    """
+    Entrenador data-parallel para NeuralNetwork y ConvolutionalNetwork.
+
+    Los gradientes de los modelos son sumas sobre el lote, así que la suma de
+    los gradientes de los fragmentos es exactamente el gradiente del lote
+    completo: la reducción es una suma y no hace falta reponderar.
+
+    En modo reproducible el orden de los datos, las semillas de augmentation de
+    cada fragmento y el orden de la reducción dependen solo de la semilla, y
+    cada trabajador usa un único hilo BLAS; dos ejecuciones con la misma
+    semilla y el mismo número de trabajadores producen los mismos pesos.
+
+    Con indices se entrena solo ese subconjunto de images (p. ej. un np.memmap
+    empaquetado), que se copia por bloques a la memoria compartida.
+
+    Uso:
+        with EntrenadorParalelo(nn, images, labels, data_loader, trabajadores=4, indices=indices_train) as entrenador:
+            loss = entrenador.entrenar_epoca()
+    """
+    def __init__(self, modelo, images, labels, data_loader, trabajadores=None, batch_size=32,
+                 reproducible=False, seed=0, augment=True, indices=None, chunk_size=1024):
+        self.modelo = modelo
+        self.data_loader = data_loader
+        self.trabajadores = max(1, trabajadores or os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.reproducible = reproducible
+        self.augment = augment
+        self.semilla = np.random.SeedSequence(seed if reproducible else None).entropy
+        self.rng = np.random.default_rng(self.semilla)
+        self.pasos = 0
+        indices = np.arange(len(labels)) if indices is None else np.sort(np.asarray(indices))
+        self.labels = np.ascontiguousarray(np.asarray(labels)[indices], dtype=np.int64)
+        self.n = len(self.labels)
+        self._memorias = []
+        self._procesos = []
+        self._conexiones = []
+
+        parametros = modelo.parameters()
+        self.formas = [p.shape for p in parametros]
+        self.dtype = parametros[0].dtype
+        tamano = sum(p.nbytes for p in parametros)
+
+        try:
+            # Pesos compartidos: el modelo del proceso principal pasa a usar vistas del segmento
+            memoria_pesos = self._crear_memoria(tamano)
+            _, self.pesos = _vistas(memoria_pesos.buf, self.formas, self.dtype)
+            for destino, origen in zip(self.pesos, parametros):
+                destino[...] = origen
+            modelo.set_parameters(self.pesos)
+
+            # Imágenes uint8 compartidas: se copian una sola vez, por bloques, sin otra copia intermedia
+            forma = (self.n,) + tuple(images.shape[1:])
+            memoria_imagenes = self._crear_memoria(max(int(np.prod(forma)), 1))
+            self.images = np.ndarray(forma, dtype=np.uint8, buffer=memoria_imagenes.buf)
+            for inicio in range(0, self.n, chunk_size):
+                self.images[inicio:inicio + chunk_size] = images[indices[inicio:inicio + chunk_size]]
+
+            # Un búfer de gradientes por trabajador y uno para la reducción
+            self._gradientes = []
+            for _ in range(self.trabajadores):
+                memoria = self._crear_memoria(tamano)
+                self._gradientes.append(_vistas(memoria.buf, self.formas, self.dtype)[0])
+            self._reduccion, self._reduccion_vistas = _vistas(bytearray(tamano), self.formas, self.dtype)
+
+            self._iniciar_trabajadores(memoria_pesos, memoria_imagenes)
+        except Exception:
+            self.cerrar()
+            raise
+
+    def _crear_memoria(self, tamano):
+        memoria = shared_memory.SharedMemory(create=True, size=tamano)
+        self._memorias.append(memoria)
+        return memoria
+
+    def _iniciar_trabajadores(self, memoria_pesos, memoria_imagenes):
+        # 'spawn' evita heredar hilos (Tkinter, el hilo de entrenamiento) con fork
+        contexto = mp.get_context('spawn')
+        with un_hilo_blas():
+            for i in range(self.trabajadores):
+                memoria_gradientes = self._memorias[2 + i]
+                nombres = (memoria_pesos.name, memoria_gradientes.name, memoria_imagenes.name)
+                conexion, conexion_hijo = contexto.Pipe()
+                proceso = contexto.Process(
+                    target=_trabajador, daemon=True,
+                    args=(conexion_hijo, self.modelo, self.data_loader, nombres, self.formas,
+                          self.dtype, self.images.shape, self.labels))
+                proceso.start()
+                conexion_hijo.close()
+                self._procesos.append(proceso)
+                self._conexiones.append(conexion)
+        for conexion in self._conexiones:
+            self._recibir(conexion)
+
+    def _recibir(self, conexion):
+        estado, valor = conexion.recv()
+        if estado == 'error':
+            raise RuntimeError(f"Error en un trabajador de entrenamiento:\n{valor}")
+        return valor
+
+    def paso(self, indices):
+        """Entrena sobre un mini-lote (índices de las imágenes) y devuelve su pérdida media."""
+        fragmentos = np.array_split(np.sort(indices), self.trabajadores)
+        activos = []
+        for i, (conexion, fragmento) in enumerate(zip(self._conexiones, fragmentos)):
+            if len(fragmento) == 0:
+                continue
+            if self.reproducible:
+                semilla = np.random.SeedSequence([self.semilla, self.pasos, i])
+            else:
+                semilla = np.random.SeedSequence()
+            conexion.send(('lote', (fragmento, semilla, self.augment)))
+            activos.append(i)
+
+        # All-reduce: suma en orden fijo de trabajador (determinista)
+        loss_total = 0.0
+        for j, i in enumerate(activos):
+            loss_total += self._recibir(self._conexiones[i])
+            if j == 0:
+                self._reduccion[...] = self._gradientes[i]
+            else:
+                self._reduccion += self._gradientes[i]
+        self.modelo.apply_gradients(self._reduccion_vistas)
+        self.pasos += 1
+        return loss_total / len(indices)
+
+    def entrenar_epoca(self):
+        """Recorre una época completa en mini-lotes barajados y devuelve la pérdida media."""
+        indices = self.rng.permutation(self.n)
+        loss_total = 0.0
+        for inicio in range(0, self.n, self.batch_size):
+            lote = indices[inicio:inicio + self.batch_size]
+            loss_total += self.paso(lote) * len(lote)
+        return loss_total / self.n
+
+    def cerrar(self):
+        """Detiene los trabajadores, devuelve al modelo pesos propios y libera la memoria compartida."""
+        for conexion in self._conexiones:
+            try:
+                conexion.send(('detener', None))
+            except (BrokenPipeError, OSError):
+                pass
+        for proceso in self._procesos:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+        for conexion in self._conexiones:
+            conexion.close()
+        self._procesos = []
+        self._conexiones = []
+
+        if getattr(self, 'pesos', None) is not None:
+            self.modelo.set_parameters([p.copy() for p in self.pesos])
+        self.pesos = self.images = self._gradientes = None
+        for memoria in self._memorias:
+            memoria.close()
+            memoria.unlink()
+        self._memorias = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+def curva_escalado(crear_modelo, images, labels, data_loader, max_trabajadores, batch_size=256,
+                   pasos=20, seed=0):
+    """
+    Mide muestras/s entrenando con 1..max_trabajadores procesos.
+
+    Parámetros:
+        - crear_modelo: Función sin argumentos que devuelve un modelo nuevo.
+        - pasos: Mini-lotes medidos por configuración (tras uno de calentamiento).
+
+    Retorna una lista de dicts con trabajadores, muestras_por_s, aceleracion y eficiencia.
+    """
+    rng = np.random.default_rng(seed)
+    lotes = [rng.choice(len(labels), size=min(batch_size, len(labels)), replace=False)
+             for _ in range(pasos + 1)]
+    curva = []
+    for trabajadores in range(1, max_trabajadores + 1):
+        with EntrenadorParalelo(crear_modelo(), images, labels, data_loader, trabajadores=trabajadores,
+                                batch_size=batch_size, reproducible=True, seed=seed) as entrenador:
+            entrenador.paso(lotes[0])  # Calentamiento
+            inicio = time.perf_counter()
+            for lote in lotes[1:]:
+                entrenador.paso(lote)
+            duracion = time.perf_counter() - inicio
+        muestras_por_s = sum(len(lote) for lote in lotes[1:]) / duracion
+        base = curva[0]['muestras_por_s'] if curva else muestras_por_s
+        curva.append({
+            'trabajadores': trabajadores,
+            'muestras_por_s': muestras_por_s,
+            'aceleracion': muestras_por_s / base,
+            'eficiencia': muestras_por_s / base / trabajadores
+        })
+        print(f"{trabajadores:>3} trabajadores: {muestras_por_s:10.1f} muestras/s  "
+              f"x{curva[-1]['aceleracion']:.2f}  eficiencia {curva[-1]['eficiencia'] * 100:.0f}%")
+    return curva
+
+def main():
+    from data_loader import DataLoader
+    from neural_network import NeuralNetwork
+    from cnn import ConvolutionalNetwork
+    from packed_dataset import DatasetEmpaquetado
+
+    parser = argparse.ArgumentParser(description="Curva de escalado del entrenamiento paralelo por datos.")
+    parser.add_argument("--trabajadores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--empaquetado", default=None, help="Dataset empaquetado; si no se indica se usan datos sintéticos.")
+    parser.add_argument("--cantidad", type=int, default=800, help="Imágenes sintéticas.")
+    parser.add_argument("--tamano-imagen", type=int, default=64)
+    parser.add_argument("--modelo", choices=['MLP', 'CNN'], default='MLP')
+    parser.add_argument("--hidden-size", type=int, nargs='+', default=[256, 64])
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--pasos", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salida", default=None, help="Archivo JSON para guardar la curva.")
+    args = parser.parse_args()
+
+    image_size = (args.tamano_imagen, args.tamano_imagen)
+    carpeta = None
+    try:
+        data_loader = DataLoader(None, image_size=image_size, augment_data=True, seed=args.seed)
+        if args.empaquetado:
+            dataset = DatasetEmpaquetado(args.empaquetado)
+            data_loader.image_size = dataset.image_size
+            images, labels, classes = data_loader.load_packed(args.empaquetado)
+        else:
+            from benchmark import generar_dataset_sintetico, _silencioso
+            carpeta = tempfile.mkdtemp(prefix="peces_paralelo_")
+            data_loader.imagenes_guardadas_json_ruta = generar_dataset_sintetico(
+                carpeta, args.cantidad, (320, 240), seed=args.seed)
+            images, labels, classes = _silencioso(data_loader.load_data)
+
+        def crear_modelo():
+            np.random.seed(args.seed)
+            if args.modelo == 'CNN':
+                return ConvolutionalNetwork(images.shape[1:], len(classes), learning_rate=0.001,
+                                            hidden_size=args.hidden_size)
+            return NeuralNetwork(int(np.prod(images.shape[1:])), args.hidden_size, len(classes), learning_rate=0.001)
+
+        print(f"Curva de escalado: {len(labels)} imágenes, modelo {args.modelo}, lote {args.batch_size}")
+        curva = curva_escalado(crear_modelo, images, labels, data_loader, args.trabajadores,
+                               batch_size=args.batch_size, pasos=args.pasos, seed=args.seed)
+    finally:
+        if carpeta:
+            shutil.rmtree(carpeta, ignore_errors=True)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({'parametros': vars(args), 'nucleos': os.cpu_count(), 'curva': curva}, f,
+                      ensure_ascii=False, indent=4)
+        print(f"Curva guardada en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# src/pipeline.py
+
+from PIL import Image, ImageFilter
+
+# Tamaño con el que se guardan las imágenes procesadas del dataset
+TAMANO_GUARDADO = (100, 100)
+
+def crear_filtro_kernel(kernel):
+    """Crea un ImageFilter.Kernel a partir de un kernel del archivo kernel.json."""
+    matriz = kernel['matrix']
+
+    # Convertir la matriz a una lista plana
+    kernel_flat = [item for sublist in matriz for item in sublist]
+
+    # Tamaño del kernel
+    size = kernel.get('size', '3x3')  # Usar 3x3 por defecto si no está especificado
+    if 'x' in size.lower():
+        ancho, alto = map(int, size.lower().split('x'))
+    else:
+        ancho, alto = 3, 3  # Valor por defecto
+
+    return ImageFilter.Kernel(
+        size=(ancho, alto),
+        kernel=kernel_flat,
+        scale=sum(kernel_flat) if sum(kernel_flat) != 0 else 1,
+        offset=0
+    )
+
+def aplicar_kernels(imagen, kernels):
+    """Aplica en orden una lista de kernels a una imagen PIL."""
+    for kernel in kernels:
+        imagen = imagen.filter(crear_filtro_kernel(kernel))
+    return imagen
+
+def aplicar_filtro_color(imagen, filtro):
+    """Aplica uno de los filtros de color ('none', 'grayscale', 'red', 'green', 'blue', 'white', 'black')."""
+    if filtro == 'grayscale':
+        return imagen.convert("L").convert("RGB")
+    elif filtro == 'red':
+        r, g, b = imagen.split()
+        return Image.merge("RGB", (r, Image.new("L", r.size), Image.new("L", r.size)))
+    elif filtro == 'green':
+        r, g, b = imagen.split()
+        return Image.merge("RGB", (Image.new("L", g.size), g, Image.new("L", g.size)))
+    elif filtro == 'blue':
+        r, g, b = imagen.split()
+        return Image.merge("RGB", (Image.new("L", b.size), Image.new("L", b.size), b))
+    elif filtro == 'white':
+        # Convertir a escala de grises y aplicar un umbral para resaltar las áreas blancas
+        grayscale = imagen.convert("L")
+        threshold = 200
+        binary = grayscale.point(lambda x: 255 if x > threshold else 0, '1')
+        return binary.convert("RGB")
+    elif filtro == 'black':
+        # Convertir a escala de grises y aplicar un umbral para resaltar las áreas negras
+        grayscale = imagen.convert("L")
+        threshold = 50
+        binary = grayscale.point(lambda x: 0 if x < threshold else 255, '1')
+        return binary.convert("RGB")
+    # Ningún filtro aplicado
+    return imagen
+
+def procesar_imagen(imagen, filtro, kernels):
+    """
+    Aplica el pipeline de Tratamiento de Imágenes: primero los kernels sobre la
+    imagen original y después el filtro de color.
+    """
+    imagen = aplicar_kernels(imagen.convert("RGB"), kernels)
+    return aplicar_filtro_color(imagen, filtro)
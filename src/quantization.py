@@ -0,0 +1,246 @@
+# src/quantization.py
+
+"""
+Cuantización int8 post-entrenamiento para inferencia rápida en CPU.
+
+Los pesos de cada capa se cuantizan a int8 por canal de salida (simétrico,
+zero-point 0) y las activaciones de entrada de cada capa a int8 por tensor
+(asimétrico, con scale y zero-point calibrados sobre una muestra del
+entrenamiento). El producto se acumula de forma exacta en int32.
+
+NumPy no acelera matmul de enteros (es ~100 veces más lento que BLAS), así que
+los operandos enteros se multiplican con GEMM float32 por bloques de
+BLOQUE_K filas: cada producto parcial está acotado por 128 * 127 * BLOQUE_K < 2^24
+y float32 lo representa sin error, de modo que la suma en int32 es exacta.
+
+Uso:
+    python src/quantization.py --modelo models/modelo_neural.pkl --salida models/modelo_int8.pkl
+"""
+
+import os
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+from neural_network import NeuralNetwork
+
+BLOQUE_K = 1024  # 128 * 127 * 1024 < 2**24: los productos parciales son exactos en float32
+QMIN, QMAX = -128, 127
+
+def _parametros_activacion(valores, percentil):
+    """Scale y zero-point asimétricos para un tensor de activaciones (rango recortado por percentil)."""
+    minimo = min(float(np.percentile(valores, 100 - percentil)), 0.0)
+    maximo = max(float(np.percentile(valores, percentil)), 0.0)
+    scale = max(maximo - minimo, 1e-8) / (QMAX - QMIN)
+    zero_point = int(np.clip(round(QMIN - minimo / scale), QMIN, QMAX))
+    return scale, zero_point
+
+def _cuantizar_pesos(W):
+    """Cuantiza W (entrada, salida) a int8 por canal de salida (simétrico)."""
+    scale = np.maximum(np.abs(W).max(axis=0), 1e-12) / 127.0
+    Wq = np.clip(np.rint(W / scale), -127, 127).astype(np.int8)
+    return Wq, scale.astype(np.float32)
+
+class ModeloCuantizado:
+    """
+    Versión int8 de un NeuralNetwork, con la misma interfaz de predicción.
+
+    El artefacto guardado contiene solo los pesos int8, sus escalas por canal,
+    los parámetros de cuantización de las activaciones y los biases float32.
+    """
+    def __init__(self, nn, X_calibracion, percentil=99.99):
+        if not isinstance(nn, NeuralNetwork):
+            raise ValueError("La cuantización int8 solo está disponible para el perceptrón multicapa (MLP).")
+        self.layer_sizes = list(nn.layer_sizes)
+        self.activation = nn.activation
+        self.pesos = []          # int8 (entrada, salida)
+        self.escalas_pesos = []  # float32 (salida,)
+        self.biases = []         # float32 (1, salida)
+        self.activaciones = []   # (scale, zero_point) de la entrada de cada capa
+
+        # Calibración: se recorren las capas en float registrando el rango de cada entrada
+        activar, _ = NeuralNetwork.ACTIVACIONES[self.activation]
+        a = np.asarray(X_calibracion, dtype=np.float64)
+        ultima = len(nn.weights) - 1
+        for i, (W, b) in enumerate(zip(nn.weights, nn.biases)):
+            self.activaciones.append(_parametros_activacion(a, percentil))
+            Wq, escala = _cuantizar_pesos(W)
+            self.pesos.append(Wq)
+            self.escalas_pesos.append(escala)
+            self.biases.append(np.asarray(b, dtype=np.float32))
+            if i < ultima:
+                a = activar(a.dot(W) + b)
+        self._preparar()
+
+    def __getstate__(self):
+        # Los bloques float32 se reconstruyen al cargar: el artefacto queda en int8
+        state = dict(self.__dict__)
+        state.pop('_bloques', None)
+        state.pop('_sumas_columnas', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._preparar()
+
+    def _preparar(self):
+        """Precalcula los bloques de pesos para GEMM y la suma por columna para el zero-point."""
+        self._bloques = [[Wq[k:k + BLOQUE_K].astype(np.float32) for k in range(0, Wq.shape[0], BLOQUE_K)]
+                         for Wq in self.pesos]
+        self._sumas_columnas = [Wq.sum(axis=0, dtype=np.int32) for Wq in self.pesos]
+
+    @property
+    def input_size(self):
+        return self.layer_sizes[0]
+
+    @property
+    def output_size(self):
+        return self.layer_sizes[-1]
+
+    def _capa(self, i, a):
+        """Capa i: cuantiza la entrada, acumula en int32 y descuantiza."""
+        scale_x, zero_x = self.activaciones[i]
+        # Cuantización en su sitio sobre float32 (una copia en lugar de una por operación)
+        xq = np.multiply(a, np.float32(1.0 / scale_x), dtype=np.float32)
+        xq += zero_x
+        np.rint(xq, out=xq)
+        np.clip(xq, QMIN, QMAX, out=xq)
+        acumulado = np.zeros((len(a), self.layer_sizes[i + 1]), dtype=np.int32)
+        for j, bloque in enumerate(self._bloques[i]):
+            inicio = j * BLOQUE_K
+            acumulado += (xq[:, inicio:inicio + bloque.shape[0]] @ bloque).astype(np.int32)
+        # sum((xq - zx) * wq) = sum(xq * wq) - zx * sum(wq)
+        acumulado -= zero_x * self._sumas_columnas[i]
+        return acumulado.astype(np.float32) * (scale_x * self.escalas_pesos[i]) + self.biases[i]
+
+    def softmax(self, x):
+        exp_scores = np.exp(x - np.max(x, axis=1, keepdims=True))  # Evitar overflow
+        return exp_scores / np.sum(exp_scores, axis=1, keepdims=True)
+
+    def predict_proba(self, X):
+        activar, _ = NeuralNetwork.ACTIVACIONES[self.activation]
+        a = X
+        ultima = len(self.pesos) - 1
+        for i in range(len(self.pesos)):
+            z = self._capa(i, a)
+            a = self.softmax(z) if i == ultima else activar(z)
+        return a
+
+    def predict(self, X):
+        """
+        Realiza una predicción sobre los datos de entrada X.
+
+        Retorna:
+            - predictions: Índices de las clases predichas.
+            - confidences: Confianza asociada a cada predicción.
+        """
+        probs = self.predict_proba(X)
+        return np.argmax(probs, axis=1), np.max(probs, axis=1)
+
+    def save_model(self, path):
+        """Guarda el modelo cuantizado (escritura atómica)."""
+        path_tmp = path + ".tmp"
+        with open(path_tmp, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path_tmp, path)
+
+    @staticmethod
+    def load_model(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+def _muestras_por_segundo(modelo, X, repeticiones):
+    modelo.predict(X[:8])  # Calentamiento
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        modelo.predict(X)
+    return len(X) * repeticiones / (time.perf_counter() - inicio)
+
+def evaluar_cuantizacion(nn, cuantizado, X, y, repeticiones=5):
+    """Compara el modelo float y el int8: precisión, tamaño del artefacto y rendimiento."""
+    pred_float, _ = nn.predict(X)
+    pred_int8, _ = cuantizado.predict(X)
+    precision_float = float(np.mean(pred_float == y))
+    precision_int8 = float(np.mean(pred_int8 == y))
+    tamano_float = len(pickle.dumps(nn, protocol=pickle.HIGHEST_PROTOCOL))
+    tamano_int8 = len(pickle.dumps(cuantizado, protocol=pickle.HIGHEST_PROTOCOL))
+    rendimiento_float = _muestras_por_segundo(nn, X, repeticiones)
+    rendimiento_int8 = _muestras_por_segundo(cuantizado, X, repeticiones)
+    return {
+        'muestras': int(len(y)),
+        'precision_float': precision_float,
+        'precision_int8': precision_int8,
+        'delta_precision': precision_int8 - precision_float,
+        'acuerdo_predicciones': float(np.mean(pred_float == pred_int8)),
+        'tamano_float_bytes': tamano_float,
+        'tamano_int8_bytes': tamano_int8,
+        'reduccion_tamano': tamano_float / tamano_int8,
+        'muestras_por_s_float': rendimiento_float,
+        'muestras_por_s_int8': rendimiento_int8,
+        'aceleracion': rendimiento_int8 / rendimiento_float
+    }
+
+def texto_reporte(reporte):
+    return (f"Precisión float: {reporte['precision_float'] * 100:.3f}%  int8: {reporte['precision_int8'] * 100:.3f}%  "
+            f"(delta {reporte['delta_precision'] * 100:+.3f} pts, acuerdo {reporte['acuerdo_predicciones'] * 100:.2f}%)\n"
+            f"Tamaño: {reporte['tamano_float_bytes'] / 1e6:.2f} MB -> {reporte['tamano_int8_bytes'] / 1e6:.2f} MB "
+            f"(x{reporte['reduccion_tamano']:.1f} menor)\n"
+            f"Rendimiento: {reporte['muestras_por_s_float']:.0f} -> {reporte['muestras_por_s_int8']:.0f} muestras/s "
+            f"(x{reporte['aceleracion']:.2f})\n")
+
+def cuantizar_desde_archivos(modelo_path, salida_path, imagenes_json_ruta, dataset_empaquetado_ruta,
+                             estadisticas_path, muestras_calibracion=512, seed=42):
+    """
+    Cuantiza el modelo guardado calibrando con el entrenamiento y evaluando con la validación.
+
+    Usa la misma división estratificada que el entrenamiento y la normalización
+    de estadisticas.pkl. Guarda el artefacto y el reporte (JSON) junto a él.
+    """
+    from data_loader import DataLoader
+    from model_selection import division_estratificada
+    from packed_dataset import dataset_empaquetado_vigente
+    from recursos import obtener_estadisticas
+
+    nn = NeuralNetwork.load_model(modelo_path)
+    estadisticas = obtener_estadisticas(estadisticas_path)
+    data_loader = DataLoader(imagenes_json_ruta, image_size=tuple(estadisticas['image_size']), augment_data=False)
+    if dataset_empaquetado_vigente(dataset_empaquetado_ruta, imagenes_json_ruta):
+        images, labels, _ = data_loader.load_packed(dataset_empaquetado_ruta)
+    else:
+        images, labels, _ = data_loader.load_data()
+    data_loader.mean = estadisticas['mean']
+    data_loader.std = estadisticas['std']
+    data_loader.feature_extractor = estadisticas.get('extractor')
+
+    indices_train, indices_val = division_estratificada(labels, test_size=0.2, seed=seed)
+    rng = np.random.default_rng(seed)
+    calibracion = np.sort(rng.choice(indices_train, size=min(muestras_calibracion, len(indices_train)), replace=False))
+    X_calibracion = data_loader.prepare_batch(images[calibracion])
+    X_val = data_loader.prepare_batch(images[indices_val])
+
+    cuantizado = ModeloCuantizado(nn, X_calibracion)
+    cuantizado.save_model(salida_path)
+    reporte = evaluar_cuantizacion(nn, cuantizado, X_val, labels[indices_val])
+    reporte['artefacto'] = salida_path
+    with open(os.path.splitext(salida_path)[0] + "_reporte.json", 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=4)
+    return cuantizado, reporte
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantización int8 post-entrenamiento del modelo.")
+    parser.add_argument("--modelo", default=os.path.join("models", "modelo_neural.pkl"))
+    parser.add_argument("--salida", default=os.path.join("models", "modelo_int8.pkl"))
+    parser.add_argument("--estadisticas", default=os.path.join("models", "estadisticas.pkl"))
+    parser.add_argument("--json", default=os.path.join("imagenes_procesadas", "imagenes_guardadas.json"))
+    parser.add_argument("--empaquetado", default=os.path.join("imagenes_procesadas", "dataset.pack"))
+    parser.add_argument("--calibracion", type=int, default=512, help="Imágenes de entrenamiento para calibrar.")
+    args = parser.parse_args()
+
+    _, reporte = cuantizar_desde_archivos(args.modelo, args.salida, args.json, args.empaquetado,
+                                          args.estadisticas, args.calibracion)
+    print(texto_reporte(reporte))
+    print(f"Modelo cuantizado guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
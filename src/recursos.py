@@ -0,0 +1,66 @@
+# src/recursos.py
+
+import os
+import json
+import pickle
+import threading
+
+# Caché por proceso: ruta -> (firma del archivo, objeto cargado)
+_cache = {}
+_lock = threading.Lock()
+
+def _firma(ruta):
+    """Firma barata de un archivo para detectar cambios sin leerlo."""
+    estado = os.stat(ruta)
+    return (estado.st_mtime_ns, estado.st_size)
+
+def _obtener(ruta, cargador):
+    """Devuelve el objeto en caché para la ruta o lo (re)carga si el archivo cambió."""
+    ruta = os.path.abspath(ruta)
+    firma = _firma(ruta)
+    with _lock:
+        guardado = _cache.get(ruta)
+        if guardado is not None and guardado[0] == firma:
+            return guardado[1]
+    objeto = cargador(ruta)
+    with _lock:
+        _cache[ruta] = (firma, objeto)
+    return objeto
+
+def _cargar_kernels(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if 'kernels' not in data:
+        raise KeyError("La clave 'kernels' no se encontró en el archivo JSON.")
+
+    kernels = data['kernels']
+    if not kernels:
+        raise ValueError("La lista de kernels está vacía en el archivo JSON.")
+    print(f"Se cargaron {len(kernels)} kernels desde el archivo JSON.")
+    return kernels
+
+def obtener_kernels(ruta):
+    """Devuelve los kernels de kernel.json, leyendo el archivo una sola vez por proceso."""
+    if not os.path.exists(ruta):
+        raise FileNotFoundError(f"No se encontró el archivo JSON en la ruta especificada:\n{ruta}")
+    return _obtener(ruta, _cargar_kernels)
+
+def _cargar_pickle(ruta):
+    with open(ruta, 'rb') as f:
+        return pickle.load(f)
+
+def obtener_modelo(ruta):
+    """Devuelve el modelo entrenado en caché; se recarga solo si el archivo cambió."""
+    return _obtener(ruta, _cargar_pickle)
+
+def obtener_estadisticas(ruta):
+    """Devuelve el dict de estadisticas.pkl (media, desviación, clases y pipeline) en caché."""
+    return _obtener(ruta, _cargar_pickle)
+
+def guardar_estadisticas(ruta, estadisticas):
+    """Guarda estadisticas.pkl de forma atómica."""
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, 'wb') as f:
+        pickle.dump(estadisticas, f)
+    os.replace(ruta_tmp, ruta)
@@ -0,0 +1,131 @@
+# src/tiling.py
+
+"""
+Clasificación por regiones (mosaico de ventanas deslizantes) para fotos grandes con varios peces.
+
+Para cada escala la imagen se redimensiona una sola vez de modo que una
+ventana de `escala * lado_menor` píxeles mida exactamente lo que espera el
+modelo (64x64); las ventanas solapadas se toman como vistas con strides
+(sliding_window_view, sin copias) y todas las escalas se predicen en una sola
+llamada. Las probabilidades de cada ventana se acumulan sobre una rejilla
+gruesa con una tabla de sumas (suma por rectángulos en O(1) por ventana) y se
+promedian, dando un mapa de clases y de confianza por región.
+"""
+
+import time
+import numpy as np
+from PIL import Image
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Colores RGB por clase para la superposición del mapa
+PALETA = np.array([
+    (230, 25, 75), (60, 180, 75), (255, 225, 25), (0, 130, 200), (245, 130, 48),
+    (145, 30, 180), (70, 240, 240), (240, 50, 230), (210, 245, 60), (250, 190, 190),
+    (0, 128, 128), (170, 110, 40), (128, 0, 0), (0, 0, 128), (128, 128, 128)
+], dtype=np.float32)
+
+def ventanas(arreglo, alto, ancho):
+    """Vista (H - alto + 1, W - ancho + 1, alto, ancho, C) de todas las ventanas de un arreglo (H, W, C), sin copiar."""
+    vista = sliding_window_view(arreglo, (alto, ancho), axis=(0, 1))
+    return np.moveaxis(vista, 2, -1)  # (..., C, alto, ancho) -> (..., alto, ancho, C)
+
+def posiciones(longitud, ventana, paso):
+    """Inicios de ventana cada `paso`, más una última alineada al borde para cubrirlo."""
+    inicios = np.arange(0, longitud - ventana + 1, paso)
+    if inicios[-1] != longitud - ventana:
+        inicios = np.append(inicios, longitud - ventana)
+    return inicios
+
+class ClasificadorMosaico:
+    """
+    Clasifica una imagen por regiones con ventanas solapadas a varias escalas.
+
+    Parámetros:
+        - modelo: Red con predict_proba (NeuralNetwork, ConvolutionalNetwork o ModeloCuantizado).
+        - data_loader: Aporta el tamaño de entrada, la normalización y el extractor de características.
+        - escalas: Lado de la ventana como fracción del lado menor de la imagen.
+        - solapamiento: Fracción de solape entre ventanas vecinas (0.5 = paso de media ventana).
+        - resolucion_mapa: Celdas del lado mayor de la rejilla del mapa.
+    """
+    def __init__(self, modelo, data_loader, escalas=(0.5, 0.35, 0.25), solapamiento=0.5, resolucion_mapa=96):
+        self.modelo = modelo
+        self.data_loader = data_loader
+        self.escalas = escalas
+        self.solapamiento = solapamiento
+        self.resolucion_mapa = resolucion_mapa
+
+    def clasificar(self, imagen):
+        """
+        Retorna un dict con:
+            - probabilidades: (filas, columnas, clases) promedio de las ventanas que cubren cada celda.
+            - cobertura: (filas, columnas) número de ventanas por celda.
+            - ventanas: total de ventanas predichas; tiempo_s: duración.
+        """
+        inicio = time.perf_counter()
+        imagen = imagen.convert("RGB")
+        ancho_img, alto_img = imagen.size
+        ancho_m, alto_m = self.data_loader.image_size
+        paso_x = max(int(round(ancho_m * (1 - self.solapamiento))), 1)
+        paso_y = max(int(round(alto_m * (1 - self.solapamiento))), 1)
+
+        lotes = []
+        rectangulos = []  # (y0, x0, y1, x1) de cada ventana en píxeles de la imagen original
+        for escala in self.escalas:
+            factor = ancho_m / (escala * min(ancho_img, alto_img))
+            tamano = (max(int(round(ancho_img * factor)), ancho_m), max(int(round(alto_img * factor)), alto_m))
+            reducida = np.asarray(imagen.resize(tamano, Image.LANCZOS, reducing_gap=2.0))
+            inicios_y = posiciones(tamano[1], alto_m, paso_y)
+            inicios_x = posiciones(tamano[0], ancho_m, paso_x)
+            # Única copia: las ventanas elegidas de la vista pasan al lote contiguo para predict
+            lotes.append(ventanas(reducida, alto_m, ancho_m)[np.ix_(inicios_y, inicios_x)].reshape(-1, alto_m, ancho_m, 3))
+            y0 = np.repeat(inicios_y, len(inicios_x)) / (tamano[1] / alto_img)
+            x0 = np.tile(inicios_x, len(inicios_y)) / (tamano[0] / ancho_img)
+            rectangulos.append(np.stack([y0, x0, y0 + alto_m * alto_img / tamano[1],
+                                         x0 + ancho_m * ancho_img / tamano[0]], axis=1))
+        lote = np.concatenate(lotes)
+        rectangulos = np.concatenate(rectangulos)
+        probabilidades = self.modelo.predict_proba(self.data_loader.prepare_batch(lote))
+
+        # Rejilla del mapa y acumulación por rectángulos con una tabla de sumas 2D
+        celda = max(ancho_img, alto_img) / self.resolucion_mapa
+        filas_mapa = max(int(np.ceil(alto_img / celda)), 1)
+        columnas_mapa = max(int(np.ceil(ancho_img / celda)), 1)
+        y0 = np.clip(np.floor(rectangulos[:, 0] / celda).astype(int), 0, filas_mapa - 1)
+        x0 = np.clip(np.floor(rectangulos[:, 1] / celda).astype(int), 0, columnas_mapa - 1)
+        y1 = np.clip(np.ceil(rectangulos[:, 2] / celda).astype(int), y0 + 1, filas_mapa)
+        x1 = np.clip(np.ceil(rectangulos[:, 3] / celda).astype(int), x0 + 1, columnas_mapa)
+        valores = np.concatenate([probabilidades, np.ones((len(probabilidades), 1))], axis=1)
+        delta = np.zeros((filas_mapa + 1, columnas_mapa + 1, valores.shape[1]))
+        np.add.at(delta, (y0, x0), valores)
+        np.add.at(delta, (y0, x1), -valores)
+        np.add.at(delta, (y1, x0), -valores)
+        np.add.at(delta, (y1, x1), valores)
+        acumulado = delta.cumsum(axis=0).cumsum(axis=1)[:filas_mapa, :columnas_mapa]
+        cobertura = acumulado[..., -1]
+        return {
+            'probabilidades': acumulado[..., :-1] / np.maximum(cobertura, 1)[..., None],
+            'cobertura': cobertura,
+            'ventanas': len(lote),
+            'tiempo_s': time.perf_counter() - inicio
+        }
+
+def superponer_mapa(imagen, resultado, alpha=0.5):
+    """Colorea cada región con el color de su clase, con opacidad proporcional a la confianza."""
+    probabilidades = resultado['probabilidades']
+    clases = np.argmax(probabilidades, axis=-1)
+    confianza = np.max(probabilidades, axis=-1) * (resultado['cobertura'] > 0)
+    colores = PALETA[clases % len(PALETA)]
+    mapa = np.concatenate([colores, (alpha * 255 * confianza)[..., None]], axis=-1).astype(np.uint8)
+    # NEAREST conserva los bordes de la rejilla; el mapa es pequeño y se escala en C
+    capa = Image.fromarray(mapa, "RGBA").resize(imagen.size, Image.NEAREST)
+    return Image.alpha_composite(imagen.convert("RGBA"), capa).convert("RGB")
+
+def resumen_regiones(resultado, classes, umbral=0.5):
+    """Fracción del área asignada a cada clase con confianza >= umbral, de mayor a menor."""
+    probabilidades = resultado['probabilidades']
+    cubiertas = resultado['cobertura'] > 0
+    confiables = cubiertas & (np.max(probabilidades, axis=-1) >= umbral)
+    conteos = np.bincount(np.argmax(probabilidades, axis=-1)[confiables], minlength=len(classes))
+    total = max(int(cubiertas.sum()), 1)
+    return sorted(((classes[i], float(conteos[i] / total)) for i in range(len(classes)) if conteos[i]),
+                  key=lambda par: -par[1])
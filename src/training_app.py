@@ -3,15 +3,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from neural_network import NeuralNetwork
+from cnn import ConvolutionalNetwork
 from data_loader import DataLoader
+from packed_dataset import exportar_dataset_empaquetado, dataset_empaquetado_vigente
+from parallel_training import EntrenadorParalelo
+from hyperparameter_search import BusquedaHiperparametros
+from model_selection import division_estratificada, reporte_clasificacion, validacion_cruzada
+from features import EXTRACTORES, crear_extractor
+from instrumentation import instrumentacion, medir
 import threading
 import os
 import numpy as np
 import queue
 import time
-from sklearn.model_selection import train_test_split
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from dataset_manifest import DatasetManifest
+from recursos import guardar_estadisticas
+from model_registry import RegistroModelos, huella_dataset
+from training_metrics import SerieAcotada, RegistroMetricas, listar_ejecuciones, dibujar_ejecuciones
+from checkpoint import crear_checkpoint, guardar_checkpoint, cargar_checkpoint, restaurar_data_loader, restaurar_entrenador
 
 class TrainingApp(ttk.Frame):
     def __init__(self, master, carpeta_raiz, **kwargs):
@@ -21,12 +32,19 @@ class TrainingApp(ttk.Frame):
         self.carpeta_raiz = carpeta_raiz
         self.models_dir = os.path.join(self.carpeta_raiz, 'models')
         os.makedirs(self.models_dir, exist_ok=True)
+        self.imagenes_json_ruta = os.path.join(self.carpeta_raiz, "imagenes_procesadas", "imagenes_guardadas.json")
+        self.dataset_empaquetado_ruta = os.path.join(self.carpeta_raiz, "imagenes_procesadas", "dataset.pack")
+        self.checkpoint_path = os.path.join(self.models_dir, "checkpoint.pkl")
+        self.intervalo_checkpoint = 30  # Segundos entre checkpoints durante el entrenamiento
+        self.detener_evento = threading.Event()
 
         self.queue = queue.Queue()
         self.max_epochs = None  # No hay límite de épocas
 
-        # Almacenar las pérdidas para la gráfica
-        self.losses = []
+        # Pérdidas para la gráfica (memoria acotada; el historial completo va a models/ejecuciones)
+        self.losses = SerieAcotada(capacidad=2000)
+        self.carpeta_ejecuciones = os.path.join(self.models_dir, "ejecuciones")
+        self.lineas_max_consola = 2000  # Líneas que conserva la consola; las más antiguas se descartan
 
         # Título de la sección
         lbl_title = ttk.Label(self, text="Entrenamiento de la Red Neuronal", font=("Helvetica", 16))
@@ -37,13 +55,75 @@ class TrainingApp(ttk.Frame):
         frame_parametros.pack(padx=20, pady=10, fill=tk.X)
 
         # Parámetros del entrenamiento
-        self.agregar_parametro(frame_parametros, "Número de Neuronas en Capa Oculta:", 0, "64")
+        self.agregar_parametro(frame_parametros, "Neuronas en Capas Ocultas (ej. 256,64):", 0, "64")
         self.agregar_parametro(frame_parametros, "Tasa de Aprendizaje (Alpha):", 1, "0.001")
         self.agregar_parametro(frame_parametros, "Error Deseado:", 2, "0.001")
+        self.agregar_parametro(frame_parametros, "Tamaño de Lote:", 3, "32")
+
+        # Activación de las capas ocultas
+        ttk.Label(frame_parametros, text="Activación:").grid(row=4, column=0, padx=5, pady=5, sticky='w')
+        self.activacion = tk.StringVar(value='relu')
+        combo_activacion = ttk.Combobox(frame_parametros, textvariable=self.activacion, state='readonly',
+                                        values=list(NeuralNetwork.ACTIVACIONES))
+        combo_activacion.grid(row=4, column=1, padx=5, pady=5, sticky='w')
+
+        # Tipo de modelo: perceptrón multicapa o red convolucional
+        ttk.Label(frame_parametros, text="Tipo de Modelo:").grid(row=5, column=0, padx=5, pady=5, sticky='w')
+        self.tipo_modelo = tk.StringVar(value='MLP')
+        combo_modelo = ttk.Combobox(frame_parametros, textvariable=self.tipo_modelo, state='readonly', values=['MLP', 'CNN'])
+        combo_modelo.grid(row=5, column=1, padx=5, pady=5, sticky='w')
+        self.agregar_parametro(frame_parametros, "Filtros Convolucionales (CNN, ej. 8,16,32):", 6, "8,16,32")
+
+        # Instrumentación de las etapas del entrenamiento (también con PECES_INSTRUMENTACION=1)
+        self.instrumentar = tk.BooleanVar(value=instrumentacion.habilitada)
+        chk_instrumentar = ttk.Checkbutton(frame_parametros, text="Instrumentar etapas (tiempos por etapa)", variable=self.instrumentar)
+        chk_instrumentar.grid(row=7, column=0, columnspan=2, padx=5, pady=5, sticky='w')
+
+        # Procesos para el entrenamiento paralelo por datos (1 = en el mismo proceso)
+        self.agregar_parametro(frame_parametros, "Procesos de Entrenamiento:", 8, "1")
+
+        # Validación cruzada k-fold estratificada
+        self.agregar_parametro(frame_parametros, "Pliegues (Validación Cruzada):", 9, "5")
+        self.agregar_parametro(frame_parametros, "Épocas por Pliegue:", 10, "20")
+
+        # Entrada del modelo: píxeles normalizados o características compactas (features.py, solo MLP)
+        ttk.Label(frame_parametros, text="Entrada del Modelo:").grid(row=11, column=0, padx=5, pady=5, sticky='w')
+        self.caracteristicas = tk.StringVar(value='pixeles')
+        combo_caracteristicas = ttk.Combobox(frame_parametros, textvariable=self.caracteristicas, state='readonly',
+                                             values=list(EXTRACTORES))
+        combo_caracteristicas.grid(row=11, column=1, padx=5, pady=5, sticky='w')
 
         # Botón para iniciar el entrenamiento
-        btn_train = ttk.Button(self, text="Iniciar Entrenamiento", command=self.start_training)
-        btn_train.pack(pady=10)
+        frame_botones = ttk.Frame(self)
+        frame_botones.pack(pady=10)
+        btn_train = ttk.Button(frame_botones, text="Iniciar Entrenamiento", command=self.start_training)
+        btn_train.pack(side=tk.LEFT, padx=5)
+
+        # Detener guarda un checkpoint; Reanudar continúa desde el último checkpoint
+        btn_detener = ttk.Button(frame_botones, text="Detener", command=self.detener_entrenamiento)
+        btn_detener.pack(side=tk.LEFT, padx=5)
+        btn_reanudar = ttk.Button(frame_botones, text="Reanudar Entrenamiento", command=self.reanudar_entrenamiento)
+        btn_reanudar.pack(side=tk.LEFT, padx=5)
+
+        # Botón para empaquetar el dataset en un único archivo mapeable en memoria
+        btn_empaquetar = ttk.Button(frame_botones, text="Empaquetar Dataset", command=self.empaquetar_dataset)
+        btn_empaquetar.pack(side=tk.LEFT, padx=5)
+
+        # Búsqueda de hiperparámetros (successive halving en un pool de procesos)
+        btn_buscar = ttk.Button(frame_botones, text="Buscar Hiperparámetros", command=self.buscar_hiperparametros)
+        btn_buscar.pack(side=tk.LEFT, padx=5)
+
+        # Validación cruzada con los pliegues entrenados en paralelo
+        btn_cv = ttk.Button(frame_botones, text="Validación Cruzada", command=self.iniciar_validacion_cruzada)
+        btn_cv.pack(side=tk.LEFT, padx=5)
+
+        # Cuantización int8 del modelo guardado para inferencia rápida en CPU
+        btn_cuantizar = ttk.Button(frame_botones, text="Cuantizar Modelo (int8)", command=self.cuantizar_modelo)
+        btn_cuantizar.pack(side=tk.LEFT, padx=5)
+
+        # Visor de métricas de entrenamientos anteriores (models/ejecuciones)
+        btn_ejecuciones = ttk.Button(frame_botones, text="Comparar Ejecuciones", command=self.abrir_visor_ejecuciones)
+        btn_ejecuciones.pack(side=tk.LEFT, padx=5)
 
         # Barra de progreso y estado
         self.progress = ttk.Progressbar(self, orient='horizontal', mode='indeterminate', length=400)
@@ -78,7 +158,9 @@ class TrainingApp(ttk.Frame):
         frame_consola_grafica.columnconfigure(0, weight=1)
 
         # Crear la figura de matplotlib
-        self.fig, self.ax = plt.subplots(figsize=(8, 6))
+        # Figure directamente (sin pyplot): evita el estado global y es más ligero de importar
+        self.fig = Figure(figsize=(8, 6))
+        self.ax = self.fig.add_subplot(111)
         self.ax.set_title("Error vs. Épocas")
         self.ax.set_xlabel("Épocas")
         self.ax.set_ylabel("Error")
@@ -103,49 +185,102 @@ class TrainingApp(ttk.Frame):
     def start_training(self):
         """Inicia el proceso de entrenamiento."""
         try:
-            hidden_size = int(self.entry_0.get())
+            hidden_size = [int(valor) for valor in self.entry_0.get().split(',') if valor.strip()]
+            if not hidden_size or min(hidden_size) <= 0:
+                raise ValueError
             learning_rate = float(self.entry_1.get())
             desired_error = float(self.entry_2.get())
+            batch_size = int(self.entry_3.get())
+            if batch_size <= 0:
+                raise ValueError
+            conv_filters = [int(valor) for valor in self.entry_6.get().split(',') if valor.strip()]
+            if self.tipo_modelo.get() == 'CNN' and (not conv_filters or min(conv_filters) <= 0):
+                raise ValueError
+            trabajadores = int(self.entry_8.get())
+            if trabajadores <= 0:
+                raise ValueError
         except ValueError:
             messagebox.showerror("Entrada Inválida", "Por favor ingresa valores numéricos válidos.")
             return
+        if self.tipo_modelo.get() == 'CNN' and self.caracteristicas.get() != 'pixeles':
+            messagebox.showerror("Entrada Inválida", "La red convolucional necesita los píxeles como entrada.")
+            return
 
-        # Cargar los datos para el entrenamiento
+        instrumentacion.habilitada = self.instrumentar.get()
+        instrumentacion.reiniciar()
+
+        datos = self.cargar_datos()
+        if datos is None:
+            return
+        inputs, labels, classes = datos
+
+        # Dividir los datos en entrenamiento y validación (estratificado por clase)
+        indices_train, indices_val = division_estratificada(labels, test_size=0.2, seed=42)
+
+        # Extractor de características ajustado solo con el entrenamiento (sin fuga de validación)
+        extractor = crear_extractor(self.caracteristicas.get(), seed=42)
+        if extractor is not None:
+            self.status_label.config(text="Estado: Ajustando el extractor de características...")
+            with medir('features'):
+                extractor.ajustar(inputs, indices=indices_train)
+            self.data_loader.feature_extractor = extractor
+            print(f"Extractor de características '{extractor.nombre}': {int(np.prod(inputs.shape[1:]))} -> {extractor.dimension} entradas")
+
+        # Crear la red neuronal
+        input_size = extractor.dimension if extractor is not None else int(np.prod(inputs.shape[1:]))
+        output_size = len(classes)
+        if self.tipo_modelo.get() == 'CNN':
+            nn = ConvolutionalNetwork(inputs.shape[1:], output_size, learning_rate,
+                                      conv_filters=conv_filters, hidden_size=hidden_size)
+            print(f"Red Convolucional creada: filtros={conv_filters}, capas densas={hidden_size}, parámetros={nn.num_parameters()}, learning_rate={learning_rate}")
+        else:
+            nn = NeuralNetwork(input_size, hidden_size, output_size, learning_rate, activation=self.activacion.get())
+            print(f"Red Neuronal creada: capas={nn.layer_sizes}, activación={nn.activation}, learning_rate={learning_rate}")
+
+        self.lanzar_entrenamiento(nn, inputs, labels, classes, indices_train, indices_val,
+                                  desired_error, batch_size, trabajadores)
+
+    def cargar_datos(self):
+        """Carga el dataset (empaquetado si está al día) y devuelve (inputs, labels, classes) o None."""
         self.status_label.config(text="Estado: Cargando datos...")
         try:
             data_loader = DataLoader(
-                imagenes_guardadas_json_ruta=os.path.join(
-                    self.carpeta_raiz, "imagenes_procesadas", "imagenes_guardadas.json"
-                ),
+                imagenes_guardadas_json_ruta=self.imagenes_json_ruta,
                 image_size=(64, 64),
-                augment_data=True  # Activar Data Augmentation
+                augment_data=True,  # Data Augmentation aleatoria por mini-lote
+                seed=42
             )
-            inputs, labels, classes = data_loader.load_data()
+            # Usar el dataset empaquetado si está al día con el manifiesto
+            if dataset_empaquetado_vigente(self.dataset_empaquetado_ruta, self.imagenes_json_ruta):
+                inputs, labels, classes = data_loader.load_packed(self.dataset_empaquetado_ruta)
+            else:
+                inputs, labels, classes = data_loader.load_data()
             self.data_loader = data_loader  # Guardar para uso posterior
             print(f"Datos cargados: {inputs.shape[0]} muestras.")
         except Exception as e:
             messagebox.showerror("Error al Cargar Datos", f"Ocurrió un error al cargar los datos:\n{e}")
             self.status_label.config(text="Estado: Error al cargar los datos.")
-            return
+            return None
 
         if inputs.size == 0 or labels.size == 0:
             messagebox.showwarning("Datos Insuficientes", "No hay datos de entrenamiento disponibles.")
             self.status_label.config(text="Estado: Datos insuficientes.")
-            return
+            return None
 
-        # Normalizar los datos
+        # Estadísticas de normalización (se aplican por mini-lote)
         self.mean = self.data_loader.mean
         self.std = self.data_loader.std
-        inputs = (inputs - self.mean) / self.std
-
-        # Dividir los datos en entrenamiento y validación
-        X_train, X_val, y_train, y_val = train_test_split(inputs, labels, test_size=0.2, random_state=42, stratify=labels)
-
-        # Crear la red neuronal
-        input_size = inputs.shape[1]
-        output_size = len(classes)
-        nn = NeuralNetwork(input_size, hidden_size, output_size, learning_rate)
-        print(f"Red Neuronal creada: input_size={input_size}, hidden_size={hidden_size}, output_size={output_size}, learning_rate={learning_rate}")
+        return inputs, labels, classes
+
+    def lanzar_entrenamiento(self, nn, inputs, labels, classes, indices_train, indices_val,
+                             desired_error, batch_size, trabajadores, checkpoint=None):
+        """Prepara la interfaz y entrena la red en un hilo separado."""
+        self.indices_train = indices_train
+        self.indices_val = indices_val
+        # El entrenamiento se lee por mini-lote directamente de inputs (sin copiar un memmap);
+        # solo el subconjunto de validación se carga en memoria
+        indices_val_ordenados = np.sort(indices_val)
+        X_val, y_val = inputs[indices_val_ordenados], labels[indices_val_ordenados]
 
         # Configurar la barra de progreso
         self.progress.start()
@@ -154,39 +289,304 @@ class TrainingApp(ttk.Frame):
         # Limpiar el texto de salida
         self.text_output.delete('1.0', tk.END)
 
-        # Limpiar las pérdidas anteriores
+        # Limpiar las pérdidas anteriores (o recuperar las del checkpoint)
         self.losses.clear()
+        if checkpoint is not None:
+            self.losses.extend(checkpoint['losses'])
 
+        self.detener_evento.clear()
         # Entrenar la red neuronal en un hilo separado
-        threading.Thread(target=self.train_nn, args=(nn, X_train, y_train, X_val, y_val, classes, desired_error)).start()
+        threading.Thread(target=self.train_nn, args=(nn, inputs, labels, indices_train, X_val, y_val, classes, desired_error,
+                                                     batch_size, trabajadores, checkpoint)).start()
+
+    def detener_entrenamiento(self):
+        """Pide al entrenamiento en curso que se detenga al final de la época y guarde un checkpoint."""
+        self.detener_evento.set()
+        self.status_label.config(text="Estado: Deteniendo al final de la época...")
+
+    def reanudar_entrenamiento(self):
+        """Continúa el entrenamiento desde el último checkpoint guardado."""
+        try:
+            checkpoint = cargar_checkpoint(self.checkpoint_path)
+        except Exception as e:
+            messagebox.showerror("Error al Reanudar", f"No se pudo cargar el checkpoint:\n{e}")
+            return
+
+        instrumentacion.habilitada = self.instrumentar.get()
+        instrumentacion.reiniciar()
+
+        datos = self.cargar_datos()
+        if datos is None:
+            return
+        inputs, labels, classes = datos
+        if list(classes) != checkpoint['classes'] or len(labels) != len(checkpoint['indices_train']) + len(checkpoint['indices_val']):
+            messagebox.showerror("Error al Reanudar", "El dataset cambió desde que se guardó el checkpoint; inicia un entrenamiento nuevo.")
+            self.status_label.config(text="Estado: Checkpoint incompatible con el dataset.")
+            return
+
+        # Misma normalización y mismos generadores aleatorios que al guardar
+        restaurar_data_loader(checkpoint, self.data_loader)
+        self.mean = self.data_loader.mean
+        self.std = self.data_loader.std
+        config = checkpoint['config']
+        print(f"Reanudando desde la época {checkpoint['epoca']} (checkpoint del {checkpoint['fecha']}).")
+        self.lanzar_entrenamiento(checkpoint['modelo'], inputs, labels, classes, checkpoint['indices_train'],
+                                  checkpoint['indices_val'], config['desired_error'], config['batch_size'],
+                                  config['trabajadores'], checkpoint=checkpoint)
+
+    def guardar_checkpoint(self, nn, epoch, best_accuracy, classes, config, entrenador=None):
+        """Guarda el estado completo del entrenamiento para poder reanudarlo."""
+        with medir('checkpoint'):
+            guardar_checkpoint(self.checkpoint_path, crear_checkpoint(
+                nn, epoch, self.losses, best_accuracy, self.data_loader, classes,
+                self.indices_train, self.indices_val, config, entrenador))
+
+    def empaquetar_dataset(self):
+        """Exporta el dataset procesado a un único archivo empaquetado en un hilo separado."""
+        self.status_label.config(text="Estado: Empaquetando dataset...")
+        self.progress.start()
+        threading.Thread(target=self.ejecutar_empaquetado, daemon=True).start()
+
+    def ejecutar_empaquetado(self):
+        """Realiza el empaquetado del dataset en un hilo separado."""
+        try:
+            inicio = time.time()
+            ruta = exportar_dataset_empaquetado(self.imagenes_json_ruta, self.dataset_empaquetado_ruta, image_size=(64, 64))
+            self.queue.put(('output', f"Dataset empaquetado en {ruta} ({time.time() - inicio:.2f}s)\n"))
+            self.queue.put(('status', "Estado: Dataset empaquetado."))
+        except Exception as e:
+            self.queue.put(('error', f"Ocurrió un error al empaquetar el dataset:\n{e}"))
+        finally:
+            self.queue.put(('progress_stop', None))
+
+    def buscar_hiperparametros(self):
+        """Lanza la búsqueda de hiperparámetros en un hilo separado."""
+        self.status_label.config(text="Estado: Buscando hiperparámetros...")
+        self.text_output.delete('1.0', tk.END)
+        self.progress.start()
+        threading.Thread(target=self.ejecutar_busqueda, args=(self.tipo_modelo.get(),), daemon=True).start()
+
+    def ejecutar_busqueda(self, tipo_modelo):
+        """Ejecuta la búsqueda sobre el dataset empaquetado e instala el mejor modelo."""
+        try:
+            if not dataset_empaquetado_vigente(self.dataset_empaquetado_ruta, self.imagenes_json_ruta):
+                self.queue.put(('output', "Empaquetando el dataset para compartirlo entre los ensayos...\n"))
+                exportar_dataset_empaquetado(self.imagenes_json_ruta, self.dataset_empaquetado_ruta, image_size=(64, 64))
+            self.data_loader = DataLoader(self.imagenes_json_ruta, image_size=(64, 64), augment_data=False)
+            _, _, classes = self.data_loader.load_packed(self.dataset_empaquetado_ruta)
+            self.mean = self.data_loader.mean
+            self.std = self.data_loader.std
+
+            def informar(fila):
+                precision = fila.get('precision_validacion')
+                texto = f"{precision * 100:.2f}%" if precision is not None else "-"
+                self.queue.put(('output', f"Ensayo {fila['id']} ({fila['resultado']}, {fila.get('epocas', 0)} épocas): {texto}\n"))
+
+            busqueda = BusquedaHiperparametros(self.dataset_empaquetado_ruta, estrategia='halving', n_ensayos=16,
+                                               epocas=20, tipo_modelo=tipo_modelo, callback=informar)
+            busqueda.ejecutar()
+            _, mejor = busqueda.mejor_modelo()
+            if mejor is None:
+                raise RuntimeError("Ningún ensayo produjo un modelo válido.")
+            ruta_tabla = os.path.join(self.models_dir, f"busqueda_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            modelo_path = os.path.join(self.models_dir, "modelo_neural.pkl")
+            busqueda.guardar(ruta_tabla, modelo_path)
+            self.guardar_estadisticas(classes)
+
+            self.queue.put(('output', "Tabla de posiciones:\n" + busqueda.texto_tabla()))
+            self.queue.put(('output', f"Tabla guardada en: {ruta_tabla}\n"))
+            self.queue.put(('status', f"Estado: Búsqueda completada. Mejor precisión en validación: {mejor['precision_validacion'] * 100:.3f}%"))
+            self.queue.put(('messagebox', ("Búsqueda de Hiperparámetros", f"Búsqueda completada.\nMejor configuración: {mejor['config']}\nModelo guardado en:\n{modelo_path}")))
+        except Exception as e:
+            self.queue.put(('error', f"Ocurrió un error durante la búsqueda de hiperparámetros:\n{e}"))
+            print(f"Error durante la búsqueda de hiperparámetros: {e}")
+        finally:
+            self.queue.put(('progress_stop', None))
+
+    def iniciar_validacion_cruzada(self):
+        """Lanza la validación cruzada k-fold con los parámetros actuales en un hilo separado."""
+        try:
+            config = {
+                'hidden_size': [int(valor) for valor in self.entry_0.get().split(',') if valor.strip()],
+                'learning_rate': float(self.entry_1.get()),
+                'batch_size': int(self.entry_3.get()),
+                'activation': self.activacion.get(),
+                'conv_filters': [int(valor) for valor in self.entry_6.get().split(',') if valor.strip()],
+                'caracteristicas': self.caracteristicas.get(),
+                'augmentation': 'fuerte',
+                'seed': 42
+            }
+            pliegues = int(self.entry_9.get())
+            epocas = int(self.entry_10.get())
+            if not config['hidden_size'] or config['batch_size'] <= 0 or pliegues < 2 or epocas <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Entrada Inválida", "Por favor ingresa valores numéricos válidos.")
+            return
+        self.status_label.config(text=f"Estado: Validación cruzada con {pliegues} pliegues...")
+        self.text_output.delete('1.0', tk.END)
+        self.progress.start()
+        threading.Thread(target=self.ejecutar_validacion_cruzada,
+                         args=(config, self.tipo_modelo.get(), pliegues, epocas), daemon=True).start()
 
-    def train_nn(self, nn, X_train, y_train, X_val, y_val, classes, desired_error):
-        """Realiza el entrenamiento en un hilo separado."""
+    def ejecutar_validacion_cruzada(self, config, tipo_modelo, pliegues, epocas):
+        """Entrena los pliegues en paralelo sobre el dataset empaquetado y muestra las métricas."""
         try:
-            best_accuracy = 0
+            if not dataset_empaquetado_vigente(self.dataset_empaquetado_ruta, self.imagenes_json_ruta):
+                self.queue.put(('output', "Empaquetando el dataset para compartirlo entre los pliegues...\n"))
+                exportar_dataset_empaquetado(self.imagenes_json_ruta, self.dataset_empaquetado_ruta, image_size=(64, 64))
+            inicio = time.time()
+            resultado = validacion_cruzada(self.dataset_empaquetado_ruta, config, tipo_modelo, k=pliegues, epocas=epocas)
+            for i, precision in enumerate(resultado['precisiones'], start=1):
+                self.queue.put(('output', f"Pliegue {i}: {precision * 100:.3f}%\n"))
+            resumen = f"Precisión media: {resultado['media'] * 100:.3f}% ± {resultado['desviacion'] * 100:.3f}%"
+            self.queue.put(('output', f"{resumen} ({time.time() - inicio:.2f}s)\n"))
+            self.queue.put(('output', "Matriz de confusión (filas: real, columnas: predicha):\n"))
+            self.queue.put(('output', f"{resultado['matriz_confusion']}\n\n"))
+            self.queue.put(('output', "Reporte de clasificación (todos los pliegues):\n"))
+            self.queue.put(('output', resultado['reporte']))
+            self.queue.put(('status', f"Estado: Validación cruzada completada. {resumen}"))
+        except Exception as e:
+            self.queue.put(('error', f"Ocurrió un error durante la validación cruzada:\n{e}"))
+            print(f"Error durante la validación cruzada: {e}")
+        finally:
+            self.queue.put(('progress_stop', None))
+
+    def cuantizar_modelo(self):
+        """Cuantiza a int8 el modelo guardado en un hilo separado."""
+        self.status_label.config(text="Estado: Cuantizando el modelo...")
+        self.progress.start()
+        threading.Thread(target=self.ejecutar_cuantizacion, daemon=True).start()
+
+    def ejecutar_cuantizacion(self):
+        """Calibra el modelo int8 con el entrenamiento y muestra la comparación con el modelo float."""
+        from quantization import cuantizar_desde_archivos, texto_reporte  # Importación diferida
+        try:
+            salida = os.path.join(self.models_dir, "modelo_int8.pkl")
+            _, reporte = cuantizar_desde_archivos(
+                os.path.join(self.models_dir, "modelo_neural.pkl"), salida, self.imagenes_json_ruta,
+                self.dataset_empaquetado_ruta, os.path.join(self.models_dir, "estadisticas.pkl"))
+            self.queue.put(('output', "Cuantización int8 (conjunto de validación):\n" + texto_reporte(reporte)))
+            self.queue.put(('output', f"Modelo cuantizado guardado en: {salida}\n"))
+            self.queue.put(('status', f"Estado: Modelo cuantizado (x{reporte['aceleracion']:.2f} más rápido, "
+                                      f"delta {reporte['delta_precision'] * 100:+.2f} pts)."))
+        except Exception as e:
+            self.queue.put(('error', f"Ocurrió un error al cuantizar el modelo:\n{e}"))
+            print(f"Error al cuantizar el modelo: {e}")
+        finally:
+            self.queue.put(('progress_stop', None))
+
+    def train_nn(self, nn, inputs, labels, indices_train, X_val, y_val, classes, desired_error, batch_size=32,
+                 trabajadores=1, checkpoint=None):
+        """
+        Realiza el entrenamiento en un hilo separado (continuando desde checkpoint si se da).
+        Se entrena con inputs[indices_train], leídos por mini-lote.
+        """
+        entrenador = None
+        config = {'desired_error': desired_error, 'batch_size': batch_size, 'trabajadores': trabajadores}
+        metricas = None
+        estado_final = 'error'
+        epoch = 0
+        best_accuracy = 0
+        try:
+            # Métricas por época en models/ejecuciones; las reanudaciones siguen en la misma ejecución
+            # (sin las épocas posteriores al checkpoint que se escribieron antes de un corte)
+            id_ejecucion = checkpoint['config'].get('ejecucion') if checkpoint is not None else None
+            hasta_epoca = checkpoint['epoca'] if checkpoint is not None else None
+            metricas = RegistroMetricas(self.carpeta_ejecuciones, id_ejecucion, hasta_epoca=hasta_epoca, meta={
+                'modelo': type(nn).__name__,
+                'learning_rate': getattr(nn, 'learning_rate', None),
+                'muestras_entrenamiento': len(indices_train),
+                'muestras_validacion': len(y_val),
+                'clases': list(classes),
+                'config': dict(config)
+            })
+            config['ejecucion'] = metricas.id_ejecucion
+            if trabajadores > 1:
+                # Cada mini-lote se reparte entre procesos con pesos en memoria compartida
+                entrenador = EntrenadorParalelo(nn, inputs, labels, self.data_loader, trabajadores=trabajadores,
+                                                batch_size=batch_size, reproducible=True, seed=42,
+                                                indices=indices_train)
+                if checkpoint is not None:
+                    restaurar_entrenador(checkpoint, entrenador)
+                self.queue.put(('output', f"Entrenamiento paralelo con {trabajadores} procesos.\n"))
+            # El conjunto de validación no se aumenta: se prepara una sola vez
+            X_val = self.data_loader.prepare_batch(X_val, augment=False)
             modelo_path = os.path.join(self.models_dir, "modelo_neural.pkl")
-            epoch = 0
+            estadisticas_guardadas = False
             loss = float('inf')
+            if checkpoint is not None:
+                epoch = checkpoint['epoca']
+                best_accuracy = checkpoint['best_accuracy']
+                self.queue.put(('output', f"Reanudando desde la época {epoch} (mejor precisión {best_accuracy * 100:.3f}%).\n"))
             start_time = time.time()
+            ultimo_checkpoint = start_time
+            instrumentacion.iniciar_captura()
             while loss > desired_error:
+                if self.detener_evento.is_set():
+                    break
                 epoch += 1
-                loss = nn.train_step(X_train, y_train)
-                self.losses.append(loss)  # Guardar la pérdida
+                instrumentacion.contar('epocas')
+                inicio_epoca = time.perf_counter()
+                # Recorrer los mini-lotes; la augmentation se aplica al muestrear
+                if entrenador is not None:
+                    loss = entrenador.entrenar_epoca()
+                    instrumentacion.contar('muestras', len(indices_train))
+                else:
+                    loss_total = 0.0
+                    for X_batch, y_batch in self.data_loader.iter_batches(inputs, labels, batch_size,
+                                                                          indices=indices_train):
+                        loss_total += nn.train_step(X_batch, y_batch) * len(y_batch)
+                        instrumentacion.contar('muestras', len(y_batch))
+                    loss = loss_total / len(indices_train)
+                tiempo_epoca = time.perf_counter() - inicio_epoca
+                self.losses.agregar(epoch, loss)  # Guardar la pérdida
                 # Evaluar en el conjunto de validación
-                y_pred_val, _ = nn.predict(X_val)
-                val_accuracy = self.calculate_accuracy(y_val, y_pred_val)
+                inicio_validacion = time.perf_counter()
+                with medir('validation'):
+                    y_pred_val, _ = nn.predict(X_val)
+                    val_accuracy = self.calculate_accuracy(y_val, y_pred_val)
+                tiempo_validacion = time.perf_counter() - inicio_validacion
                 if val_accuracy >= best_accuracy:
                     best_accuracy = val_accuracy
                     # Guardar el mejor modelo
-                    nn.save_model(modelo_path)
+                    with medir('save_best'):
+                        nn.save_model(modelo_path)
+                        if not estadisticas_guardadas:
+                            self.guardar_estadisticas(classes)
+                            estadisticas_guardadas = True
+                metricas.registrar(
+                    epoca=epoch, perdida=float(loss), precision_validacion=float(val_accuracy),
+                    mejor_precision=float(best_accuracy),
+                    learning_rate=getattr(getattr(nn, 'optimizer', None), 'learning_rate', getattr(nn, 'learning_rate', None)),
+                    muestras_por_s=len(indices_train) / tiempo_epoca if tiempo_epoca > 0 else None,
+                    tiempo_epoca_s=tiempo_epoca, tiempo_validacion_s=tiempo_validacion,
+                    tiempo_total_s=time.time() - start_time)
                 # Actualizar la salida cada 10 épocas
                 if epoch % 10 == 0 or epoch == 1:
                     elapsed_time = time.time() - start_time
                     self.queue.put(('output', f"Época {epoch}, Pérdida: {loss:.6f}, Precisión Validación: {val_accuracy * 100:.3f}%, Tiempo: {elapsed_time:.2f}s\n"))
                     # Actualizar la gráfica
                     self.queue.put(('update_plot', None))
+                # Checkpoint periódico para poder reanudar si el proceso muere
+                if time.time() - ultimo_checkpoint >= self.intervalo_checkpoint:
+                    self.guardar_checkpoint(nn, epoch, best_accuracy, classes, config, entrenador)
+                    ultimo_checkpoint = time.time()
+            self.guardar_checkpoint(nn, epoch, best_accuracy, classes, config, entrenador)
+            if estadisticas_guardadas:
+                self.registrar_modelo(modelo_path, best_accuracy, epoch, config)
+            if self.detener_evento.is_set():
+                estado_final = 'detenido'
+                self.queue.put(('output', f"Entrenamiento detenido en la época {epoch}. Checkpoint guardado en: {self.checkpoint_path}\n"))
+                self.reportar_instrumentacion()
+                self.queue.put(('status', "Estado: Entrenamiento detenido. Usa 'Reanudar Entrenamiento' para continuar."))
+                self.queue.put(('progress_stop', None))
+                self.queue.put(('update_plot', None))
+                return
+            estado_final = 'completado'
             # Indicar que se alcanzó el error deseado
             self.queue.put(('output', f"Entrenamiento completado en época {epoch}, Pérdida: {loss:.6f}\n"))
+            self.reportar_instrumentacion()
             # Mostrar resultados finales
             report = self.classification_report(y_val, y_pred_val, classes)
             self.queue.put(('output', f"Mejor precisión en validación: {best_accuracy * 100:.3f}%\n"))
@@ -200,6 +600,56 @@ class TrainingApp(ttk.Frame):
             self.queue.put(('error', f"Ocurrió un error durante el entrenamiento:\n{e}"))
             self.queue.put(('status', "Estado: Error durante el entrenamiento."))
             print(f"Error durante el entrenamiento: {e}")
+        finally:
+            # Si una época falló, el perfil (cProfile o tracemalloc) seguiría activo el resto de la sesión
+            if instrumentacion.capturando:
+                instrumentacion.detener_captura()
+            if metricas is not None:
+                metricas.cerrar(estado_final, epocas=epoch, mejor_precision=best_accuracy)
+            if entrenador is not None:
+                entrenador.cerrar()
+
+    def registrar_modelo(self, modelo_path, best_accuracy, epoch, config):
+        """Guarda el mejor modelo de este entrenamiento como versión nueva en models/registro."""
+        try:
+            id_version = RegistroModelos(os.path.join(self.models_dir, "registro")).registrar(
+                modelo_path, os.path.join(self.models_dir, "estadisticas.pkl"), {
+                    'precision_validacion': best_accuracy,
+                    'epocas': epoch,
+                    'dataset': huella_dataset(self.imagenes_json_ruta),
+                    'entrenamiento': config
+                })
+            self.queue.put(('output', f"Modelo registrado como versión {id_version}.\n"))
+        except Exception as e:
+            self.queue.put(('output', f"Advertencia: No se pudo registrar el modelo: {e}\n"))
+            print(f"Error al registrar el modelo: {e}")
+
+    def guardar_estadisticas(self, classes):
+        """Guarda junto al modelo la normalización, las clases y el pipeline de las imágenes."""
+        manifest = DatasetManifest(self.imagenes_json_ruta)
+        primera = next(iter(manifest), {})
+        guardar_estadisticas(os.path.join(self.models_dir, "estadisticas.pkl"), {
+            'mean': self.mean,
+            'std': self.std,
+            'classes': list(classes),
+            'image_size': self.data_loader.image_size,
+            'filter': primera.get('filter', 'none'),
+            'kernels_applied': primera.get('kernels_applied', []),
+            'extractor': self.data_loader.feature_extractor
+        })
+
+    def reportar_instrumentacion(self):
+        """Muestra en la consola el resumen por etapa y lo guarda junto al modelo."""
+        perfil = instrumentacion.detener_captura()
+        if not instrumentacion.habilitada:
+            return
+        ruta = os.path.join(self.models_dir, f"instrumentacion_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        instrumentacion.guardar_resumen(ruta)
+        self.queue.put(('output', "Resumen de instrumentación:\n"))
+        self.queue.put(('output', instrumentacion.texto_resumen()))
+        if perfil:
+            self.queue.put(('output', perfil + "\n"))
+        self.queue.put(('output', f"Resumen guardado en: {ruta}\n"))
 
     def process_queue(self):
         """Procesa los mensajes en la cola para actualizar la interfaz gráfica."""
@@ -212,8 +662,7 @@ class TrainingApp(ttk.Frame):
                 elif message_type == 'progress_stop':
                     self.progress.stop()
                 elif message_type == 'output':
-                    self.text_output.insert(tk.END, value)
-                    self.text_output.see(tk.END)
+                    self.escribir_consola(value)
                 elif message_type == 'status':
                     self.status_label.config(text=value)
                 elif message_type == 'messagebox':
@@ -228,10 +677,56 @@ class TrainingApp(ttk.Frame):
             pass
         self.after(100, self.process_queue)
 
+    def escribir_consola(self, texto):
+        """Añade texto a la consola conservando solo las últimas lineas_max_consola líneas."""
+        self.text_output.insert(tk.END, texto)
+        lineas = int(self.text_output.index('end-1c').split('.')[0])
+        if lineas > self.lineas_max_consola:
+            self.text_output.delete('1.0', f"{lineas - self.lineas_max_consola + 1}.0")
+        self.text_output.see(tk.END)
+
+    def abrir_visor_ejecuciones(self):
+        """Ventana para recargar y comparar las métricas de entrenamientos anteriores."""
+        ventana = tk.Toplevel(self)
+        ventana.title("Comparar Ejecuciones")
+        ventana.geometry("1000x600")
+
+        frame_lista = ttk.Frame(ventana)
+        frame_lista.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
+        lista = tk.Listbox(frame_lista, selectmode=tk.EXTENDED, width=45, exportselection=False)
+        lista.pack(fill=tk.Y, expand=True)
+        ejecuciones = listar_ejecuciones(self.carpeta_ejecuciones)
+        for meta in ejecuciones:
+            mejor = meta.get('mejor_precision')
+            texto_mejor = f"{mejor * 100:.2f}%" if mejor is not None else "-"
+            lista.insert(tk.END, f"{meta['id']} · {meta.get('modelo', '?')} · {meta.get('estado', '?')} · {texto_mejor}")
+
+        figura = Figure(figsize=(8, 4), dpi=100)
+        ax_perdida = figura.add_subplot(121)
+        ax_precision = figura.add_subplot(122)
+        canvas = FigureCanvasTkAgg(figura, master=ventana)
+        canvas.get_tk_widget().pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+        def mostrar():
+            ids = [ejecuciones[i]['id'] for i in lista.curselection()]
+            try:
+                dibujar_ejecuciones(ax_perdida, ax_precision, self.carpeta_ejecuciones, ids)
+                figura.tight_layout()
+                canvas.draw()
+            except Exception as e:
+                messagebox.showerror("Error al Cargar Ejecuciones", f"No se pudieron leer las métricas:\n{e}", parent=ventana)
+
+        ttk.Button(frame_lista, text="Mostrar Selección", command=mostrar).pack(pady=5)
+
     def update_plot(self):
         """Actualiza la gráfica de error vs. épocas."""
+        with medir('render'):
+            self._dibujar_grafica()
+
+    def _dibujar_grafica(self):
         self.ax.clear()
-        self.ax.plot(range(1, len(self.losses) + 1), self.losses, label='Error de Entrenamiento')
+        epocas, perdidas = self.losses.puntos()
+        self.ax.plot(epocas, perdidas, label='Error de Entrenamiento')
         self.ax.set_title("Error vs. Épocas")
         self.ax.set_xlabel("Épocas")
         self.ax.set_ylabel("Error")
@@ -245,22 +740,5 @@ class TrainingApp(ttk.Frame):
         return correct / total if total > 0 else 0
 
     def classification_report(self, y_true, y_pred, classes):
-        """Genera un reporte de clasificación básico."""
-        report_text = ""
-        for idx, cls in enumerate(classes):
-            true_positive = np.sum((y_true == idx) & (y_pred == idx))
-            false_positive = np.sum((y_true != idx) & (y_pred == idx))
-            false_negative = np.sum((y_true == idx) & (y_pred != idx))
-            support = np.sum(y_true == idx)
-
-            precision = true_positive / (true_positive + false_positive + 1e-15)
-            recall = true_positive / (true_positive + false_negative + 1e-15)
-            f1_score = 2 * precision * recall / (precision + recall + 1e-15)
-
-            report_text += f"Clase: {cls}\n"
-            report_text += f"  Precisión: {precision:.4f}\n"
-            report_text += f"  Recall: {recall:.4f}\n"
-            report_text += f"  F1-Score: {f1_score:.4f}\n"
-            report_text += f"  Soporte: {support}\n\n"
-
-        return report_text
\ No newline at end of file
+        """Genera el reporte de clasificación por clase a partir de la matriz de confusión."""
+        return reporte_clasificacion(y_true, y_pred, classes)
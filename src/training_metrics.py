@@ -0,0 +1,285 @@
+# src/training_metrics.py
+
+"""
+Telemetría estructurada del entrenamiento.
+
+Cada entrenamiento (y sus reanudaciones) escribe en models/ejecuciones/<id>/:
+    ejecucion.json    Configuración, modelo, estado final y mejor precisión.
+    metricas.jsonl    Un registro por época (pérdida, precisión, tiempos, learning rate, muestras/s).
+    metricas.csv      Las mismas columnas, para abrir en una hoja de cálculo.
+
+Los registros se acumulan en memoria y se escriben por bloques (cada
+`tamano_bloque` épocas o cada `intervalo_escritura` segundos) con una sola
+escritura por archivo en modo append, así que el coste por época es constante
+y un corte pierde como mucho el bloque pendiente. En memoria solo se guardan
+las últimas `capacidad` épocas (buffer circular) y la gráfica usa una
+SerieAcotada, que conserva la forma de toda la curva con un número fijo de puntos.
+
+Uso (visor para comparar ejecuciones):
+    python src/training_metrics.py --listar
+    python src/training_metrics.py 20261019_103000 20261019_120512 --salida comparacion.png
+"""
+
+import os
+import csv
+import io
+import json
+import time
+import argparse
+import threading
+from collections import deque
+
+CAMPOS = ['epoca', 'perdida', 'precision_validacion', 'mejor_precision', 'learning_rate', 'muestras_por_s',
+          'tiempo_epoca_s', 'tiempo_validacion_s', 'tiempo_total_s', 'fecha']
+
+class SerieAcotada:
+    """
+    Serie (x, y) con memoria acotada: al llenarse se descarta uno de cada dos
+    puntos y se duplica el paso, de modo que siempre cubre la serie completa.
+
+    Itera como pares (x, y) y extend acepta pares o valores sueltos (x consecutivos),
+    lo que mantiene compatibles los checkpoints que guardaban una lista de pérdidas.
+    """
+    def __init__(self, capacidad=2000):
+        self.capacidad = max(int(capacidad), 2)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._x = []
+            self._y = []
+            self._paso = 1
+            self._vistos = 0  # Puntos recibidos desde el último guardado (se guarda uno de cada `_paso`)
+            self._ultimo_x = 0  # x del último punto recibido, se haya guardado o no
+
+    def agregar(self, x, y):
+        with self._lock:
+            self._ultimo_x = x
+            self._vistos += 1
+            if self._vistos < self._paso:
+                return
+            self._vistos = 0
+            self._x.append(x)
+            self._y.append(float(y))
+            if len(self._x) >= self.capacidad:
+                # Descartar uno de cada dos contando desde el final: el punto más reciente se conserva
+                self._x = self._x[::-2][::-1]
+                self._y = self._y[::-2][::-1]
+                self._paso *= 2
+
+    def append(self, y):
+        self.agregar(self.ultimo_x + 1, y)
+
+    def extend(self, valores):
+        for valor in valores:
+            if isinstance(valor, (tuple, list)):
+                self.agregar(*valor)
+            else:
+                self.append(valor)
+
+    @property
+    def ultimo_x(self):
+        """x del último punto recibido (aunque la decimación lo haya descartado)."""
+        with self._lock:
+            return self._ultimo_x
+
+    def puntos(self):
+        """Copia (xs, ys) segura para dibujar desde otro hilo."""
+        with self._lock:
+            return list(self._x), list(self._y)
+
+    def __len__(self):
+        return len(self._x)
+
+    def __iter__(self):
+        return iter(list(zip(*self.puntos())))
+
+class RegistroMetricas:
+    """
+    Escritor de métricas por época de una ejecución, por bloques y en modo append.
+
+    Parámetros:
+        - carpeta_ejecuciones: Carpeta que contiene todas las ejecuciones (models/ejecuciones).
+        - id_ejecucion: Id de una ejecución existente para continuarla (al reanudar) o None para crear una.
+        - hasta_epoca: Al continuar, última época guardada en el checkpoint; los registros
+          posteriores (escritos antes de un corte) y las líneas cortadas se descartan.
+        - meta: Datos de la ejecución para ejecucion.json (configuración, modelo...).
+        - capacidad: Épocas que se conservan en memoria (buffer circular `recientes`).
+        - tamano_bloque / intervalo_escritura: Cuándo se vacía lo pendiente al disco.
+    """
+    def __init__(self, carpeta_ejecuciones, id_ejecucion=None, meta=None, capacidad=1000, tamano_bloque=20,
+                 intervalo_escritura=5.0, hasta_epoca=None):
+        self.id_ejecucion = id_ejecucion or time.strftime("%Y%m%d_%H%M%S")
+        self.carpeta = os.path.join(carpeta_ejecuciones, self.id_ejecucion)
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.ruta_jsonl = os.path.join(self.carpeta, "metricas.jsonl")
+        self.ruta_csv = os.path.join(self.carpeta, "metricas.csv")
+        self.ruta_meta = os.path.join(self.carpeta, "ejecucion.json")
+        self.tamano_bloque = tamano_bloque
+        self.intervalo_escritura = intervalo_escritura
+        self.recientes = deque(maxlen=capacidad)
+        self._pendientes = []
+        self._ultima_escritura = time.monotonic()
+        self._lock = threading.Lock()
+
+        if id_ejecucion and hasta_epoca is not None:
+            self._recortar(hasta_epoca)
+        self.meta = leer_meta(self.carpeta) if id_ejecucion else {}
+        self.meta.setdefault('id', self.id_ejecucion)
+        self.meta.setdefault('inicio', time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self.meta.update(meta or {})
+        self.meta['estado'] = 'en_curso'
+        self._escribir_meta()
+
+    def registrar(self, **campos):
+        """Añade el registro de una época; se escribe al disco cuando se completa el bloque."""
+        campos.setdefault('fecha', time.strftime("%Y-%m-%dT%H:%M:%S"))
+        with self._lock:
+            self.recientes.append(campos)
+            self._pendientes.append(campos)
+            vaciar = (len(self._pendientes) >= self.tamano_bloque
+                      or time.monotonic() - self._ultima_escritura >= self.intervalo_escritura)
+        if vaciar:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe los registros pendientes con una sola escritura por archivo."""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, []
+            self._ultima_escritura = time.monotonic()
+            if not pendientes:
+                return
+            nuevo_csv = not os.path.exists(self.ruta_csv)
+            with open(self.ruta_jsonl, 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(registro, ensure_ascii=False) + "\n" for registro in pendientes))
+            buffer = io.StringIO()
+            escritor = csv.DictWriter(buffer, fieldnames=CAMPOS, extrasaction='ignore')
+            if nuevo_csv:
+                escritor.writeheader()
+            escritor.writerows(pendientes)
+            with open(self.ruta_csv, 'a', encoding='utf-8', newline='') as f:
+                f.write(buffer.getvalue())
+
+    def cerrar(self, estado='completado', **meta):
+        """Vacía lo pendiente y guarda el estado final de la ejecución."""
+        self.vaciar()
+        self.meta.update(meta)
+        self.meta['estado'] = estado
+        self.meta['fin'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._escribir_meta()
+
+    def _recortar(self, hasta_epoca):
+        """Reescribe metricas.jsonl y metricas.csv solo con los registros válidos de épocas <= hasta_epoca."""
+        _, registros = leer_ejecucion(self.carpeta)
+        registros = [registro for registro in registros if registro.get('epoca', 0) <= hasta_epoca]
+        ruta_tmp = self.ruta_jsonl + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            f.write("".join(json.dumps(registro, ensure_ascii=False) + "\n" for registro in registros))
+        os.replace(ruta_tmp, self.ruta_jsonl)
+        ruta_tmp = self.ruta_csv + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=CAMPOS, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(registros)
+        os.replace(ruta_tmp, self.ruta_csv)
+
+    def _escribir_meta(self):
+        ruta_tmp = self.ruta_meta + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(ruta_tmp, self.ruta_meta)
+
+def leer_meta(carpeta):
+    ruta = os.path.join(carpeta, "ejecucion.json")
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def leer_ejecucion(carpeta):
+    """
+    Retorna (meta, registros) de una ejecución, un registro por época en orden.
+    Se omiten las líneas inválidas (escrituras cortadas) y, si una época aparece
+    varias veces (reanudación tras un corte), se conserva su último registro.
+    """
+    por_epoca = {}
+    ruta = os.path.join(carpeta, "metricas.jsonl")
+    if os.path.exists(ruta):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(registro, dict) and 'epoca' in registro:
+                    por_epoca[registro['epoca']] = registro
+    return leer_meta(carpeta), [por_epoca[epoca] for epoca in sorted(por_epoca)]
+
+def listar_ejecuciones(carpeta_ejecuciones):
+    """Metadatos de las ejecuciones guardadas, de la más reciente a la más antigua."""
+    if not os.path.isdir(carpeta_ejecuciones):
+        return []
+    ejecuciones = []
+    for nombre in sorted(os.listdir(carpeta_ejecuciones), reverse=True):
+        meta = leer_meta(os.path.join(carpeta_ejecuciones, nombre))
+        if meta:
+            ejecuciones.append(meta)
+    return ejecuciones
+
+def dibujar_ejecuciones(ax_perdida, ax_precision, carpeta_ejecuciones, ids):
+    """Dibuja pérdida y precisión de validación por época de varias ejecuciones en dos ejes de matplotlib."""
+    ax_perdida.clear()
+    ax_precision.clear()
+    for id_ejecucion in ids:
+        meta, registros = leer_ejecucion(os.path.join(carpeta_ejecuciones, id_ejecucion))
+        etiqueta = f"{id_ejecucion} ({meta.get('modelo', '?')})"
+        epocas = [registro['epoca'] for registro in registros]
+        ax_perdida.plot(epocas, [registro['perdida'] for registro in registros], label=etiqueta)
+        ax_precision.plot(epocas, [registro['precision_validacion'] for registro in registros], label=etiqueta)
+    ax_perdida.set_title("Error vs. Épocas")
+    ax_perdida.set_xlabel("Épocas")
+    ax_perdida.set_ylabel("Error")
+    ax_precision.set_title("Precisión de Validación vs. Épocas")
+    ax_precision.set_xlabel("Épocas")
+    ax_precision.set_ylabel("Precisión")
+    if ids:
+        ax_perdida.legend(fontsize=8)
+        ax_precision.legend(fontsize=8)
+
+def texto_ejecuciones(ejecuciones):
+    lineas = []
+    for meta in ejecuciones:
+        mejor = meta.get('mejor_precision')
+        texto_mejor = f"{mejor * 100:.2f}%" if mejor is not None else "-"
+        lineas.append(f"{meta['id']}  {meta.get('modelo', '?'):<20} {meta.get('estado', '?'):<11} "
+                      f"épocas {meta.get('epocas', '-'):>5}  mejor {texto_mejor:>7}")
+    return "\n".join(lineas) if lineas else "No hay ejecuciones guardadas."
+
+def main():
+    parser = argparse.ArgumentParser(description="Visor de métricas de entrenamientos anteriores.")
+    parser.add_argument("ejecuciones", nargs='*', help="Ids de las ejecuciones a comparar.")
+    parser.add_argument("--proyecto", default=os.getcwd(), help="Carpeta raíz del proyecto (models/).")
+    parser.add_argument("--listar", action='store_true', help="Listar las ejecuciones guardadas.")
+    parser.add_argument("--salida", default=None, help="Guardar la comparación como imagen en vez de mostrarla.")
+    args = parser.parse_args()
+
+    carpeta = os.path.join(args.proyecto, "models", "ejecuciones")
+    if args.listar or not args.ejecuciones:
+        print(texto_ejecuciones(listar_ejecuciones(carpeta)))
+        return
+    import matplotlib
+    if args.salida:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    figura, (ax_perdida, ax_precision) = plt.subplots(1, 2, figsize=(12, 5))
+    dibujar_ejecuciones(ax_perdida, ax_precision, carpeta, args.ejecuciones)
+    figura.tight_layout()
+    if args.salida:
+        figura.savefig(args.salida)
+        print(f"Comparación guardada en: {args.salida}")
+    else:
+        plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# src/video_stream.py
+
+"""
+Clasificación de video o secuencias de fotogramas.
+
+Fuentes admitidas:
+    - Carpeta con una secuencia de imágenes (orden alfabético).
+    - Archivo multi-fotograma que PIL sabe leer (GIF, APNG, TIFF).
+    - Cualquier video (MP4, AVI...) si está instalado OpenCV (opcional).
+
+Etapas encadenadas: un hilo lee y decodifica los fotogramas (saltando según
+--paso), un pool de hilos aplica el pipeline de kernels/filtro/normalización y
+el hilo principal predice por lotes. Si un fotograma apenas difiere del último
+clasificado (diferencia media de una miniatura en escala de grises por debajo
+de --umbral) se reutiliza esa predicción sin preprocesar ni predecir. Las
+probabilidades se suavizan en el tiempo con una media móvil exponencial.
+
+Uso:
+    python src/video_stream.py --video pecera.mp4 --paso 2 --umbral 2.0 --salida pecera.jsonl
+"""
+
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image, ImageSequence
+from bulk_ingest import EXTENSIONES_IMAGEN
+from model_registry import crear_fuente
+
+TAMANO_MINIATURA = (32, 32)  # Resolución para comparar fotogramas consecutivos
+_FIN = object()
+
+def _leer_secuencia(carpeta, paso, fps):
+    nombres = sorted(nombre for nombre in os.listdir(carpeta) if nombre.lower().endswith(EXTENSIONES_IMAGEN))
+    for indice in range(0, len(nombres), paso):
+        with Image.open(os.path.join(carpeta, nombres[indice])) as imagen:
+            yield indice, indice / fps if fps else None, imagen.convert("RGB")
+
+def _leer_multifotograma(ruta, paso):
+    with Image.open(ruta) as imagen:
+        instante = 0.0
+        for indice, fotograma in enumerate(ImageSequence.Iterator(imagen)):
+            duracion = fotograma.info.get('duration')
+            if indice % paso == 0:
+                yield indice, instante / 1000.0 if duracion is not None else None, fotograma.convert("RGB")
+            instante += duracion or 0
+
+def _leer_video_opencv(ruta, paso):
+    try:
+        import cv2  # Dependencia opcional: solo para formatos de video
+    except ImportError:
+        raise ValueError(f"No se puede leer {ruta}: PIL no reconoce el formato y OpenCV (cv2) no está instalado.")
+    captura = cv2.VideoCapture(ruta)
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir el video {ruta}.")
+    fps = captura.get(cv2.CAP_PROP_FPS) or None
+    indice = 0
+    try:
+        while True:
+            # grab() avanza sin decodificar del todo; solo se recuperan los fotogramas usados
+            if not captura.grab():
+                break
+            if indice % paso == 0:
+                correcto, fotograma = captura.retrieve()
+                if not correcto:
+                    break
+                yield indice, indice / fps if fps else None, Image.fromarray(cv2.cvtColor(fotograma, cv2.COLOR_BGR2RGB))
+            indice += 1
+    finally:
+        captura.release()
+
+def leer_fotogramas(fuente, paso=1, fps=None):
+    """Genera (indice, instante_en_segundos o None, imagen PIL RGB) cada `paso` fotogramas."""
+    if os.path.isdir(fuente):
+        yield from _leer_secuencia(fuente, paso, fps)
+        return
+    try:
+        with Image.open(fuente):
+            es_imagen = True
+    except OSError:
+        es_imagen = False
+    if es_imagen:
+        yield from _leer_multifotograma(fuente, paso)
+    else:
+        yield from _leer_video_opencv(fuente, paso)
+
+def miniatura(imagen):
+    """Miniatura en escala de grises para medir el cambio entre fotogramas."""
+    return np.asarray(imagen.convert("L").resize(TAMANO_MINIATURA, Image.BILINEAR), dtype=np.float32)
+
+class ClasificadorVideo:
+    """
+    Clasifica los fotogramas de una fuente de video en etapas encadenadas.
+
+    Parámetros:
+        - fuente_modelo: PipelineInferencia o ModeloRecargable.
+        - paso: Se clasifica uno de cada `paso` fotogramas.
+        - umbral: Diferencia media (0-255) de la miniatura por debajo de la cual se reutiliza la predicción.
+        - suavizado: Peso de la historia en la media móvil exponencial (0 = sin suavizado).
+        - max_lote: Fotogramas por llamada a predict.
+        - hilos: Hilos de preprocesado.
+        - capacidad: Fotogramas en vuelo como máximo entre lectura y predicción.
+    """
+    def __init__(self, fuente_modelo, paso=1, umbral=2.0, suavizado=0.6, max_lote=16, hilos=None, capacidad=64):
+        self.fuente_modelo = fuente_modelo
+        self.paso = max(int(paso), 1)
+        self.umbral = umbral
+        self.suavizado = suavizado
+        self.max_lote = max_lote
+        self.hilos = hilos or os.cpu_count() or 1
+        self.capacidad = capacidad
+
+    def _lector(self, fuente, fps, cola, errores):
+        """Etapa 1: decodifica, calcula la miniatura y decide si el fotograma se reutiliza."""
+        referencia = None
+        try:
+            for indice, instante, imagen in leer_fotogramas(fuente, self.paso, fps):
+                actual = miniatura(imagen)
+                cambio = float(np.mean(np.abs(actual - referencia))) if referencia is not None else None
+                if cambio is not None and cambio < self.umbral:
+                    cola.put((indice, instante, None, cambio))  # Reutilizar la última predicción
+                else:
+                    referencia = actual
+                    cola.put((indice, instante, imagen, cambio))
+        except Exception as e:
+            errores.append(e)
+        finally:
+            cola.put(_FIN)
+
+    def procesar(self, fuente, fps=None, callback=None):
+        """
+        Clasifica la fuente completa; callback(resultado) recibe cada fotograma en orden.
+        Retorna (resultados, estadisticas).
+        """
+        cola = queue.Queue(maxsize=self.capacidad)
+        errores = []
+        lector = threading.Thread(target=self._lector, args=(fuente, fps, cola, errores), name='lector_video', daemon=True)
+        inicio = time.perf_counter()
+        lector.start()
+
+        resultados = []
+        en_vuelo = deque()  # (indice, instante, cambio, pipeline, futuro o None) en orden
+        probabilidades_previas = None
+        suavizadas = None
+        clasificados = 0
+        reutilizados = 0
+        pendientes = 0  # Fotogramas en vuelo que necesitan predicción
+        terminado = False
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='preprocesado') as executor:
+            while not terminado or en_vuelo:
+                # Etapa 2: llenar la ventana de preprocesado
+                while not terminado and len(en_vuelo) < self.capacidad:
+                    try:
+                        elemento = cola.get(timeout=0.05) if not en_vuelo else cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if elemento is _FIN:
+                        terminado = True
+                        break
+                    indice, instante, imagen, cambio = elemento
+                    pipeline = self.fuente_modelo.actual
+                    futuro = executor.submit(pipeline.preprocesar, imagen) if imagen is not None else None
+                    en_vuelo.append((indice, instante, cambio, pipeline, futuro))
+                    pendientes += futuro is not None
+                    if pendientes >= self.max_lote:
+                        break
+                if not en_vuelo:
+                    continue
+
+                # Etapa 3: predecir por lotes los fotogramas pendientes, en orden
+                lote = []
+                while en_vuelo and len(lote) < self.max_lote:
+                    lote.append(en_vuelo.popleft())
+                nuevos = [(i, elemento) for i, elemento in enumerate(lote) if elemento[4] is not None]
+                pendientes -= len(nuevos)
+                probabilidades = {}
+                grupos = {}
+                for i, (_, _, _, pipeline, futuro) in nuevos:
+                    grupos.setdefault(id(pipeline), (pipeline, []))[1].append((i, futuro.result()))
+                for pipeline, elementos in grupos.values():
+                    salida = pipeline.predecir_proba(np.stack([vector for _, vector in elementos]))
+                    for (i, _), fila in zip(elementos, salida):
+                        probabilidades[i] = fila
+
+                for i, (indice, instante, cambio, pipeline, futuro) in enumerate(lote):
+                    reutilizado = futuro is None
+                    if reutilizado:
+                        reutilizados += 1
+                        actual = probabilidades_previas
+                    else:
+                        clasificados += 1
+                        actual = probabilidades_previas = probabilidades[i]
+                    if suavizadas is None or len(suavizadas) != len(actual):
+                        suavizadas = actual.copy()
+                    else:
+                        suavizadas = self.suavizado * suavizadas + (1 - self.suavizado) * actual
+                    clase = int(np.argmax(actual))
+                    clase_suavizada = int(np.argmax(suavizadas))
+                    resultado = {
+                        'fotograma': indice,
+                        'instante_s': instante,
+                        'clase': pipeline.classes[clase],
+                        'confianza': float(actual[clase]),
+                        'clase_suavizada': pipeline.classes[clase_suavizada],
+                        'confianza_suavizada': float(suavizadas[clase_suavizada]),
+                        'reutilizado': reutilizado,
+                        'cambio': cambio,
+                        'version': pipeline.version
+                    }
+                    resultados.append(resultado)
+                    if callback is not None:
+                        callback(resultado)
+        lector.join()
+        if errores:
+            raise errores[0]
+
+        transcurrido = time.perf_counter() - inicio
+        estadisticas = {
+            'fotogramas': len(resultados),
+            'clasificados': clasificados,
+            'reutilizados': reutilizados,
+            'paso': self.paso,
+            'segundos': transcurrido,
+            'fps': len(resultados) / transcurrido if transcurrido > 0 else 0.0,
+            'fps_fuente_equivalente': len(resultados) * self.paso / transcurrido if transcurrido > 0 else 0.0,
+            'clases_suavizadas': dict(Counter(r['clase_suavizada'] for r in resultados))
+        }
+        return resultados, estadisticas
+
+def texto_estadisticas(estadisticas):
+    return (f"{estadisticas['fotogramas']} fotogramas en {estadisticas['segundos']:.2f}s -> "
+            f"{estadisticas['fps']:.1f} FPS de extremo a extremo "
+            f"({estadisticas['fps_fuente_equivalente']:.1f} FPS de la fuente con paso {estadisticas['paso']})\n"
+            f"Clasificados: {estadisticas['clasificados']}, reutilizados por poco cambio: {estadisticas['reutilizados']}\n"
+            f"Clases (suavizadas): {estadisticas['clases_suavizadas']}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificación de video o secuencias de fotogramas.")
+    parser.add_argument("--video", required=True, help="Video, archivo multi-fotograma o carpeta de imágenes.")
+    parser.add_argument("--proyecto", default=os.getcwd(), help="Carpeta raíz del proyecto (models/ y data/).")
+    parser.add_argument("--modelo", default=None)
+    parser.add_argument("--modelos", nargs='+', default=None,
+                        help="Versiones o etiquetas del registro de modelos; varias forman un conjunto.")
+    parser.add_argument("--paso", type=int, default=1, help="Clasificar uno de cada N fotogramas.")
+    parser.add_argument("--umbral", type=float, default=2.0,
+                        help="Diferencia media (0-255) bajo la que se reutiliza la predicción anterior (0 = nunca).")
+    parser.add_argument("--suavizado", type=float, default=0.6, help="Peso de la historia en la media móvil (0-1).")
+    parser.add_argument("--fps", type=float, default=None, help="FPS de una secuencia de imágenes (para los instantes).")
+    parser.add_argument("--max-lote", type=int, default=16)
+    parser.add_argument("--hilos", type=int, default=None)
+    parser.add_argument("--salida", default=None, help="Archivo JSONL con el resultado por fotograma.")
+    args = parser.parse_args()
+
+    fuente_modelo = crear_fuente(args.proyecto, args.modelo, args.modelos)
+    clasificador = ClasificadorVideo(fuente_modelo, args.paso, args.umbral, args.suavizado, args.max_lote, args.hilos)
+    archivo = open(args.salida, 'w', encoding='utf-8') if args.salida else None
+    try:
+        escribir = (lambda r: archivo.write(json.dumps(r, ensure_ascii=False) + "\n")) if archivo else None
+        _, estadisticas = clasificador.procesar(args.video, args.fps, escribir)
+    finally:
+        if archivo is not None:
+            archivo.close()
+    print(texto_estadisticas(estadisticas))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+# src/watch_folder.py
+
+"""
+Demonio que clasifica las imágenes que llegan a una carpeta.
+
+Detección de archivos nuevos con inotify (Linux, vía ctypes, sin dependencias)
+o, si no está disponible, consultando la carpeta periódicamente. Las rutas
+detectadas pasan por una cola acotada: si llegan más imágenes de las que se
+pueden clasificar, la detección se frena (inotify las retiene en el kernel y
+se hace un reescaneo si su cola se desborda).
+
+Las imágenes se decodifican y preprocesan en un pool de hilos (mismo pipeline
+que el servidor de inferencia), se agrupan en lotes para predict y los
+resultados se anexan en orden a un archivo JSONL. Un cursor persistente (registro
+JSONL de los archivos ya registrados, con su mtime) evita reprocesar tras un
+reinicio. Solo se omite un archivo cuyo nombre y mtime ya están en el cursor:
+los copiados con su mtime antiguo (rsync, cp -p, tarjetas SD) y los que estaban
+en cola o en vuelo al cortarse el demonio se procesan al reiniciar. La entrega
+es "al menos una vez": un corte entre el registro de resultados y el cursor
+puede repetir el último lote.
+
+Uso:
+    python src/watch_folder.py --carpeta /camaras/entrada --resultados resultados.jsonl
+"""
+
+import os
+import json
+import time
+import queue
+import select
+import struct
+import ctypes
+import ctypes.util
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from bulk_ingest import EXTENSIONES_IMAGEN
+from model_registry import crear_fuente
+
+class VigilanteInotify:
+    """Eventos de archivos completos (IN_CLOSE_WRITE / IN_MOVED_TO) de una carpeta mediante inotify."""
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    _EVENTO = struct.Struct('iIII')  # wd, mask, cookie, len
+
+    def __init__(self, carpeta):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify no está disponible en este sistema.")
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "No se pudo inicializar inotify.")
+        if libc.inotify_add_watch(self.fd, os.fsencode(carpeta), self.IN_CLOSE_WRITE | self.IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"No se pudo vigilar la carpeta {carpeta} con inotify.")
+
+    def eventos(self, timeout):
+        """Espera hasta timeout segundos; retorna (nombres, desbordado)."""
+        listos, _, _ = select.select([self.fd], [], [], timeout)
+        if not listos:
+            return [], False
+        try:
+            datos = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        nombres = []
+        desbordado = False
+        posicion = 0
+        while posicion < len(datos):
+            _, mascara, _, longitud = self._EVENTO.unpack_from(datos, posicion)
+            posicion += self._EVENTO.size
+            if mascara & self.IN_Q_OVERFLOW:
+                desbordado = True
+            elif longitud:
+                nombres.append(os.fsdecode(datos[posicion:posicion + longitud].rstrip(b'\0')))
+            posicion += longitud
+        return nombres, desbordado
+
+    def cerrar(self):
+        os.close(self.fd)
+
+class CursorProcesados:
+    """
+    Registro persistente (JSONL, solo anexar) de los archivos ya registrados: nombre -> mtime_ns.
+
+    Cada lote anexa sus líneas con una sola escritura y fsync. Al abrirlo se ignora
+    una última línea a medio escribir y, con compactar(), se reescribe de forma
+    atómica solo con los archivos que siguen en la carpeta.
+    Acepta el cursor antiguo (marca única {'mtime_ns', 'nombre', 'procesados'}):
+    los archivos de la carpeta hasta esa marca se toman como ya registrados.
+    """
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.registrados = {}
+        self.marca_antigua = None
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue  # Línea cortada por un corte durante la escritura
+                    if 'procesados' in registro:
+                        self.marca_antigua = (registro['mtime_ns'], registro['nombre'])
+                    else:
+                        self.registrados[registro['nombre']] = registro['mtime_ns']
+
+    def registrado(self, nombre, mtime_ns):
+        return self.registrados.get(nombre) == mtime_ns
+
+    def agregar(self, marcas):
+        """Anexa las marcas (mtime_ns, nombre) de un lote ya registrado en los resultados."""
+        if not marcas:
+            return
+        lineas = []
+        for mtime_ns, nombre in marcas:
+            self.registrados[nombre] = mtime_ns
+            lineas.append(json.dumps({'nombre': nombre, 'mtime_ns': mtime_ns}, ensure_ascii=False) + "\n")
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write("".join(lineas))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compactar(self, presentes):
+        """
+        Conserva solo los archivos de `presentes` (nombre -> mtime_ns) y reescribe el registro.
+        Si había un cursor antiguo, sus archivos hasta la marca pasan al registro.
+        """
+        if self.marca_antigua is not None:
+            for nombre, mtime_ns in presentes.items():
+                if (mtime_ns, nombre) <= self.marca_antigua:
+                    self.registrados.setdefault(nombre, mtime_ns)
+            self.marca_antigua = None
+        self.registrados = {nombre: mtime_ns for nombre, mtime_ns in self.registrados.items()
+                            if presentes.get(nombre) == mtime_ns}
+        ruta_tmp = self.ruta + ".tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            f.write("".join(json.dumps({'nombre': nombre, 'mtime_ns': mtime_ns}, ensure_ascii=False) + "\n"
+                            for nombre, mtime_ns in self.registrados.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta_tmp, self.ruta)
+
+class DemonioCarpeta:
+    """
+    Clasificación incremental de una carpeta.
+
+    Parámetros:
+        - carpeta: Carpeta vigilada (solo el primer nivel).
+        - fuente: PipelineInferencia o ModeloRecargable.
+        - ruta_resultados: Archivo JSONL al que se anexa un resultado por imagen.
+        - ruta_cursor: Archivo JSONL con los archivos ya registrados (CursorProcesados).
+        - hilos: Hilos de decodificación y preprocesado.
+        - max_lote / max_espera: Tamaño máximo del lote y segundos máximos de espera para completarlo.
+        - capacidad: Imágenes detectadas en espera como máximo (contrapresión).
+        - intervalo: Segundos entre consultas (modo sin inotify) o de espera de eventos.
+        - usar_inotify: False fuerza la consulta periódica.
+    """
+    def __init__(self, carpeta, fuente, ruta_resultados, ruta_cursor=None, hilos=None, max_lote=32,
+                 max_espera=0.5, capacidad=256, intervalo=1.0, usar_inotify=True):
+        self.carpeta = carpeta
+        self.fuente = fuente
+        self.ruta_resultados = ruta_resultados
+        if ruta_cursor is None:
+            ruta_cursor = os.path.join(carpeta, ".cursor_clasificacion.jsonl")
+            antiguo = os.path.join(carpeta, ".cursor_clasificacion.json")
+            if not os.path.exists(ruta_cursor) and os.path.exists(antiguo):
+                os.replace(antiguo, ruta_cursor)  # Cursor de marca única: se convierte al compactar
+        self.ruta_cursor = ruta_cursor
+        self.hilos = hilos or os.cpu_count() or 1
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self.capacidad = capacidad
+        self.intervalo = intervalo
+        self.cola = queue.Queue(maxsize=capacidad)
+        self.cursor = CursorProcesados(self.ruta_cursor)
+        self.procesados = 0
+        self.errores = 0
+        self._conocidos = {}      # Nombre -> marca de lo ya encolado en esta ejecución
+        self._tamanos = {}        # Tamaños de la consulta anterior (modo sin inotify)
+        self._detener = threading.Event()
+        self._fin_detector = threading.Event()
+        self.vigilante = None
+        if usar_inotify:
+            try:
+                self.vigilante = VigilanteInotify(carpeta)
+            except (OSError, AttributeError) as e:
+                print(f"Advertencia: inotify no disponible ({e}); se usará consulta periódica.")
+
+    def _es_imagen(self, nombre):
+        return nombre.lower().endswith(EXTENSIONES_IMAGEN) and not nombre.startswith('.')
+
+    def _encolar(self, nombre, estado=None, respetar_cursor=True):
+        """
+        Encola un archivo nuevo; bloquea si la cola está llena (contrapresión).
+        Con respetar_cursor se omite si ese nombre con ese mtime ya está registrado;
+        los eventos de inotify no lo respetan: un archivo que llega ahora es nuevo.
+        """
+        if not self._es_imagen(nombre):
+            return
+        ruta = os.path.join(self.carpeta, nombre)
+        try:
+            estado = estado or os.stat(ruta)
+        except FileNotFoundError:
+            return
+        marca = (estado.st_mtime_ns, nombre)
+        if self._conocidos.get(nombre) == marca:
+            return
+        if respetar_cursor and self.cursor.registrado(nombre, estado.st_mtime_ns):
+            return
+        self._conocidos[nombre] = marca
+        elemento = (ruta, marca, time.time())
+        while not self._detener.is_set():
+            try:
+                self.cola.put(elemento, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _podar_conocidos(self):
+        """Olvida lo que ya está en el cursor: está registrado y el escaneo lo omite."""
+        self._conocidos = {nombre: marca for nombre, marca in self._conocidos.items()
+                           if not self.cursor.registrado(nombre, marca[0])}
+
+    def _escanear(self, exigir_estable, compactar=False):
+        """
+        Encola en orden (mtime, nombre) los archivos que no están en el cursor con su mtime.
+        Con exigir_estable solo los que no cambiaron de tamaño desde la consulta anterior;
+        con compactar, el cursor se reescribe con los archivos que siguen en la carpeta.
+        """
+        self._podar_conocidos()
+        if compactar:
+            with os.scandir(self.carpeta) as entradas:
+                self.cursor.compactar({entrada.name: entrada.stat().st_mtime_ns for entrada in entradas
+                                       if entrada.is_file() and self._es_imagen(entrada.name)})
+        candidatos = []
+        tamanos = {}
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or entrada.name in self._conocidos or not self._es_imagen(entrada.name):
+                    continue
+                estado = entrada.stat()
+                tamanos[entrada.name] = estado.st_size
+                if exigir_estable and self._tamanos.get(entrada.name) != estado.st_size:
+                    continue
+                candidatos.append(((estado.st_mtime_ns, entrada.name), estado))
+        self._tamanos = tamanos
+        for (_, nombre), estado in sorted(candidatos, key=lambda c: c[0]):
+            if self._detener.is_set():
+                return
+            self._encolar(nombre, estado)
+
+    def _detectar(self, una_vez):
+        """Hilo de detección: escaneo inicial y después eventos de inotify o consultas periódicas."""
+        try:
+            self._escanear(exigir_estable=False, compactar=True)
+            while not una_vez and not self._detener.is_set():
+                if self.vigilante is not None:
+                    nombres, desbordado = self.vigilante.eventos(self.intervalo)
+                    if not nombres:
+                        self._podar_conocidos()
+                    for nombre in nombres:
+                        self._encolar(nombre, respetar_cursor=False)
+                    if desbordado:
+                        print("Advertencia: la cola de inotify se desbordó; reescaneando la carpeta.")
+                        self._escanear(exigir_estable=False)
+                else:
+                    self._detener.wait(self.intervalo)
+                    self._escanear(exigir_estable=True)
+        finally:
+            self._fin_detector.set()
+
+    def _registrar(self, archivo_resultados, lote):
+        """Anexa los resultados del lote (en orden de llegada) y después sus archivos al cursor."""
+        for elemento, resultado in lote:
+            ruta, marca, detectado = elemento
+            resultado = {'archivo': os.path.basename(ruta), **resultado,
+                         'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                         'latencia_s': round(time.time() - detectado, 4)}
+            archivo_resultados.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        archivo_resultados.flush()
+        os.fsync(archivo_resultados.fileno())
+        self.procesados += len(lote)
+        self.cursor.agregar([marca for (_, marca, _), _ in lote])
+
+    def _clasificar_lote(self, en_vuelo):
+        """Espera el preprocesado del lote más antiguo, predice por pipeline y devuelve [(elemento, resultado)]."""
+        lote = [en_vuelo.popleft() for _ in range(min(self.max_lote, len(en_vuelo)))]
+        salidas = [None] * len(lote)
+        grupos = {}
+        for i, (elemento, pipeline, futuro) in enumerate(lote):
+            try:
+                vector = futuro.result()
+            except Exception as e:
+                self.errores += 1
+                salidas[i] = {'error': str(e)}
+                continue
+            grupos.setdefault(id(pipeline), (pipeline, []))[1].append((i, vector))
+        for pipeline, elementos in grupos.values():
+            indices, confianzas = pipeline.predecir(np.stack([vector for _, vector in elementos]))
+            for (i, _), resultado in zip(elementos, pipeline.resultados(indices, confianzas)):
+                salidas[i] = resultado
+        return [(elemento, salida) for (elemento, _, _), salida in zip(lote, salidas)]
+
+    def ejecutar(self, una_vez=False):
+        """
+        Procesa la carpeta hasta detener() (o, con una_vez, hasta vaciar lo que ya había).
+        El preprocesado de las imágenes siguientes se solapa con la predicción del lote actual.
+        """
+        modo = "una pasada" if una_vez else ("inotify" if self.vigilante is not None else f"consulta cada {self.intervalo}s")
+        print(f"Vigilando {self.carpeta} ({modo}); resultados en {self.ruta_resultados}")
+        detector = threading.Thread(target=self._detectar, args=(una_vez,), name='detector_carpeta', daemon=True)
+        detector.start()
+        en_vuelo = deque()  # (elemento, pipeline, futuro) en orden de llegada
+        inicio = time.time()
+        ultimo_reporte = inicio
+        with ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='preprocesado') as executor, \
+                open(self.ruta_resultados, 'a', encoding='utf-8') as archivo_resultados:
+            while not self._detener.is_set():
+                # Llenar la ventana de preprocesado (acotada por la capacidad)
+                limite = time.time() + self.max_espera
+                while len(en_vuelo) < self.capacidad:
+                    espera = limite - time.time() if len(en_vuelo) < self.max_lote else 0
+                    try:
+                        elemento = self.cola.get(timeout=max(espera, 0)) if espera > 0 else self.cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    pipeline = self.fuente.actual
+                    en_vuelo.append((elemento, pipeline, executor.submit(pipeline.preprocesar, elemento[0])))
+                if en_vuelo:
+                    self._registrar(archivo_resultados, self._clasificar_lote(en_vuelo))
+                elif self._fin_detector.is_set() and self.cola.empty():
+                    break
+                if time.time() - ultimo_reporte >= 10:
+                    ultimo_reporte = time.time()
+                    print(f"Procesadas {self.procesados} imágenes ({self.procesados / (ultimo_reporte - inicio):.1f}/s), "
+                          f"en cola {self.cola.qsize()}, errores {self.errores}")
+        self._detener.set()
+        detector.join()
+        if self.vigilante is not None:
+            self.vigilante.cerrar()
+        print(f"Demonio detenido: {self.procesados} imágenes procesadas, {self.errores} errores.")
+        return self.procesados
+
+    def detener(self):
+        self._detener.set()
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasifica las imágenes que llegan a una carpeta.")
+    parser.add_argument("--carpeta", required=True, help="Carpeta vigilada.")
+    parser.add_argument("--resultados", default=None, help="Archivo JSONL de resultados (por defecto, en la carpeta).")
+    parser.add_argument("--cursor", default=None, help="Archivo del cursor (por defecto, .cursor_clasificacion.jsonl).")
+    parser.add_argument("--proyecto", default=os.getcwd(), help="Carpeta raíz del proyecto (models/ y data/).")
+    parser.add_argument("--modelo", default=None)
+    parser.add_argument("--modelos", nargs='+', default=None,
+                        help="Versiones o etiquetas del registro de modelos; varias forman un conjunto.")
+    parser.add_argument("--hilos", type=int, default=None, help="Hilos de preprocesado (por defecto, núcleos).")
+    parser.add_argument("--max-lote", type=int, default=32)
+    parser.add_argument("--max-espera", type=float, default=0.5, help="Segundos máximos para completar un lote.")
+    parser.add_argument("--capacidad", type=int, default=256, help="Imágenes en espera como máximo.")
+    parser.add_argument("--intervalo", type=float, default=1.0, help="Segundos entre consultas de la carpeta.")
+    parser.add_argument("--sin-inotify", action='store_true', help="Usar siempre la consulta periódica.")
+    parser.add_argument("--una-vez", action='store_true', help="Procesar lo pendiente y terminar.")
+    parser.add_argument("--intervalo-recarga", type=float, default=2.0, help="0 = sin recarga en caliente del modelo.")
+    args = parser.parse_args()
+
+    fuente = crear_fuente(args.proyecto, args.modelo, args.modelos, args.intervalo_recarga)
+    resultados = args.resultados or os.path.join(args.carpeta, "resultados_clasificacion.jsonl")
+    demonio = DemonioCarpeta(args.carpeta, fuente, resultados, args.cursor, args.hilos, args.max_lote,
+                             args.max_espera, args.capacidad, args.intervalo, not args.sin_inotify)
+    try:
+        demonio.ejecutar(una_vez=args.una_vez)
+    except KeyboardInterrupt:
+        demonio.detener()
+        print("Demonio detenido por el usuario.")
+
+if __name__ == "__main__":
+    main()